@@ -1,16 +1,26 @@
 from datetime import timedelta, datetime
 from uuid import UUID
-from typing import Optional
+from typing import AsyncIterator, Optional, Union
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass
+import asyncio
+import hmac
 import os
+import time
 
-from fastapi import Depends, HTTPException
+import orjson
+
+from fastapi import Depends, Header, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # ajuste esses imports conforme sua estrutura
-from database import SessionLocal
+from database import AsyncSessionLocal
 from models import User
+from redis_client import get_redis
 
 # =========================
 # Config JWT
@@ -19,17 +29,22 @@ JWT_SECRET = os.getenv("JWT_SECRET", "CHANGE_ME_SUPER_SECRET")  # use env var em
 JWT_ALG = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 dias
 
+# Rotas /admin/* (profiling): header X-Admin-Token. Vazio = rotas desligadas (404)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "").strip()
+
+# Cache do usuário autenticado (evita query por request)
+USER_CACHE_TTL_S = float(os.getenv("USER_CACHE_TTL_S", "10"))              # em memória, por worker
+USER_CACHE_MAX = int(os.getenv("USER_CACHE_MAX", "1024"))
+USER_CACHE_REDIS_TTL_S = int(os.getenv("USER_CACHE_REDIS_TTL_S", "300"))  # compartilhado entre workers
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 # =========================
 # DB Session helper
 # =========================
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 # =========================
 # Password hashing
@@ -44,10 +59,20 @@ def get_db():
 
 # --- Opção B: bcrypt (se não usa passlib)
 import bcrypt
+
+# bcrypt custa ~250 ms de CPU no custo padrão: nunca roda no event loop.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))                  # work factor de hashes novos
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))    # threads dedicadas ao bcrypt
+LOGIN_MAX_CONCURRENCY = int(os.getenv("LOGIN_MAX_CONCURRENCY", "8"))    # logins/cadastros em andamento
+LOGIN_QUEUE_TIMEOUT_S = float(os.getenv("LOGIN_QUEUE_TIMEOUT_S", "5"))  # espera máxima por vaga antes do 503
+
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_login_slots = asyncio.Semaphore(LOGIN_MAX_CONCURRENCY)
+
 def hash_password(password: str) -> str:
     if isinstance(password, str):
         password = password.encode("utf-8")
-    return bcrypt.hashpw(password, bcrypt.gensalt()).decode("utf-8")
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode("utf-8")
 
 def verify_password(plain_password: str, password_hash: str) -> bool:
     if isinstance(plain_password, str):
@@ -59,10 +84,38 @@ def verify_password(plain_password: str, password_hash: str) -> bool:
     except ValueError:
         return False
 
+async def hash_password_async(password: str) -> str:
+    """hash_password no pool do bcrypt (o bcrypt libera o GIL enquanto calcula)."""
+    return await asyncio.get_running_loop().run_in_executor(_hash_executor, hash_password, password)
+
+async def verify_password_async(plain_password: str, password_hash: str) -> bool:
+    return await asyncio.get_running_loop().run_in_executor(
+        _hash_executor, verify_password, plain_password, password_hash
+    )
+
+@asynccontextmanager
+async def vaga_de_login():
+    """
+    Limita logins/cadastros simultâneos: rajadas esperam vaga (até LOGIN_QUEUE_TIMEOUT_S)
+    em vez de enfileirar centenas de hashes; passando disso, 503 com Retry-After.
+    """
+    try:
+        await asyncio.wait_for(_login_slots.acquire(), timeout=LOGIN_QUEUE_TIMEOUT_S)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=503,
+            detail="Muitos logins simultâneos. Tente novamente em instantes.",
+            headers={"Retry-After": "1"},
+        )
+    try:
+        yield
+    finally:
+        _login_slots.release()
+
 # =========================
 # Token helpers
 # =========================
-def create_access_token(user_id, email: str, expires_delta: Optional[timedelta] = None) -> str:
+def create_access_token(user_id, email: str, expires_delta: Optional[timedelta] = None, name: Optional[str] = None) -> str:
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     payload = {
         "sub": str(user_id),   # UUID como string
@@ -70,41 +123,170 @@ def create_access_token(user_id, email: str, expires_delta: Optional[timedelta]
         "exp": expire,
         "iat": datetime.utcnow(),
     }
+    # Só claims que não mudam: o que é mutável (evo_instance, heygen_*) vem do cache do usuário
+    if name:
+        payload["name"] = name
     token = jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALG)
     return token
 
-# =========================
-# Current user
-# =========================
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
-    credentials_exc = HTTPException(status_code=401, detail="Não autorizado")
+def _credentials_exc() -> HTTPException:
+    return HTTPException(status_code=401, detail="Não autorizado")
 
+def _decodificar_token(token: str) -> dict:
     try:
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG])
     except JWTError:
-        raise credentials_exc
-
-    sub = payload.get("sub")
-    if not sub:
-        raise credentials_exc
+        raise _credentials_exc()
+    if not payload.get("sub"):
+        raise _credentials_exc()
+    return payload
 
-    user = None
-    # Primeiro tenta UUID
+def _id_do_sub(sub) -> Union[UUID, int]:
     try:
-        user_uuid = UUID(str(sub))
-        user = db.query(User).filter(User.id == user_uuid).first()
+        return UUID(str(sub))
     except ValueError:
         # Compat: se algum token antigo tiver sub numérico
         try:
-            user_int = int(str(sub))
-            user = db.query(User).filter(User.id == user_int).first()
+            return int(str(sub))
         except ValueError:
+            raise _credentials_exc()
+
+# =========================
+# Principal (usuário autenticado sem sessão do ORM)
+# =========================
+@dataclass(frozen=True)
+class UserPrincipal:
+    """Campos do usuário que os endpoints leem. Imutável: alterações passam pelo ORM + invalidar_principal."""
+    id: Union[UUID, int]
+    email: str
+    name: Optional[str] = None
+    evo_instance: Optional[str] = None
+    heygen_group_id: Optional[str] = None
+    heygen_group_ready: bool = False
+
+    @classmethod
+    def de_usuario(cls, user: User) -> "UserPrincipal":
+        return cls(
+            id=user.id,
+            email=user.email,
+            name=user.name,
+            evo_instance=user.evo_instance,
+            heygen_group_id=user.heygen_group_id,
+            heygen_group_ready=bool(user.heygen_group_ready),
+        )
+
+    def para_json(self) -> bytes:
+        return orjson.dumps({**asdict(self), "id": str(self.id)})
+
+    @classmethod
+    def de_json(cls, raw: bytes) -> "UserPrincipal":
+        data = orjson.loads(raw)
+        return cls(**{**data, "id": _id_do_sub(data["id"])})
+
+
+class _CachePrincipais:
+    """LRU em memória com TTL curto (por worker)."""
+
+    def __init__(self, ttl: float, maximo: int):
+        self.ttl = ttl
+        self.maximo = maximo
+        self._itens: "OrderedDict[str, tuple[float, UserPrincipal]]" = OrderedDict()
+
+    def obter(self, chave: str) -> Optional[UserPrincipal]:
+        item = self._itens.get(chave)
+        if item is None:
+            return None
+        expira_em, principal = item
+        if expira_em < time.monotonic():
+            self._itens.pop(chave, None)
+            return None
+        self._itens.move_to_end(chave)
+        return principal
+
+    def salvar(self, chave: str, principal: UserPrincipal) -> None:
+        self._itens[chave] = (time.monotonic() + self.ttl, principal)
+        self._itens.move_to_end(chave)
+        while len(self._itens) > self.maximo:
+            self._itens.popitem(last=False)
+
+    def remover(self, chave: str) -> None:
+        self._itens.pop(chave, None)
+
+
+_principais = _CachePrincipais(USER_CACHE_TTL_S, USER_CACHE_MAX)
+
+def _redis_key_principal(chave: str) -> str:
+    return f"user_principal:{chave}"
+
+async def _carregar_principal_do_banco(user_id: Union[UUID, int]) -> Optional[UserPrincipal]:
+    async with AsyncSessionLocal() as db:
+        user = await db.get(User, user_id)
+        return UserPrincipal.de_usuario(user) if user else None
+
+async def obter_principal(user_id: Union[UUID, int]) -> Optional[UserPrincipal]:
+    """Memória -> Redis -> banco. Redis fora do ar só faz cair para o banco."""
+    chave = str(user_id)
+    principal = _principais.obter(chave)
+    if principal is not None:
+        return principal
+    try:
+        raw = await get_redis().get(_redis_key_principal(chave))
+        principal = UserPrincipal.de_json(raw) if raw else None
+    except Exception:
+        principal = None
+    if principal is None:
+        principal = await _carregar_principal_do_banco(user_id)
+        if principal is None:
+            return None
+        try:
+            await get_redis().setex(_redis_key_principal(chave), USER_CACHE_REDIS_TTL_S, principal.para_json())
+        except Exception:
             pass
+    _principais.salvar(chave, principal)
+    return principal
 
-    if not user:
-        raise credentials_exc
+async def invalidar_principal(user_id) -> None:
+    """Chamar sempre que evo_instance / heygen_group_id / heygen_group_ready mudarem no banco."""
+    chave = str(user_id)
+    _principais.remover(chave)
+    try:
+        await get_redis().delete(_redis_key_principal(chave))
+    except Exception:
+        pass
+
+# =========================
+# Current user
+# =========================
+def get_token_principal(token: str = Depends(oauth2_scheme)) -> UserPrincipal:
+    """Caminho stateless: só as claims do JWT (id, email, nome). Nenhum acesso a banco/cache."""
+    payload = _decodificar_token(token)
+    return UserPrincipal(id=_id_do_sub(payload["sub"]), email=payload.get("email") or "", name=payload.get("name"))
+
+async def get_current_principal(token: str = Depends(oauth2_scheme)) -> UserPrincipal:
+    """Usuário autenticado para leitura (cache em memória/Redis; banco só no miss)."""
+    payload = _decodificar_token(token)
+    principal = await obter_principal(_id_do_sub(payload["sub"]))
+    if principal is None:
+        raise _credentials_exc()
+    return principal
 
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db)
+) -> User:
+    """Usuário do ORM, para endpoints que alteram o registro (lembre de invalidar_principal)."""
+    payload = _decodificar_token(token)
+    user = await db.get(User, _id_do_sub(payload["sub"]))
+    if not user:
+        raise _credentials_exc()
     return user
+
+# =========================
+# Admin
+# =========================
+def exigir_admin(x_admin_token: str = Header(default="")) -> None:
+    """Dependency das rotas /admin/*: token fixo por env, sem usuário."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(x_admin_token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=403, detail="Acesso negado")
@@ -0,0 +1,80 @@
+# bench_importtime.py
+"""
+Mede o custo de import de um módulo com `python -X importtime` (processo novo, sem cache
+de módulos) e confere que os pacotes pesados de services/ continuam carregando sob demanda.
+
+Uso:
+    python bench_importtime.py                 # import main
+    python bench_importtime.py services.heygen --top 15
+    python bench_importtime.py main --max-ms 800   # sai com código 1 se passar do orçamento
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import List, Tuple
+
+# Submódulos que nenhum import de nível superior deve puxar (só o primeiro uso)
+PACOTES_SOB_DEMANDA = ("services.evolution", "services.eleven", "services.heygen", "services.media", "services.pipeline")
+
+_LINHA = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def medir(modulo: str) -> List[Tuple[str, int, int]]:
+    """(módulo, próprio µs, cumulativo µs) de cada import feito por `import <modulo>`."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(f"[BENCH] import {modulo} falhou (código {proc.returncode})")
+    linhas = []
+    for linha in proc.stderr.splitlines():
+        m = _LINHA.match(linha)
+        if m:
+            linhas.append((m.group(4), int(m.group(1)), int(m.group(2))))
+    return linhas
+
+
+def carregados_indevidamente(linhas: List[Tuple[str, int, int]], modulo: str) -> List[str]:
+    """Submódulos dos pacotes sob demanda que o import carregou (o próprio alvo não conta)."""
+    return [
+        nome for nome, _, _ in linhas
+        if nome != modulo
+        and not modulo.startswith(nome + ".")
+        and any(nome.startswith(p + ".") for p in PACOTES_SOB_DEMANDA)
+    ]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("modulo", nargs="?", default="main")
+    parser.add_argument("--top", type=int, default=20, help="quantos imports mais caros listar")
+    parser.add_argument("--max-ms", type=float, default=None, help="orçamento do import total, em ms")
+    args = parser.parse_args()
+
+    linhas = medir(args.modulo)
+    total_ms = next((cum for nome, _, cum in linhas if nome == args.modulo), 0) / 1000
+
+    print(f"[BENCH] import {args.modulo}: {total_ms:.1f} ms ({len(linhas)} módulos)")
+    print(f"{'cumulativo ms':>14} {'próprio ms':>11}  módulo")
+    for nome, proprio, cum in sorted(linhas, key=lambda l: l[2], reverse=True)[:args.top]:
+        print(f"{cum / 1000:14.1f} {proprio / 1000:11.1f}  {nome}")
+
+    ok = True
+    indevidos = carregados_indevidamente(linhas, args.modulo)
+    if indevidos:
+        ok = False
+        print(f"[BENCH] ERRO: carregados no import (deveriam ser sob demanda): {', '.join(indevidos)}")
+    if args.max_ms is not None and total_ms > args.max_ms:
+        ok = False
+        print(f"[BENCH] ERRO: {total_ms:.1f} ms acima do orçamento de {args.max_ms:.1f} ms")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
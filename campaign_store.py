@@ -0,0 +1,152 @@
+# campaign_store.py
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+from uuid import UUID, uuid4
+
+from sqlalchemy import bindparam, func, insert, update
+
+from database import AsyncSessionLocal
+from models import Campaign, CampaignContact
+from services.metrics import CONTATOS
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# Config do rastreio de campanhas
+# =========================
+CAMPANHA_INSERT_LOTE = int(os.getenv("CAMPANHA_INSERT_LOTE", "1000"))    # contatos por executemany no cadastro
+CAMPANHA_STATUS_LOTE = int(os.getenv("CAMPANHA_STATUS_LOTE", "200"))     # status acumulados antes de gravar
+CAMPANHA_STATUS_FLUSH_S = float(os.getenv("CAMPANHA_STATUS_FLUSH_S", "2"))
+
+PENDENTE = "pending"
+ENVIADO = "sent"
+FALHOU = "failed"
+PULADO = "skipped"
+
+_ERRO_MAX = 1000  # caracteres da mensagem de erro guardados por contato
+
+
+def _chave(contato: Dict[str, str]) -> Tuple[str, str]:
+    return ((contato.get("nome") or "").strip().casefold(), (contato.get("telefone") or "").strip().casefold())
+
+
+class RastreioCampanha:
+    """
+    Status dos contatos de uma campanha, gravado em lote: `marcar` só acumula, e o buffer
+    vira um único UPDATE executemany a cada CAMPANHA_STATUS_LOTE itens ou CAMPANHA_STATUS_FLUSH_S.
+    Rastreio é só registro: falha no banco é logada e não interrompe os envios.
+    Uso: `async with rastreio:` em volta do processamento (fecha a campanha ao sair).
+    """
+
+    def __init__(self, campaign_id: UUID, posicoes: Dict[Tuple[str, str], List[int]]):
+        self.campaign_id = campaign_id
+        self._posicoes = posicoes
+        self._pendentes: Dict[int, Tuple[str, Optional[str]]] = {}
+        self._ultimo_flush = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def marcar(self, contato: Dict[str, str], status: str, erro: Optional[str] = None) -> None:
+        """Registra o status de um contato (e de suas duplicatas na lista original)."""
+        CONTATOS.labels(status).inc()
+        if erro:
+            erro = erro[:_ERRO_MAX]
+        for p in self._posicoes.get(_chave(contato), ()):
+            self._pendentes[p] = (status, erro)
+        if (len(self._pendentes) >= CAMPANHA_STATUS_LOTE
+                or time.monotonic() - self._ultimo_flush >= CAMPANHA_STATUS_FLUSH_S):
+            await self.flush()
+
+    async def flush(self) -> None:
+        async with self._lock:
+            self._ultimo_flush = time.monotonic()
+            if not self._pendentes:
+                return
+            lote, self._pendentes = self._pendentes, {}
+            stmt = (
+                update(CampaignContact)
+                .where(
+                    CampaignContact.campaign_id == bindparam("b_campaign_id"),
+                    CampaignContact.posicao == bindparam("b_posicao"),
+                )
+                .values(status=bindparam("b_status"), erro=bindparam("b_erro"), updated_at=func.now())
+            )
+            params = [
+                {"b_campaign_id": self.campaign_id, "b_posicao": p, "b_status": s, "b_erro": e}
+                for p, (s, e) in lote.items()
+            ]
+            try:
+                async with AsyncSessionLocal() as db:
+                    # executemany direto na conexão: pela Session, a lista de parâmetros vira o "bulk update by PK" do ORM
+                    conn = await db.connection()
+                    await conn.execute(stmt, params)
+                    await db.commit()
+            except Exception as e:
+                logger.warning("falha ao gravar %s status da campanha %s: %s", len(params), self.campaign_id, e)
+
+    async def fechar(self, falhou: bool = False) -> None:
+        """Grava o que restou, marca como pulados os contatos nunca processados e encerra a campanha."""
+        await self.flush()
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(CampaignContact)
+                    .where(CampaignContact.campaign_id == self.campaign_id, CampaignContact.status == PENDENTE)
+                    .values(status=PULADO, updated_at=func.now())
+                )
+                await db.execute(
+                    update(Campaign)
+                    .where(Campaign.id == self.campaign_id)
+                    .values(status="failed" if falhou else "done", finished_at=func.now())
+                )
+                await db.commit()
+        except Exception as e:
+            logger.warning("falha ao encerrar a campanha %s: %s", self.campaign_id, e)
+
+    async def __aenter__(self) -> "RastreioCampanha":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.fechar(falhou=exc_type is not None)
+
+
+async def criar_campanha(
+    user_id: UUID,
+    palavra_chave: str,
+    contatos: List[Dict[str, str]],
+    origem: str,
+) -> RastreioCampanha:
+    """
+    Cadastra a campanha e todos os contatos (status pending) numa transação:
+    um INSERT da campanha + executemany dos contatos em lotes de CAMPANHA_INSERT_LOTE.
+    """
+    campaign_id = uuid4()
+    linhas = [
+        {
+            "campaign_id": campaign_id,
+            "posicao": i,
+            "nome": (c.get("nome") or "").strip(),
+            "telefone": (c.get("telefone") or "").strip(),
+            "status": PENDENTE,
+        }
+        for i, c in enumerate(contatos)
+    ]
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(Campaign).values(
+            id=campaign_id,
+            user_id=user_id,
+            origem=origem,
+            palavra_chave=palavra_chave,
+            status="running",
+            total_contatos=len(linhas),
+        ))
+        for i in range(0, len(linhas), CAMPANHA_INSERT_LOTE):
+            await db.execute(insert(CampaignContact), linhas[i:i + CAMPANHA_INSERT_LOTE])
+        await db.commit()
+
+    posicoes: Dict[Tuple[str, str], List[int]] = {}
+    for i, c in enumerate(contatos):
+        posicoes.setdefault(_chave(c), []).append(i)
+    return RastreioCampanha(campaign_id, posicoes)
@@ -8,51 +8,43 @@ import subprocess
 import sys
 import os
 
-def check_ffmpeg():
-    """Verifica se FFmpeg está instalado e acessível."""
+def versao_binario(binario, timeout=5.0):
+    """
+    Primeira linha de `<binario> -version`. Levanta FileNotFoundError se não estiver no PATH
+    e RuntimeError se sair com erro. Usada também pelo /health/ready da API.
+    """
+    result = subprocess.run(
+        [binario, "-version"],
+        capture_output=True,
+        text=True,
+        timeout=timeout
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{binario} -version saiu com código {result.returncode}")
+    return result.stdout.split('\n')[0]
+
+def _check_binario(binario, rotulo):
     try:
-        result = subprocess.run(
-            ["ffmpeg", "-version"],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        if result.returncode == 0:
-            version_line = result.stdout.split('\n')[0]
-            print(f"✅ FFmpeg encontrado: {version_line}")
-            return True
-        else:
-            print("❌ FFmpeg não encontrado ou com erro")
-            return False
+        version_line = versao_binario(binario)
+        print(f"✅ {rotulo} encontrado: {version_line}")
+        return True
     except FileNotFoundError:
-        print("❌ FFmpeg não encontrado no PATH")
+        print(f"❌ {rotulo} não encontrado no PATH")
+        return False
+    except RuntimeError:
+        print(f"❌ {rotulo} não encontrado ou com erro")
         return False
     except Exception as e:
-        print(f"❌ Erro ao verificar FFmpeg: {e}")
+        print(f"❌ Erro ao verificar {rotulo}: {e}")
         return False
 
+def check_ffmpeg():
+    """Verifica se FFmpeg está instalado e acessível."""
+    return _check_binario("ffmpeg", "FFmpeg")
+
 def check_ffprobe():
     """Verifica se FFprobe está instalado e acessível."""
-    try:
-        result = subprocess.run(
-            ["ffprobe", "-version"],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        if result.returncode == 0:
-            version_line = result.stdout.split('\n')[0]
-            print(f"✅ FFprobe encontrado: {version_line}")
-            return True
-        else:
-            print("❌ FFprobe não encontrado ou com erro")
-            return False
-    except FileNotFoundError:
-        print("❌ FFprobe não encontrado no PATH")
-        return False
-    except Exception as e:
-        print(f"❌ Erro ao verificar FFprobe: {e}")
-        return False
+    return _check_binario("ffprobe", "FFprobe")
 
 def check_python_packages():
     """Verifica se os pacotes Python necessários estão instalados."""
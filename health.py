@@ -0,0 +1,117 @@
+# health.py
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+from sqlalchemy import text
+
+from check_environment import versao_binario
+from database import async_engine
+from redis_client import get_redis
+from services import config
+
+# =========================
+# Config das sondas de saúde
+# =========================
+HEALTH_CACHE_TTL_S = float(os.getenv("HEALTH_CACHE_TTL_S", "5"))          # resultado reaproveitado entre chamadas
+HEALTH_PROBE_TIMEOUT_S = float(os.getenv("HEALTH_PROBE_TIMEOUT_S", "2"))  # teto de cada sonda
+HEALTH_SLOW_MS = float(os.getenv("HEALTH_SLOW_MS", "1000"))               # acima disso a dependência conta como lenta
+# Dependências que derrubam o /health/ready (falha, timeout ou lentidão). As demais só aparecem no relatório:
+# um upstream fora já é tratado pelos circuit breakers e não deve tirar todas as instâncias do ar.
+HEALTH_CRITICAL = {
+    d.strip() for d in os.getenv("HEALTH_CRITICAL", "postgres,redis,ffmpeg").split(",") if d.strip()
+}
+
+
+async def _sonda_postgres() -> Optional[str]:
+    async with async_engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    return None
+
+
+async def _sonda_redis() -> Optional[str]:
+    await get_redis().ping()
+    return None
+
+
+async def _sonda_ffmpeg() -> Optional[str]:
+    # Mesma verificação do check_environment.py, em thread (subprocess bloqueia)
+    timeout = HEALTH_PROBE_TIMEOUT_S
+    versao, _ = await asyncio.gather(
+        asyncio.to_thread(versao_binario, "ffmpeg", timeout),
+        asyncio.to_thread(versao_binario, "ffprobe", timeout),
+    )
+    return versao
+
+
+def _sonda_http(url: str) -> Callable[[], Awaitable[Optional[str]]]:
+    """Alcançável = respondeu qualquer coisa abaixo de 500 (a raiz dos proxies pode dar 404)."""
+    async def sonda() -> Optional[str]:
+        async with httpx.AsyncClient(timeout=HEALTH_PROBE_TIMEOUT_S) as client:
+            resp = await client.get(url)
+        if resp.status_code >= 500:
+            raise RuntimeError(f"HTTP {resp.status_code}")
+        return f"HTTP {resp.status_code}"
+    return sonda
+
+
+SONDAS: Dict[str, Callable[[], Awaitable[Optional[str]]]] = {
+    "postgres": _sonda_postgres,
+    "redis": _sonda_redis,
+    "ffmpeg": _sonda_ffmpeg,
+    "eleven": _sonda_http(config.API_BASE_ROOT),
+    "heygen": _sonda_http(config.HEYGEN_BASE_ROOT),
+    "evolution": _sonda_http(config.EVO_BASE_DEFAULT),
+}
+
+
+async def _medir(nome: str, sonda: Callable[[], Awaitable[Optional[str]]]) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    resultado: Dict[str, Any] = {"ok": True}
+    try:
+        detalhe = await asyncio.wait_for(sonda(), HEALTH_PROBE_TIMEOUT_S)
+        if detalhe:
+            resultado["detalhe"] = detalhe
+    except asyncio.TimeoutError:
+        resultado = {"ok": False, "erro": f"timeout ({HEALTH_PROBE_TIMEOUT_S:.1f}s)"}
+    except Exception as e:
+        resultado = {"ok": False, "erro": f"{type(e).__name__}: {e}"[:300]}
+    latencia_ms = (time.perf_counter() - t0) * 1000
+    resultado["latencia_ms"] = round(latencia_ms, 1)
+    resultado["lento"] = latencia_ms > HEALTH_SLOW_MS
+    resultado["critico"] = nome in HEALTH_CRITICAL
+    return resultado
+
+
+_ultimo: Optional[Dict[str, Any]] = None
+_ultimo_em = 0.0
+_lock = asyncio.Lock()
+
+
+async def verificar_dependencias() -> Dict[str, Any]:
+    """
+    Roda todas as sondas em paralelo (cada uma limitada a HEALTH_PROBE_TIMEOUT_S) e guarda o
+    resultado por HEALTH_CACHE_TTL_S: health checks frequentes de vários balanceadores
+    custam uma rodada de sondas por janela, e chamadas simultâneas esperam a mesma rodada.
+    """
+    global _ultimo, _ultimo_em
+    async with _lock:
+        agora = time.monotonic()
+        if _ultimo is None or agora - _ultimo_em >= HEALTH_CACHE_TTL_S:
+            nomes = list(SONDAS)
+            resultados = await asyncio.gather(*(_medir(n, SONDAS[n]) for n in nomes))
+            checks = dict(zip(nomes, resultados))
+            _ultimo = {
+                "checks": checks,
+                "pronto": all(c["ok"] and not c["lento"] for c in checks.values() if c["critico"]),
+                "degradado": any(not c["ok"] or c["lento"] for c in checks.values()),
+            }
+            _ultimo_em = time.monotonic()
+        return {**_ultimo, "idade_s": round(time.monotonic() - _ultimo_em, 1)}
+
+
+def server_timing(checks: Dict[str, Dict[str, Any]]) -> str:
+    """Latências no header Server-Timing (legível por balanceadores e pelo devtools)."""
+    return ", ".join(f"{nome};dur={c['latencia_ms']}" for nome, c in checks.items())
@@ -0,0 +1,123 @@
+# logging_config.py
+import json
+import logging
+import os
+import re
+import sys
+from contextvars import ContextVar, Token
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from services.config import HEYGEN_DEBUG
+
+# =========================
+# Config de logs
+# =========================
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").strip().upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").strip().lower()   # "json" (produção) ou "texto" (terminal)
+LOG_AMOSTRA_N = max(1, int(os.getenv("LOG_AMOSTRA_N", "10")))  # logs com extra={"amostra": chave}: 1 a cada N
+
+# Id que amarra os logs de uma mesma request / campanha / preview (herdado pelas tasks filhas)
+correlacao_id: ContextVar[Optional[str]] = ContextVar("correlacao_id", default=None)
+
+
+def definir_correlacao(valor: Optional[str]) -> Token:
+    return correlacao_id.set(valor)
+
+
+# ---- Redação: aplicada no texto final, só dos registros que passaram do nível ----
+_REDACOES = (
+    (re.compile(r"(?i)\b(bearer\s+)[A-Za-z0-9._~+/=-]+"), r"\1***"),
+    (re.compile(r"\beyJ[A-Za-z0-9_-]{5,}\.[A-Za-z0-9_-]{5,}\.[A-Za-z0-9_-]*"), "***"),
+    (
+        re.compile(r"""(?i)(["']?(?:password|senha|apikey|api_key|access_token|token|secret|jwt_secret)["']?\s*[:=]\s*["']?)[^"'\s,}&]+"""),
+        r"\1***",
+    ),
+    # telefones (10+ dígitos, com ou sem +): mantém só o final
+    (re.compile(r"(?<![\w.])\+?\d{10,15}(?![\w.])"), lambda m: "***" + m.group()[-4:]),
+)
+
+
+def redigir(texto: str) -> str:
+    for padrao, troca in _REDACOES:
+        texto = padrao.sub(troca, texto)
+    return texto
+
+
+class _FiltroContexto(logging.Filter):
+    """Anexa o correlacao_id atual e redige a mensagem já formatada."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.correlacao_id = correlacao_id.get() or "-"
+        record.msg = redigir(record.getMessage())
+        record.args = None
+        return True
+
+
+class _FiltroAmostragem(logging.Filter):
+    """Registros com `amostra` (ex: polling) passam 1 a cada LOG_AMOSTRA_N por chave; o primeiro sempre passa."""
+
+    def __init__(self):
+        super().__init__()
+        self._contagem: Dict[str, int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        chave = getattr(record, "amostra", None)
+        if chave is None:
+            return True
+        n = self._contagem.get(chave, 0)
+        self._contagem[chave] = n + 1
+        return n % LOG_AMOSTRA_N == 0
+
+
+# Atributos padrão do LogRecord; o resto veio de extra={...} e vai para o JSON
+_ATRIBUTOS_PADRAO = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "correlacao_id", "amostra"}
+
+
+class FormatadorJson(logging.Formatter):
+    """Uma linha JSON por registro: ts, nivel, logger, msg, correlacao_id e os campos de extra."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        doc = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "correlacao_id", "-") != "-":
+            doc["correlacao_id"] = record.correlacao_id
+        for chave, valor in vars(record).items():
+            if chave not in _ATRIBUTOS_PADRAO:
+                doc[chave] = redigir(valor) if isinstance(valor, str) else valor
+        if record.exc_info:
+            doc["exc"] = redigir(self.formatException(record.exc_info))
+        return json.dumps(doc, ensure_ascii=False, default=str)
+
+
+_configurado = False
+
+
+def configurar_logging() -> None:
+    """Handler único no root (stdout), também para os loggers do uvicorn. Idempotente."""
+    global _configurado
+    if _configurado:
+        return
+    _configurado = True
+
+    handler = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == "texto":
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(correlacao_id)s] %(message)s"))
+    else:
+        handler.setFormatter(FormatadorJson())
+    handler.addFilter(_FiltroAmostragem())
+    handler.addFilter(_FiltroContexto())
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(LOG_LEVEL)
+    for nome in ("uvicorn", "uvicorn.access"):
+        lg = logging.getLogger(nome)
+        lg.handlers[:] = []
+        lg.propagate = True
+    # HEYGEN_DEBUG liga DEBUG só para services.heygen (dumps de request/response); sem ele vale o LOG_LEVEL
+    logging.getLogger("services.heygen").setLevel(logging.DEBUG if HEYGEN_DEBUG else logging.NOTSET)
@@ -1,31 +1,100 @@
 # main.py
-from fastapi import FastAPI, UploadFile, File, Form, BackgroundTasks, Path, HTTPException, Depends
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi import FastAPI, UploadFile, File, Form, BackgroundTasks, Path, HTTPException, Depends, Query, Request
+from fastapi.responses import JSONResponse, FileResponse, Response
 from fastapi.security import OAuth2PasswordRequestForm
-from uuid import UUID
-from io import BytesIO
+from contextlib import asynccontextmanager
+from uuid import UUID, uuid4
 from typing import Optional
+import asyncio
 import json
+import logging
 import tempfile
+import time
 import os
-from sqlalchemy.orm import Session
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import Base, engine, SessionLocal
+from database import async_engine, AsyncSessionLocal
 from models import User
-from auth_utils import get_db, hash_password, verify_password, create_access_token, get_current_user
-
-from services.audio_service import (
-    processar_video, salvar_video_em_disco,
-    salvar_imagem_em_disco, salvar_audio_em_wav,
-    transcrever_audio_com_timestamps, verificar_ou_criar_voz, gerar_video_para_nome,
-    enviar_video_para_webhook,
-    enviar_texto_via_whatsapp, enviar_video_via_whatsapp,
-    evo_start_session, evo_status, evo_logout,
-    evo_create_user_instance, make_instance_name,
-    heygen_verificar_ou_criar_avatar_do_usuario, heygen_group_train, heygen_verificar_status_treino,
-    overlay_clip_on_interval, _ffmpeg_obter_duracao, _ffmpeg_obter_propriedades
+from auth_utils import (
+    get_db, hash_password_async, verify_password_async, vaga_de_login, exigir_admin,
+    create_access_token, get_current_user, get_current_principal, get_token_principal,
+    invalidar_principal, UserPrincipal,
 )
-from redis_client import salvar_preview, obter_preview, remover_preview
+from upload_utils import (
+    criar_pasta_staging, remover_pasta_staging, salvar_upload_em_disco, staging_em_uso,
+    MAX_FOTO_BYTES, MAX_AUDIO_BYTES, MAX_VIDEO_BYTES,
+)
+from campaign_store import criar_campanha, RastreioCampanha, ENVIADO, FALHOU
+from media_store import (
+    persistir_midia, caminho_midia, obter_metadados, remover_midia,
+    gerar_url_assinada, validar_assinatura,
+)
+from health import verificar_dependencias, server_timing
+from logging_config import configurar_logging, correlacao_id, definir_correlacao
+import profiling
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from services import evolution, heygen, media, pipeline
+from services.segment_store import SegmentStore
+from services.metrics import JOBS_EM_ANDAMENTO
+from services import tracing
+from redis_client import (
+    get_redis, fechar_redis,
+    salvar_preview, obter_preview, remover_preview,
+    salvar_preview_job, obter_preview_job,
+)
+
+configurar_logging()
+logger = logging.getLogger(__name__)
+
+# ---------------------------
+# Startup: schema via migrations (alembic upgrade head no deploy), conexões sob demanda
+# ---------------------------
+STARTUP_RETRY_MAX_S = float(os.getenv("STARTUP_RETRY_MAX_S", "5"))
+# Rotas atendidas antes do warmup terminar (liveness e documentação)
+ROTAS_SEM_WARMUP = {"/", "/health/live", "/health/ready", "/metrics", "/docs", "/redoc", "/openapi.json"}
+
+_pronto = asyncio.Event()
+
+
+async def _aquecer_conexoes():
+    """
+    Abre a primeira conexão do pool do Postgres (e do Redis) em background, com retry.
+    O worker aceita conexões imediatamente; as rotas respondem 503 até o banco responder.
+    """
+    espera = 0.5
+    while True:
+        try:
+            async with async_engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+            break
+        except Exception as e:
+            logger.info("Banco indisponível (%s); nova tentativa em %.1fs", e, espera)
+            await asyncio.sleep(espera)
+            espera = min(espera * 2, STARTUP_RETRY_MAX_S)
+    try:
+        await get_redis().ping()
+    except Exception as e:
+        # Redis é usado sob demanda e os caches já toleram falha: não segura o readiness
+        logger.warning("Redis indisponível no warmup: %s", e)
+    _pronto.set()
+    logger.info("Conexões prontas")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tracing.configurar_tracing()
+    profiling.iniciar_monitor_loop()
+    aquecimento = asyncio.create_task(_aquecer_conexoes())
+    try:
+        yield
+    finally:
+        aquecimento.cancel()
+        profiling.encerrar()
+        await fechar_redis()
+        await async_engine.dispose()
+        tracing.encerrar_tracing()
 
 
 app = FastAPI(
@@ -33,28 +102,134 @@ app = FastAPI(
     docs_url="/docs",
     redoc_url="/redoc",
     openapi_url="/openapi.json",
+    lifespan=lifespan,
 )
-Base.metadata.create_all(bind=engine)
+
+
+@app.middleware("http")
+async def exigir_warmup(request: Request, call_next):
+    if not _pronto.is_set() and request.url.path not in ROTAS_SEM_WARMUP:
+        return JSONResponse(
+            status_code=503,
+            content={"error": "Serviço iniciando, tente novamente em instantes."},
+            headers={"Retry-After": "2"},
+        )
+    return await call_next(request)
+
+
+@app.middleware("http")
+async def correlacionar_request(request: Request, call_next):
+    """X-Request-ID (do balanceador/cliente ou gerado) em todos os logs da request e na resposta."""
+    rid = (request.headers.get("x-request-id") or "").strip()[:64] or uuid4().hex
+    token = definir_correlacao(rid)
+    try:
+        with profiling.request(request.url.path):
+            response = await call_next(request)
+    finally:
+        correlacao_id.reset(token)
+    response.headers["X-Request-ID"] = rid
+    return response
 
 @app.get("/")
 def health():
     return {"status": "ok"}
 
+@app.get("/health/live")
+async def health_live():
+    """Liveness: o processo e o event loop respondem. Não toca em dependências."""
+    return {"status": "ok", "aquecido": _pronto.is_set()}
+
+@app.get("/health/ready")
+async def health_ready():
+    """
+    Readiness: Postgres, Redis, ffmpeg e upstreams (Eleven/Heygen/Evolution) sondados em paralelo,
+    com timeout por sonda e resultado em cache (health.py). 503 se o warmup não terminou ou se uma
+    dependência crítica (HEALTH_CRITICAL) falhou ou passou de HEALTH_SLOW_MS; latências no corpo
+    e no header Server-Timing.
+    """
+    resultado = await verificar_dependencias()
+    pronto = _pronto.is_set() and resultado["pronto"]
+    if not pronto:
+        status = "unavailable"
+    elif resultado["degradado"]:
+        status = "degraded"
+    else:
+        status = "ok"
+    return JSONResponse(
+        status_code=200 if pronto else 503,
+        content={"status": status, "aquecido": _pronto.is_set(), **resultado},
+        headers={"Server-Timing": server_timing(resultado["checks"]), "Cache-Control": "no-store"},
+    )
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Métricas Prometheus deste worker (etapas do pipeline, upstreams, fallbacks, filas; ver services/metrics.py)."""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+# ---------------------------
+# Admin: profiling sob demanda (header X-Admin-Token = ADMIN_TOKEN; ver profiling.py)
+# ---------------------------
+
+@app.post("/admin/profiling", dependencies=[Depends(exigir_admin)], include_in_schema=False)
+async def admin_armar_profiling(
+    requests: Optional[int] = Query(None, ge=1, le=10000, description="Perfilar as próximas N requests"),
+    alvo: Optional[str] = Query(None, description="campaign_id ou preview_id a perfilar (rodando ou próximo a rodar neste worker)"),
+):
+    """Arma o sampling profiler deste worker; o resultado (pilhas colapsadas) sai em GET /admin/profiling/{id}."""
+    if bool(requests) == bool(alvo):
+        raise HTTPException(status_code=400, detail="Informe 'requests' ou 'alvo' (um dos dois)")
+    try:
+        sessao = profiling.armar(requests=requests or 0, alvo=alvo)
+    except profiling.ProfilingEmAndamento as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return JSONResponse(status_code=201, content=sessao.como_dict())
+
+@app.get("/admin/profiling", dependencies=[Depends(exigir_admin)], include_in_schema=False)
+async def admin_listar_profiling():
+    return {"sessoes": profiling.listar()}
+
+@app.delete("/admin/profiling", dependencies=[Depends(exigir_admin)], include_in_schema=False)
+async def admin_parar_profiling():
+    """Encerra a sessão ativa (o que já foi amostrado é gravado)."""
+    sessao = profiling.parar()
+    if sessao is None:
+        raise HTTPException(status_code=404, detail="Nenhuma sessão ativa")
+    return sessao.como_dict()
+
+@app.get("/admin/profiling/{sessao_id}", dependencies=[Depends(exigir_admin)], include_in_schema=False)
+async def admin_baixar_profiling(sessao_id: str):
+    """Pilhas colapsadas ("frame;frame;... contagem"): flamegraph.pl, speedscope ou inferno."""
+    sessao = profiling.obter(sessao_id)
+    if sessao is None:
+        raise HTTPException(status_code=404, detail="Sessão não encontrada")
+    if sessao.status != "concluida" or not sessao.arquivo or not os.path.exists(sessao.arquivo):
+        return JSONResponse(status_code=409, content={"error": "Sessão sem resultado ainda", **sessao.como_dict()})
+    return FileResponse(sessao.arquivo, media_type="text/plain", filename=f"profile_{sessao.id}.folded")
+
 # ---------------------------
 # Validação simples de contatos
 # ---------------------------
 
 async def salvar_group_id_no_banco(user_id: UUID, group_id: str):
     """Callback assíncrono para persistir o heygen_group_id no usuário."""
-    db = SessionLocal()
-    try:
-        user = db.query(User).filter(User.id == user_id).first()
+    async with AsyncSessionLocal() as db:
+        user = await db.get(User, user_id)
         if user:
+            if user.heygen_group_id != group_id:
+                user.heygen_group_ready = False  # grupo novo ainda precisa treinar
             user.heygen_group_id = group_id
-            db.add(user)
-            db.commit()
-    finally:
-        db.close()
+            await db.commit()
+    await invalidar_principal(user_id)
+
+
+async def salvar_treino_pronto_no_banco(user_id: UUID, group_id: str):
+    """Callback assíncrono: marca o treino do group_id atual do usuário como pronto."""
+    async with AsyncSessionLocal() as db:
+        user = await db.get(User, user_id)
+        if user and user.heygen_group_id == group_id and not user.heygen_group_ready:
+            user.heygen_group_ready = True
+            await db.commit()
+    await invalidar_principal(user_id)
 
 
 def parse_contatos(contatos_json: str):
@@ -83,33 +258,33 @@ async def register(
     nome: str = Form(...),
     email: str = Form(...),
     password: str = Form(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     email = email.strip().lower()
-    if db.query(User).filter(User.email == email).first():
+    if await db.scalar(select(User).where(User.email == email)):
         raise HTTPException(status_code=409, detail="E-mail já cadastrado.")
 
-    # cria o usuário (o id já é UUID no seu modelo)
-    user = User(name=nome.strip(), email=email, password_hash=hash_password(password))
+    # cria o usuário (o id já é UUID no seu modelo); bcrypt roda fora do event loop
+    async with vaga_de_login():
+        password_hash = await hash_password_async(password)
+    user = User(name=nome.strip(), email=email, password_hash=password_hash)
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
 
     # cria e vincula a instância Evolution com padrão nomeUsuario_uuid
     try:
         # cria remotamente (se já existir, tudo bem — tratamos o 403 na service)
-        await evo_create_user_instance(user.name, user.id)
+        await evolution.evo_create_user_instance(user.name, user.id)
         # define o nome localmente e persiste
-        user.evo_instance = make_instance_name(user.name, user.id)
-        db.add(user)
-        db.commit()
-        db.refresh(user)
+        user.evo_instance = evolution.make_instance_name(user.name, user.id)
+        await db.commit()
     except Exception as e:
         # se falhar criar a instância, ainda devolvemos o token,
         # mas avisamos o cliente para tentar o /evo/start depois
-        print(f"[WARN] Falha ao criar instância Evolution para user={user.id}: {e}")
+        logger.warning("Falha ao criar instância Evolution para user=%s: %s", user.id, e)
 
-    token = create_access_token(user.id, user.email)
+    token = create_access_token(user.id, user.email, name=user.name)
     return {
         "access_token": token,
         "token_type": "bearer",
@@ -120,23 +295,28 @@ async def register(
 
 
 @app.post("/auth/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     # OAuth2PasswordRequestForm usa "username" e "password"
     email = form_data.username.strip().lower()
-    user = db.query(User).filter(User.email == email).first()
-    if not user or not verify_password(form_data.password, user.password_hash):
+    user = await db.scalar(select(User).where(User.email == email))
+    if not user:
+        raise HTTPException(status_code=401, detail="Credenciais inválidas.")
+    async with vaga_de_login():
+        senha_ok = await verify_password_async(form_data.password, user.password_hash)
+    if not senha_ok:
         raise HTTPException(status_code=401, detail="Credenciais inválidas.")
-    token = create_access_token(user.id, user.email)
+    token = create_access_token(user.id, user.email, name=user.name)
     return {"access_token": token, "token_type": "bearer", "user_id": user.id}
 
 @app.get("/auth/me")
-def me(current_user: User = Depends(get_current_user)):
+async def me(current_user: UserPrincipal = Depends(get_current_principal)):
     return {
         "id": current_user.id,
         "email": current_user.email,
         "name": current_user.name,
         "evo_instance": current_user.evo_instance,
         "heygen_group_id": current_user.heygen_group_id,  # <- exposto p/ cliente
+        "heygen_group_ready": current_user.heygen_group_ready,
     }
 
 # ==========================================================
@@ -145,39 +325,55 @@ def me(current_user: User = Depends(get_current_user)):
 @app.post("/evo/start")
 async def evo_start(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     if not current_user.evo_instance:
         # fallback: caso cadastro não tenha conseguido criar a instância
         # criamos aqui para garantir o vínculo
-        await evo_create_user_instance(current_user.name, current_user.id)
-        current_user.evo_instance = make_instance_name(current_user.name, current_user.id)
-        db.add(current_user)
-        db.commit()
-        db.refresh(current_user)
+        await evolution.evo_create_user_instance(current_user.name, current_user.id)
+        current_user.evo_instance = evolution.make_instance_name(current_user.name, current_user.id)
+        await db.commit()
+        await invalidar_principal(current_user.id)
 
-    data = await evo_start_session(current_user.evo_instance)  # só CONNECT/QR
+    data = await evolution.evo_start_session(current_user.evo_instance)  # só CONNECT/QR
     return {"instance": current_user.evo_instance, "qr": data["qr"]}
 
 
 @app.get("/evo/status")
-async def evo_get_status(current_user: User = Depends(get_current_user)):
+async def evo_get_status(current_user: UserPrincipal = Depends(get_current_principal)):
     if not current_user.evo_instance:
         raise HTTPException(status_code=400, detail="Usuário ainda não vinculou uma instância (evo_instance).")
-    data = await evo_status(current_user.evo_instance)
+    data = await evolution.evo_status(current_user.evo_instance)
     return {"instance": current_user.evo_instance, "status": data}
 
 @app.post("/evo/logout")
-async def evo_do_logout(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+async def evo_do_logout(current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
     if not current_user.evo_instance:
         raise HTTPException(status_code=400, detail="Usuário não possui instância vinculada.")
-    data = await evo_logout(current_user.evo_instance)
+    data = await evolution.evo_logout(current_user.evo_instance)
     # Opcional: limpar do usuário
     current_user.evo_instance = None
-    db.add(current_user)
-    db.commit()
+    await db.commit()
+    await invalidar_principal(current_user.id)
     return {"message": "logout solicitado", "resp": data}
 
+async def _executar_campanha(rastreio: RastreioCampanha, **kwargs):
+    """processar_video com o status de cada contato registrado em lote na campanha."""
+    atributos = {
+        "campanha.id": str(rastreio.campaign_id),
+        "campanha.origem": "gerar-videos",
+        "campanha.contatos": len(kwargs.get("contatos") or []),
+        "user.id": str(kwargs.get("user_id")),
+    }
+    definir_correlacao(str(rastreio.campaign_id))
+    with (
+        JOBS_EM_ANDAMENTO.labels("campanha").track_inprogress(),
+        tracing.span_raiz("campanha", atributos),
+        profiling.job(str(rastreio.campaign_id)),
+    ):
+        async with rastreio, staging_em_uso(kwargs.get("pasta_staging")):
+            await pipeline.processar_video(**kwargs, status_contato_async=rastreio.marcar)
+
 # ==========================================================
 # POST /gerar-videos/{user_id}  -> processa TUDO em background (usa instância do usuário logado)
 # ==========================================================
@@ -189,33 +385,45 @@ async def gerar_videos(
     palavra_chave: str = Form(...),
     foto: UploadFile = File(...),
     audio: UploadFile = File(...),
-    current_user: User = Depends(get_current_user)
+    current_user: UserPrincipal = Depends(get_current_principal)
 ):
     if not current_user.evo_instance:
         raise HTTPException(status_code=400, detail="Vincule sua instância na Evolution API antes (POST /evo/start).")
 
     contatos_lista = parse_contatos(contatos)
-    foto_bytes = await foto.read()
-    nome_foto = foto.filename or "foto_usuario.jpg"
-    audio_bytes = await audio.read()
-    nome_audio = audio.filename or "audio_usuario.wav"
+
+    # Uploads vão direto para o staging do job em disco; a task recebe só caminhos + hashes
+    pasta_staging = criar_pasta_staging()
+    try:
+        caminho_foto, foto_sha256 = await salvar_upload_em_disco(foto, pasta_staging, "foto_usuario.jpg", MAX_FOTO_BYTES)
+        caminho_audio, audio_sha256 = await salvar_upload_em_disco(audio, pasta_staging, "audio_usuario.wav", MAX_AUDIO_BYTES)
+
+        # Campanha e contatos cadastrados antes do 202: o campaign_id já sai na resposta.
+        # Falha no banco (pool esgotado, insert dos contatos) também libera o staging.
+        rastreio = await criar_campanha(user_id, palavra_chave, contatos_lista, origem="gerar-videos")
+    except Exception:
+        remover_pasta_staging(pasta_staging)
+        raise
 
     background_tasks.add_task(
-        processar_video,
+        _executar_campanha,
+        rastreio,
         user_id=user_id,
         contatos=contatos_lista,
         palavra_chave=palavra_chave,
-        foto_bytes=foto_bytes,
-        nome_foto=nome_foto,
-        audio_bytes=audio_bytes,
-        nome_audio=nome_audio,
+        caminho_foto=caminho_foto,
+        caminho_audio_upload=caminho_audio,
         evo_instance=current_user.evo_instance,
         evo_base=None,
         heygen_group_id=current_user.heygen_group_id,        # <- reusa o group_id do user se existir
         save_group_id_async=salvar_group_id_no_banco,        # <- persiste se criar
+        foto_sha256=foto_sha256,
+        audio_sha256=audio_sha256,
+        pasta_staging=pasta_staging,                         # <- removida ao fim do processamento
     )
     return JSONResponse(content={
         "message": "Processamento iniciado",
+        "campaign_id": str(rastreio.campaign_id),
         "user_id": str(user_id),
         "qtd_contatos": len(contatos_lista),
         "palavra_chave": palavra_chave,
@@ -223,94 +431,213 @@ async def gerar_videos(
     }, status_code=202)
 
 # ==========================================================
-# POST /gerar-preview/{user_id}  -> gera SÓ o primeiro contato (download), salva estado no Redis
+# POST /gerar-preview/{user_id}  -> enfileira o preview do primeiro contato e devolve o preview_id
+# GET  /previews/{preview_id}    -> status do job ou o vídeo quando pronto
 # ==========================================================
+PREVIEW_TTL = 3600
+
+async def _atualizar_preview_job(preview_id: str, job: dict, **campos):
+    job.update(campos)
+    job["updated_at"] = time.time()
+    await salvar_preview_job(preview_id, job, ttl=PREVIEW_TTL)
+
+
+async def _executar_preview(
+    preview_id: str,
+    job: dict,
+    user_id: UUID,
+    contatos_lista: list,
+    palavra_chave: str,
+    caminho_foto: str,
+    caminho_audio_upload: str,
+    foto_sha256: str,
+    audio_sha256: str,
+    pasta_staging: str,
+    evo_instance: str,
+    heygen_group_id: Optional[str],
+    heygen_group_ready: bool = False,
+):
+    """Job em background do preview: setup (STT/voz/avatar), treino, render e estado p/ confirmar."""
+    primeiro = contatos_lista[0]
+    definir_correlacao(preview_id)
+    with profiling.job(preview_id):
+        JOBS_EM_ANDAMENTO.labels("preview").inc()
+        try:
+            await _atualizar_preview_job(preview_id, job, status="running")
+            with tempfile.TemporaryDirectory() as pasta_temp:
+                caminho_audio = await asyncio.to_thread(media.converter_audio_para_wav, caminho_audio_upload, pasta_temp)
+
+                # STT, voz e avatar em paralelo (só dependem do áudio / da foto)
+                transcricao, segmentos, user_voice_id, group_id = await pipeline.preparar_recursos_usuario(
+                    user_id=user_id,
+                    caminho_audio=caminho_audio,
+                    caminho_foto=caminho_foto,
+                    pasta_temp=pasta_temp,
+                    palavra_chave=palavra_chave,
+                    heygen_group_id=heygen_group_id,
+                    save_group_id_async=salvar_group_id_no_banco,
+                )
+
+                # Inicia treino assíncrono (waitForCompleted=false), exceto se esse grupo já treinou
+                # Usa muitas tentativas (10) com delay maior (3s) para garantir que o treino seja iniciado
+                if heygen_group_ready and group_id == heygen_group_id:
+                    train_response = {"skipped": True, "reason": "already_trained"}
+                else:
+                    train_response = await heygen.heygen_group_train(group_id, max_retries=10, retry_delay=3.0)
+
+                caminho_saida_preview = await pipeline.gerar_video_para_nome(
+                    nome=primeiro["nome"],
+                    palavra_chave=palavra_chave,
+                    transcricao=transcricao,
+                    segmentos=segmentos,
+                    user_voice_id=user_voice_id,
+                    caminho_audio=caminho_audio,
+                    caminho_foto=caminho_foto,
+                    pasta_temp=pasta_temp,
+                    user_id=user_id,
+                    group_id=group_id,
+                    enviar_webhook=False,
+                )
+
+                # Persiste o vídeo fora da pasta temporária: servido via FileResponse e re-baixável
+                nome_arquivo = f"preview_{primeiro['nome']}.mp4"
+                media_id = persistir_midia(caminho_saida_preview, nome_arquivo, user_id=str(user_id))
+
+            # Preview anterior (se houver) deixa de valer: libera o staging e o vídeo dele
+            anterior = await obter_preview(user_id)
+            if anterior and anterior.get("pasta_staging") != pasta_staging:
+                remover_pasta_staging(anterior.get("pasta_staging"))
+            if anterior:
+                remover_midia(anterior.get("media_id"))
+
+            # Salva estado para confirmar depois (inclui group_id e train_response)
+            await salvar_preview(user_id, {
+                "contatos": contatos_lista,
+                "palavra_chave": palavra_chave,
+                "transcricao": transcricao,
+                "segmentos": segmentos.para_json(),  # colunar (start/end/text)
+                "voice_id": user_voice_id,
+                # uploads ficam no staging; o Redis guarda só caminhos e hashes
+                "caminho_foto": caminho_foto,
+                "caminho_audio_upload": caminho_audio_upload,
+                "foto_sha256": foto_sha256,
+                "audio_sha256": audio_sha256,
+                "pasta_staging": pasta_staging,
+                "group_id": group_id,
+                "train_response": train_response,  # Resposta do train para verificar depois
+                "media_id": media_id,              # vídeo do preview no media store
+                "preview_id": preview_id,
+                # guardo a instância do usuário no momento do preview
+                "evo_instance": evo_instance
+            }, ttl=PREVIEW_TTL)
+            await _atualizar_preview_job(preview_id, job, status="ready", media_id=media_id)
+        except Exception as e:
+            logger.warning("Falha no preview %s (user=%s): %s", preview_id, user_id, e)
+            remover_pasta_staging(pasta_staging)
+            await _atualizar_preview_job(preview_id, job, status="failed", error=str(e))
+        finally:
+            JOBS_EM_ANDAMENTO.labels("preview").dec()
+
+
 @app.post("/gerar-preview/{user_id}")
 async def gerar_preview(
     user_id: UUID,
+    background_tasks: BackgroundTasks,
     contatos: str = Form(..., description='JSON: [{"nome":"...","telefone":"..."}, ...]'),
     palavra_chave: str = Form(...),
     foto: UploadFile = File(...),
     audio: UploadFile = File(...),
-    current_user: User = Depends(get_current_user)
+    current_user: UserPrincipal = Depends(get_current_principal)
 ):
     if not current_user.evo_instance:
         raise HTTPException(status_code=400, detail="Vincule sua instância na Evolution API antes (POST /evo/start).")
 
     contatos_lista = parse_contatos(contatos)
-    primeiro = contatos_lista[0]
-    foto_bytes = await foto.read()
-    nome_foto = foto.filename or "foto_usuario.jpg"
-    audio_bytes = await audio.read()
-    nome_audio = audio.filename or "audio_usuario.wav"
-
-    with tempfile.TemporaryDirectory() as pasta_temp:
-        caminho_foto = salvar_imagem_em_disco(foto_bytes, nome_foto, pasta_temp)
-        caminho_audio = salvar_audio_em_wav(audio_bytes, nome_audio, pasta_temp)
-        transcricao, segmentos = await transcrever_audio_com_timestamps(caminho_audio)
-        user_voice_id = await verificar_ou_criar_voz(f"user_{user_id}", caminho_audio, pasta_temp)
-
-        # Cria/verifica grupo de avatar e inicia treino assíncrono
-        avatar_group_name = f"user_{user_id}"
-        group_id = await heygen_verificar_ou_criar_avatar_do_usuario(
-            user_group_name=avatar_group_name,
-            source_image=caminho_foto,
-            segmentos=segmentos,
-            palavra_chave=palavra_chave,
-            pasta_temp=pasta_temp,
-            num_fotos=10,
-            existing_group_id=current_user.heygen_group_id,
-            user_id=user_id,
-            save_group_id_async=salvar_group_id_no_banco,
-        )
-        
-        # Inicia treino assíncrono (waitForCompleted=false)
-        # Usa muitas tentativas (10) com delay maior (3s) para garantir que o treino seja iniciado
-        train_response = await heygen_group_train(group_id, max_retries=10, retry_delay=3.0)
-
-        caminho_saida_preview = await gerar_video_para_nome(
-            nome=primeiro["nome"],
-            palavra_chave=palavra_chave,
-            transcricao=transcricao,
-            segmentos=segmentos,
-            user_voice_id=user_voice_id,
-            caminho_audio=caminho_audio,
-            caminho_foto=caminho_foto,
-            pasta_temp=pasta_temp,
-            user_id=user_id,
-            group_id=group_id,
-            enviar_webhook=False,
-        )
 
-        with open(caminho_saida_preview, "rb") as f:
-            conteudo_video = f.read()
-
-        # Salva estado para confirmar depois (inclui group_id e train_response)
-        await salvar_preview(user_id, {
-            "contatos": contatos_lista,
-            "palavra_chave": palavra_chave,
-            "transcricao": transcricao,
-            "segmentos": segmentos,
-            "voice_id": user_voice_id,
-            "foto_bytes": foto_bytes.decode("latin1"),
-            "nome_foto": nome_foto,
-            "audio_bytes": audio_bytes.decode("latin1"),
-            "nome_audio": nome_audio,
-            "group_id": group_id,
-            "train_response": train_response,  # Resposta do train para verificar depois
-            # guardo a instância do usuário no momento do preview
-            "evo_instance": current_user.evo_instance
-        })
-
-    return StreamingResponse(BytesIO(conteudo_video), media_type="video/mp4", headers={
-        "Content-Disposition": f"attachment; filename=preview_{primeiro['nome']}.mp4"
-    })
+    # Staging do preview: fica em disco até o /confirmar-envio (ou expirar)
+    pasta_staging = criar_pasta_staging()
+    try:
+        caminho_foto, foto_sha256 = await salvar_upload_em_disco(foto, pasta_staging, "foto_usuario.jpg", MAX_FOTO_BYTES)
+        caminho_audio_upload, audio_sha256 = await salvar_upload_em_disco(audio, pasta_staging, "audio_usuario.wav", MAX_AUDIO_BYTES)
+    except Exception:
+        remover_pasta_staging(pasta_staging)
+        raise
+
+    preview_id = uuid4().hex
+    job = {"status": "queued", "user_id": str(user_id), "created_at": time.time()}
+    await salvar_preview_job(preview_id, job, ttl=PREVIEW_TTL)
+
+    background_tasks.add_task(
+        _executar_preview,
+        preview_id=preview_id,
+        job=job,
+        user_id=user_id,
+        contatos_lista=contatos_lista,
+        palavra_chave=palavra_chave,
+        caminho_foto=caminho_foto,
+        caminho_audio_upload=caminho_audio_upload,
+        foto_sha256=foto_sha256,
+        audio_sha256=audio_sha256,
+        pasta_staging=pasta_staging,
+        evo_instance=current_user.evo_instance,
+        heygen_group_id=current_user.heygen_group_id,
+        heygen_group_ready=bool(current_user.heygen_group_ready),
+    )
+    return JSONResponse(content={
+        "message": "Preview enfileirado",
+        "preview_id": preview_id,
+        "status": "queued",
+        "status_url": f"/previews/{preview_id}",
+    }, status_code=202)
+
+
+@app.get("/previews/{preview_id}")
+async def obter_status_preview(preview_id: str, current_user: UserPrincipal = Depends(get_token_principal)):
+    job = await obter_preview_job(preview_id)
+    if not job or job.get("user_id") != str(current_user.id):
+        raise HTTPException(status_code=404, detail="Preview não encontrado ou expirado.")
+
+    status = job.get("status")
+    if status == "ready":
+        return _responder_midia(job["media_id"])
+    if status == "failed":
+        return JSONResponse(content={"preview_id": preview_id, "status": status, "error": job.get("error")})
+    return JSONResponse(content={"preview_id": preview_id, "status": status}, status_code=202)
+
+# ==========================================================
+# GET /media/{media_id}  -> download por URL assinada/expirável (Range + ETag)
+# ==========================================================
+def _responder_midia(media_id: str) -> FileResponse:
+    """FileResponse (sendfile, Range, ETag) + URL assinada para baixar de novo sem regerar."""
+    caminho = caminho_midia(media_id)
+    if not caminho:
+        raise HTTPException(status_code=404, detail="Vídeo não encontrado ou expirado.")
+    meta = obter_metadados(media_id) or {}
+    return FileResponse(
+        caminho,
+        media_type="video/mp4",
+        filename=meta.get("filename") or f"{media_id}.mp4",
+        headers={"X-Media-Id": media_id, "X-Media-Url": gerar_url_assinada(media_id)},
+    )
+
+
+@app.get("/media/{media_id}")
+def baixar_midia(media_id: str, exp: int = Query(...), sig: str = Query(...)):
+    if not validar_assinatura(media_id, exp, sig):
+        raise HTTPException(status_code=403, detail="URL inválida ou expirada.")
+    return _responder_midia(media_id)
+
+async def _descartar_preview(user_id: UUID, dados: dict):
+    """Remove o estado do preview no Redis, os uploads do staging e o vídeo no media store."""
+    await remover_preview(user_id)
+    remover_pasta_staging(dados.get("pasta_staging"))
+    remover_midia(dados.get("media_id"))
 
 # ==========================================================
 # POST /confirmar-envio/{user_id}  -> gera para todos e ENVIA pelo WhatsApp do usuário
 # ==========================================================
 @app.post("/confirmar-envio/{user_id}")
-async def confirmar_envio(user_id: UUID, background_tasks: BackgroundTasks, current_user: User = Depends(get_current_user)):
+async def confirmar_envio(user_id: UUID, background_tasks: BackgroundTasks, current_user: UserPrincipal = Depends(get_current_principal)):
     dados = await obter_preview(user_id)
     if not dados:
         return JSONResponse(status_code=404, content={"error": "Nenhum preview encontrado ou expirado."})
@@ -319,56 +646,42 @@ async def confirmar_envio(user_id: UUID, background_tasks: BackgroundTasks, curr
     if not evo_instance:
         raise HTTPException(status_code=400, detail="Usuário não possui instância Evolution vinculada.")
 
+    caminho_foto = dados.get("caminho_foto")
+    caminho_audio_upload = dados.get("caminho_audio_upload")
+    if not (caminho_foto and os.path.isfile(caminho_foto) and caminho_audio_upload and os.path.isfile(caminho_audio_upload)):
+        await remover_preview(user_id)
+        return JSONResponse(status_code=404, content={"error": "Arquivos do preview expiraram. Gere o preview novamente."})
+
+    try:
+        rastreio = await criar_campanha(user_id, dados["palavra_chave"], dados["contatos"], origem="confirmar-envio")
+    except Exception:
+        # Sem campanha não há job para limpar depois: descarta o preview (Redis, staging e vídeo)
+        await _descartar_preview(user_id, dados)
+        raise
+
     async def gerar_restante():
         import tempfile
-        import asyncio
-        
-        # Polling do status do treino (retry infinito até completar)
+        # Aguarda o treino do avatar (watcher único por group_id, com deadline).
+        # Se o treino desse grupo já foi confirmado antes, nem consulta a Heygen.
         group_id = dados.get("group_id")
-        if group_id:
-            print(f"[HEYGEN] Verificando status do treino para group_id={group_id}...")
-            treino_completo = False
-            tentativa = 0
-            while not treino_completo:
-                treino_completo = await heygen_verificar_status_treino(group_id)
-                if treino_completo:
-                    print(f"[HEYGEN] Treino completo após {tentativa + 1} tentativa(s)")
-                    break
-                
-                # Define intervalo baseado no número da tentativa
-                if tentativa == 0:
-                    wait_time = 3.0  # Primeiro retry: 3 segundos
-                elif tentativa == 1:
-                    wait_time = 5.0  # Segundo retry: 5 segundos
-                elif tentativa == 2:
-                    wait_time = 10.0  # Terceiro retry: 10 segundos
-                else:
-                    wait_time = 20.0  # Do quarto em diante: 20 segundos
-                
-                tentativa += 1
-                print(f"[HEYGEN] Tentativa {tentativa}: treino ainda não completo, aguardando {wait_time}s...")
-                await asyncio.sleep(wait_time)
-        else:
-            print(f"[HEYGEN] WARNING: group_id não encontrado nos dados do preview")
-        
+        if not group_id:
+            logger.warning("group_id não encontrado nos dados do preview")
+        elif current_user.heygen_group_ready and current_user.heygen_group_id == group_id:
+            logger.info("Treino de group_id=%s já confirmado anteriormente", group_id)
+        elif not await heygen.heygen_aguardar_treino(group_id, user_id=user_id, save_ready_async=salvar_treino_pronto_no_banco):
+            logger.warning("seguindo sem treino confirmado para group_id=%s", group_id)
+
+        segmentos = SegmentStore.de_json(dados["segmentos"])
+
         with tempfile.TemporaryDirectory() as pasta_temp:
-            caminho_foto = salvar_imagem_em_disco(
-                dados["foto_bytes"].encode("latin1"),
-                dados["nome_foto"],
-                pasta_temp
-            )
-            caminho_audio = salvar_audio_em_wav(
-                dados["audio_bytes"].encode("latin1"),
-                dados["nome_audio"],
-                pasta_temp
-            )
+            caminho_audio = await asyncio.to_thread(media.converter_audio_para_wav, caminho_audio_upload, pasta_temp)
 
             # Garante group_id válido
             if not group_id:
-                group_id = await heygen_verificar_ou_criar_avatar_do_usuario(
+                group_id = await heygen.heygen_verificar_ou_criar_avatar_do_usuario(
                     user_group_name=f"user_{user_id}",
                     source_image=caminho_foto,
-                    segmentos=dados["segmentos"],
+                    segmentos=segmentos,
                     palavra_chave=dados["palavra_chave"],
                     pasta_temp=pasta_temp,
                     num_fotos=10,
@@ -381,52 +694,72 @@ async def confirmar_envio(user_id: UUID, background_tasks: BackgroundTasks, curr
 
             def _norm(s: str) -> str: return s.strip().casefold()
             uniq_map = {}
+            destinatarios = {}
             for c in contatos_todos:
                 k = (_norm(c["nome"]), _norm(c["telefone"]))
                 if k not in uniq_map:
                     uniq_map[k] = c
-
-            videos = {}
-            for k, contato in uniq_map.items():
-                try:
-                    caminho = await gerar_video_para_nome(
-                        nome=contato["nome"],
-                        palavra_chave=dados["palavra_chave"],
-                        transcricao=dados["transcricao"],
-                        segmentos=dados["segmentos"],
-                        user_voice_id=dados["voice_id"],
-                        caminho_audio=caminho_audio,
-                        caminho_foto=caminho_foto,
-                        pasta_temp=pasta_temp,
-                        user_id=user_id,
-                        group_id=group_id,  # Passa group_id do preview
-                        enviar_webhook=False,
-                    )
-                    videos[k] = caminho
-                except Exception as e:
-                    print(f"[ERR] Gerar vídeo para {contato['nome']} ({contato['telefone']}): {e}")
-
-            for c in contatos_todos:
-                k = (_norm(c["nome"]), _norm(c["telefone"]))
-                caminho = videos.get(k)
-                if not caminho:
+                destinatarios.setdefault(k, []).append(c)
+
+            # Todos os renders começam juntos; cada vídeo é enviado assim que fica pronto
+            async for contato, caminho, erro in pipeline.gerar_videos_campanha(
+                contatos=list(uniq_map.values()),
+                palavra_chave=dados["palavra_chave"],
+                transcricao=dados["transcricao"],
+                segmentos=segmentos,
+                user_voice_id=dados["voice_id"],
+                caminho_audio=caminho_audio,
+                caminho_foto=caminho_foto,
+                pasta_temp=pasta_temp,
+                user_id=user_id,
+                group_id=group_id,  # Passa group_id do preview
+                enviar_webhook=False,
+            ):
+                if erro is not None:
+                    logger.warning("Gerar vídeo para %s (%s): %s", contato['nome'], contato['telefone'], erro)
+                    await rastreio.marcar(contato, FALHOU, str(erro))
                     continue
-                try:
-                    await enviar_texto_via_whatsapp(
-                        c["telefone"], f"Olá {c['nome']}! (confirmação automática) 👍",
-                        evo_instance=evo_instance
-                    )
-                    await enviar_video_via_whatsapp(
-                        caminho, c["telefone"], caption=f"{c['nome']}, seu vídeo personalizado.",
-                        evo_instance=evo_instance
-                    )
-                except Exception as e:
-                    print(f"[ERR] Envio WA para {c['nome']} ({c['telefone']}): {e}")
-
-        await remover_preview(user_id)
-
-    background_tasks.add_task(gerar_restante)
-    return JSONResponse(content={"message": "Processamento e envios iniciados.", "evo_instance": evo_instance})
+                enviado, falha = False, None
+                for c in destinatarios[(_norm(contato["nome"]), _norm(contato["telefone"]))]:
+                    try:
+                        await evolution.enviar_texto_via_whatsapp(
+                            c["telefone"], f"Olá {c['nome']}! (confirmação automática) 👍",
+                            evo_instance=evo_instance
+                        )
+                        await evolution.enviar_video_via_whatsapp(
+                            caminho, c["telefone"], caption=f"{c['nome']}, seu vídeo personalizado.",
+                            evo_instance=evo_instance
+                        )
+                        enviado = True
+                    except Exception as e:
+                        logger.warning("Envio WA para %s (%s): %s", c['nome'], c['telefone'], e)
+                        falha = str(e)
+                await rastreio.marcar(contato, ENVIADO if enviado else FALHOU, None if enviado else falha)
+
+        await _descartar_preview(user_id, dados)
+
+    async def gerar_restante_rastreado():
+        atributos = {
+            "campanha.id": str(rastreio.campaign_id),
+            "campanha.origem": "confirmar-envio",
+            "campanha.contatos": len(dados["contatos"]),
+            "user.id": str(user_id),
+        }
+        definir_correlacao(str(rastreio.campaign_id))
+        with (
+            JOBS_EM_ANDAMENTO.labels("campanha").track_inprogress(),
+            tracing.span_raiz("campanha", atributos),
+            profiling.job(str(rastreio.campaign_id)),
+        ):
+            async with rastreio, staging_em_uso(dados.get("pasta_staging")):
+                await gerar_restante()
+
+    background_tasks.add_task(gerar_restante_rastreado)
+    return JSONResponse(content={
+        "message": "Processamento e envios iniciados.",
+        "campaign_id": str(rastreio.campaign_id),
+        "evo_instance": evo_instance,
+    })
 
 # ==========================================================
 # POST /teste-overlay - Endpoint de teste para overlay sem gastar créditos
@@ -446,26 +779,18 @@ async def teste_overlay(
     Recebe dois vídeos e aplica overlay no intervalo especificado.
     """
     try:
-        # Lê os vídeos
-        video_original_bytes = await video_original.read()
-        video_inserir_bytes = await video_inserir.read()
-        
         with tempfile.TemporaryDirectory() as pasta_temp:
-            # Salva os vídeos em disco
-            caminho_original = salvar_video_em_disco(
-                video_original_bytes,
-                video_original.filename or "original.mp4",
-                pasta_temp
-            )
-            caminho_inserir = salvar_video_em_disco(
-                video_inserir_bytes,
-                video_inserir.filename or "inserir.mp4",
-                pasta_temp
-            )
+            # Salva os vídeos em disco em chunks (sem carregar tudo em memória)
+            pasta_original = os.path.join(pasta_temp, "original")
+            pasta_inserir = os.path.join(pasta_temp, "inserir")
+            os.makedirs(pasta_original)
+            os.makedirs(pasta_inserir)
+            caminho_original, _ = await salvar_upload_em_disco(video_original, pasta_original, "original.mp4", MAX_VIDEO_BYTES)
+            caminho_inserir, _ = await salvar_upload_em_disco(video_inserir, pasta_inserir, "inserir.mp4", MAX_VIDEO_BYTES)
             
             # Obtém propriedades do vídeo original
-            duracao_total = _ffmpeg_obter_duracao(caminho_original)
-            props_original = _ffmpeg_obter_propriedades(caminho_original)
+            duracao_total = media._ffmpeg_obter_duracao(caminho_original)
+            props_original = media._ffmpeg_obter_propriedades(caminho_original)
             width_original = props_original["width"]
             
             # Valida os tempos
@@ -492,7 +817,7 @@ async def teste_overlay(
             
             # Aplica o overlay
             caminho_saida = os.path.join(pasta_temp, "video_teste_overlay.mp4")
-            overlay_clip_on_interval(
+            media.overlay_clip_on_interval(
                 input_video=caminho_original,
                 insert_clip=caminho_inserir,
                 start_s=start_s,
@@ -503,18 +828,13 @@ async def teste_overlay(
                 scale_w=scale_w
             )
             
-            # Retorna o vídeo processado
-            with open(caminho_saida, "rb") as f:
-                video_bytes = f.read()
-            
-            return StreamingResponse(
-                BytesIO(video_bytes),
-                media_type="video/mp4",
-                headers={
-                    "Content-Disposition": f"attachment; filename=teste_overlay_{start_s}_{end_s}.mp4"
-                }
-            )
+            # Move o resultado para o media store antes da pasta temporária sumir
+            media_id = persistir_midia(caminho_saida, f"teste_overlay_{start_s}_{end_s}.mp4")
+
+        return _responder_midia(media_id)
     
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -0,0 +1,106 @@
+# media_store.py
+import hashlib
+import hmac
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Optional
+from uuid import uuid4
+
+# =========================
+# Config do media store
+# =========================
+MEDIA_STORE_DIR = os.getenv(
+    "MEDIA_STORE_DIR",
+    os.path.join(tempfile.gettempdir(), "videosmartai_media"),
+)
+MEDIA_TTL = int(os.getenv("MEDIA_TTL", "3600"))          # mesmo TTL do preview no Redis
+MEDIA_URL_TTL = int(os.getenv("MEDIA_URL_TTL", "3600"))  # validade da URL assinada
+MEDIA_SIGNING_SECRET = os.getenv("MEDIA_SIGNING_SECRET") or os.getenv("JWT_SECRET", "CHANGE_ME_SUPER_SECRET")
+PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", "").rstrip("/")
+
+# =========================
+# Helpers internos
+# =========================
+def _caminhos(media_id: str) -> tuple[str, str]:
+    # media_id é sempre hex gerado aqui; basename impede path traversal vindo da URL
+    mid = os.path.basename(media_id)
+    return os.path.join(MEDIA_STORE_DIR, f"{mid}.mp4"), os.path.join(MEDIA_STORE_DIR, f"{mid}.json")
+
+
+def _assinar(media_id: str, exp: int) -> str:
+    msg = f"{media_id}:{exp}".encode("utf-8")
+    return hmac.new(MEDIA_SIGNING_SECRET.encode("utf-8"), msg, hashlib.sha256).hexdigest()
+
+
+def limpar_midias_expiradas() -> None:
+    if not os.path.isdir(MEDIA_STORE_DIR):
+        return
+    agora = time.time()
+    for nome in os.listdir(MEDIA_STORE_DIR):
+        if not nome.endswith(".json"):
+            continue
+        media_id = nome[:-len(".json")]
+        meta = obter_metadados(media_id)
+        if meta is None or meta.get("expires_at", 0) < agora:
+            remover_midia(media_id)
+
+# =========================
+# API pública
+# =========================
+def persistir_midia(caminho_origem: str, filename: str, ttl: int = MEDIA_TTL, **extra) -> str:
+    """
+    Move o arquivo para o media store (fora da pasta temporária do job) e retorna o media_id.
+    O arquivo passa a poder ser servido via FileResponse e baixado de novo até expirar.
+    """
+    limpar_midias_expiradas()
+    os.makedirs(MEDIA_STORE_DIR, exist_ok=True)
+    media_id = uuid4().hex
+    caminho_video, caminho_meta = _caminhos(media_id)
+    shutil.move(caminho_origem, caminho_video)
+    agora = time.time()
+    meta = {"filename": filename, "created_at": agora, "expires_at": agora + ttl, **extra}
+    with open(caminho_meta, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    return media_id
+
+
+def obter_metadados(media_id: str) -> Optional[dict]:
+    _, caminho_meta = _caminhos(media_id)
+    try:
+        with open(caminho_meta, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def caminho_midia(media_id: str) -> Optional[str]:
+    """Caminho do arquivo se ele existir e não tiver expirado."""
+    caminho_video, _ = _caminhos(media_id)
+    meta = obter_metadados(media_id)
+    if not meta or meta.get("expires_at", 0) < time.time() or not os.path.isfile(caminho_video):
+        return None
+    return caminho_video
+
+
+def remover_midia(media_id: Optional[str]) -> None:
+    if not media_id:
+        return
+    for caminho in _caminhos(media_id):
+        try:
+            os.remove(caminho)
+        except OSError:
+            pass
+
+
+def gerar_url_assinada(media_id: str, ttl: int = MEDIA_URL_TTL) -> str:
+    exp = int(time.time()) + ttl
+    return f"{PUBLIC_BASE_URL}/media/{media_id}?exp={exp}&sig={_assinar(media_id, exp)}"
+
+
+def validar_assinatura(media_id: str, exp: int, sig: str) -> bool:
+    if exp < time.time():
+        return False
+    return hmac.compare_digest(_assinar(media_id, exp), sig or "")
@@ -0,0 +1,39 @@
+"""users
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+
+Baseline. Bancos já em produção têm `users` criada pelo antigo create_all no import
+do main.py: nesse caso só garante a coluna heygen_group_ready.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table("users"):
+        op.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS heygen_group_ready BOOLEAN NOT NULL DEFAULT FALSE")
+        return
+    op.create_table(
+        "users",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("password_hash", sa.String(), nullable=False),
+        sa.Column("evo_instance", sa.String(), nullable=True),
+        sa.Column("heygen_group_id", sa.String(), nullable=True),
+        sa.Column("heygen_group_ready", sa.Boolean(), nullable=False, server_default=sa.false()),
+    )
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_email", table_name="users")
+    op.drop_table("users")
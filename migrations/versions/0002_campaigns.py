@@ -0,0 +1,52 @@
+"""campaigns e campaign_contacts
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+
+Ambientes que subiram com o create_all no import (antes das migrations) já têm as tabelas.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table("campaigns"):
+        return
+    op.create_table(
+        "campaigns",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("origem", sa.String(), nullable=False),
+        sa.Column("palavra_chave", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("total_contatos", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_campaigns_user_id_created_at", "campaigns", ["user_id", "created_at"])
+
+    op.create_table(
+        "campaign_contacts",
+        sa.Column("campaign_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("campaigns.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("posicao", sa.Integer(), primary_key=True),
+        sa.Column("nome", sa.String(), nullable=False),
+        sa.Column("telefone", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("erro", sa.Text(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+    )
+    op.create_index("ix_campaign_contacts_campaign_id_status", "campaign_contacts", ["campaign_id", "status"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_campaign_contacts_campaign_id_status", table_name="campaign_contacts")
+    op.drop_table("campaign_contacts")
+    op.drop_index("ix_campaigns_user_id_created_at", table_name="campaigns")
+    op.drop_table("campaigns")
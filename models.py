@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String
+from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Index, Integer, String, Text, false, func
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 from uuid import uuid4
 from database import Base
@@ -11,3 +11,35 @@ class User(Base):
     password_hash = Column(String, nullable=False)
     evo_instance = Column(String, nullable=True)
     heygen_group_id = Column(String, nullable=True)
+    # treino do heygen_group_id atual já completou (campanhas seguintes pulam a verificação)
+    heygen_group_ready = Column(Boolean, nullable=False, default=False, server_default=false())
+
+class Campaign(Base):
+    __tablename__ = "campaigns"
+    id = Column(PG_UUID(as_uuid=True), primary_key=True, default=uuid4)
+    user_id = Column(PG_UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    origem = Column(String, nullable=False)  # "gerar-videos" | "confirmar-envio"
+    palavra_chave = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="running")  # running | done | failed
+    total_contatos = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        Index("ix_campaigns_user_id_created_at", "user_id", "created_at"),
+    )
+
+class CampaignContact(Base):
+    __tablename__ = "campaign_contacts"
+    # posicao = índice do contato na lista enviada: a chave é conhecida sem RETURNING
+    campaign_id = Column(PG_UUID(as_uuid=True), ForeignKey("campaigns.id", ondelete="CASCADE"), primary_key=True)
+    posicao = Column(Integer, primary_key=True)
+    nome = Column(String, nullable=False)
+    telefone = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="pending")  # pending | sent | failed | skipped
+    erro = Column(Text, nullable=True)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_campaign_contacts_campaign_id_status", "campaign_id", "status"),
+    )
@@ -0,0 +1,351 @@
+# profiling.py
+import asyncio
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+from uuid import uuid4
+
+from services.metrics import LOOP_LAG_SEGUNDOS
+
+logger = logging.getLogger(__name__)
+
+# =========================
+# Config do profiling sob demanda (rotas /admin/profiling, protegidas por ADMIN_TOKEN)
+# =========================
+PROFILING_DIR = os.getenv("PROFILING_DIR", os.path.join(tempfile.gettempdir(), "videosmart_profiles"))
+PROFILING_INTERVALO_MS = float(os.getenv("PROFILING_INTERVALO_MS", "10"))  # período de amostragem das pilhas
+PROFILING_MAX_S = float(os.getenv("PROFILING_MAX_S", "900"))               # teto de uma coleta (e de uma sessão armada)
+PROFILING_MANTER = int(os.getenv("PROFILING_MANTER", "20"))                # sessões (e arquivos) guardadas
+# Event loop parado por mais que isso vira um warning com a pilha de quem travou. 0 desliga o monitor
+LOOP_LAG_LIMIAR_MS = float(os.getenv("LOOP_LAG_LIMIAR_MS", "250"))
+
+# Não contam como "próximas N requests": o próprio admin, health checks e o scrape
+ROTAS_FORA_DO_PROFILING = ("/admin/", "/health/", "/metrics")
+
+_THREADS_PROPRIAS = ("profiler-", "loop-watchdog")
+
+
+class ProfilingEmAndamento(RuntimeError):
+    pass
+
+
+# ---- Pilhas ----
+
+def _nome_frame(frame) -> str:
+    code = frame.f_code
+    arquivo = "/".join(code.co_filename.replace("\\", "/").split("/")[-2:])
+    return f"{code.co_name} ({arquivo})".replace(";", ":")
+
+
+def _pilha(frame, limite: int = 128) -> List[str]:
+    """Frames da raiz até a folha, no formato das pilhas colapsadas."""
+    nomes = []
+    while frame is not None and len(nomes) < limite:
+        nomes.append(_nome_frame(frame))
+        frame = frame.f_back
+    nomes.reverse()
+    return nomes
+
+
+def _ociosa(frame) -> bool:
+    """Thread parada esperando trabalho: loop no select, pool na fila, Event/Condition.wait."""
+    arquivo = frame.f_code.co_filename.replace("\\", "/")
+    if arquivo.endswith("/concurrent/futures/thread.py"):
+        return frame.f_code.co_name == "_worker"  # em _WorkItem.run está executando algo (ex: to_thread de função C)
+    return arquivo.endswith(("/selectors.py", "/threading.py", "/queue.py"))
+
+
+class _Amostrador(threading.Thread):
+    """
+    Lê sys._current_frames() a cada PROFILING_INTERVALO_MS e conta as pilhas de todas as threads:
+    o event loop (raiz "event-loop", com as amostras ociosas em "(ocioso)") e as threads dos pools
+    (asyncio.to_thread, bcrypt...). Sem instrumentar chamadas: o custo é só o da amostragem.
+    """
+
+    def __init__(self, sessao: "SessaoProfiling"):
+        super().__init__(name=f"profiler-{sessao.id}", daemon=True)
+        self.sessao = sessao
+        self.pilhas: Counter = Counter()
+        self.parar = threading.Event()
+
+    def run(self) -> None:
+        intervalo = PROFILING_INTERVALO_MS / 1000
+        fim = time.monotonic() + PROFILING_MAX_S
+        while not self.parar.wait(intervalo) and time.monotonic() < fim:
+            nomes = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                nome = nomes.get(ident, "thread")
+                if nome.startswith(_THREADS_PROPRIAS):
+                    continue
+                if ident == _ident_loop:
+                    pilha = ["event-loop", *(["(ocioso)"] if _ociosa(frame) else _pilha(frame))]
+                elif _ociosa(frame):
+                    continue
+                else:
+                    pilha = [re.sub(r"_\d+$", "", nome), *_pilha(frame)]  # asyncio_3 -> asyncio
+                self.pilhas[";".join(pilha)] += 1
+            self.sessao.amostras += 1
+        _gravar(self.sessao, self.pilhas)
+
+
+# ---- Sessões ----
+
+class SessaoProfiling:
+    """Uma coleta: das próximas `requests` requests ou da campanha/preview `alvo` (armada -> coletando -> concluida)."""
+
+    def __init__(self, requests: int = 0, alvo: Optional[str] = None):
+        self.id = uuid4().hex[:12]
+        self.requests = requests
+        self.alvo = alvo
+        self.status = "armada"
+        self.criada_em = time.time()
+        self.iniciada_em: Optional[float] = None
+        self.concluida_em: Optional[float] = None
+        self.amostras = 0
+        self.arquivo: Optional[str] = None
+        self._iniciadas = 0
+        self._em_voo = 0
+        self._amostrador: Optional[_Amostrador] = None
+
+    def como_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "requests": self.requests or None,
+            "alvo": self.alvo,
+            "criada_em": self.criada_em,
+            "iniciada_em": self.iniciada_em,
+            "concluida_em": self.concluida_em,
+            "amostras": self.amostras,
+            "intervalo_ms": PROFILING_INTERVALO_MS,
+        }
+
+
+_lock = threading.Lock()
+_sessoes: "OrderedDict[str, SessaoProfiling]" = OrderedDict()
+_ativa: Optional[SessaoProfiling] = None
+_jobs_ativos: set = set()
+_ident_loop: Optional[int] = None
+
+
+def _iniciar(sessao: SessaoProfiling) -> None:
+    sessao.status = "coletando"
+    sessao.iniciada_em = time.time()
+    sessao._amostrador = _Amostrador(sessao)
+    sessao._amostrador.start()
+    logger.info("profiling %s: coleta iniciada (requests=%s alvo=%s)", sessao.id, sessao.requests or "-", sessao.alvo or "-")
+
+
+def _encerrar(sessao: SessaoProfiling) -> None:
+    """Com _lock. A gravação do arquivo acontece na thread do amostrador, fora do event loop."""
+    global _ativa
+    if _ativa is sessao:
+        _ativa = None
+    if sessao._amostrador is None:
+        sessao.status = "cancelada"
+        sessao.concluida_em = time.time()
+    elif sessao.status == "coletando":
+        sessao.status = "gravando"
+        sessao._amostrador.parar.set()
+
+
+def _gravar(sessao: SessaoProfiling, pilhas: Counter) -> None:
+    global _ativa
+    caminho = os.path.join(PROFILING_DIR, f"{sessao.id}.folded")
+    try:
+        os.makedirs(PROFILING_DIR, exist_ok=True)
+        with open(caminho + ".part", "w", encoding="utf-8") as f:
+            f.writelines(f"{pilha} {n}\n" for pilha, n in pilhas.most_common())
+        os.replace(caminho + ".part", caminho)
+    except OSError as e:
+        logger.warning("profiling %s: falha ao gravar %s: %s", sessao.id, caminho, e)
+        caminho = None
+    with _lock:
+        if _ativa is sessao:  # parou sozinho por PROFILING_MAX_S
+            _ativa = None
+        sessao.arquivo = caminho
+        sessao.status = "concluida" if caminho else "falhou"
+        sessao.concluida_em = time.time()
+    logger.info("profiling %s: %s (%s amostras, %s pilhas)", sessao.id, sessao.status, sessao.amostras, len(pilhas))
+
+
+def _guardar(sessao: SessaoProfiling) -> None:
+    _sessoes[sessao.id] = sessao
+    while len(_sessoes) > PROFILING_MANTER:
+        _, antiga = _sessoes.popitem(last=False)
+        if antiga.arquivo:
+            try:
+                os.remove(antiga.arquivo)
+            except OSError:
+                pass
+
+
+def armar(requests: int = 0, alvo: Optional[str] = None) -> SessaoProfiling:
+    """
+    Arma uma sessão (uma por worker): coleta das próximas `requests` requests (da primeira a
+    começar até a última terminar) ou enquanto a campanha/preview `alvo` roda neste worker.
+    A amostragem vê o processo inteiro nessa janela, inclusive o que roda em paralelo.
+    """
+    global _ativa, _ident_loop
+    _ident_loop = threading.get_ident()  # chamado de rota async: estamos na thread do loop
+    with _lock:
+        if _ativa is not None:
+            if _ativa.status == "armada" and time.time() - _ativa.criada_em > PROFILING_MAX_S:
+                _encerrar(_ativa)
+            else:
+                raise ProfilingEmAndamento(f"sessão {_ativa.id} ainda {_ativa.status}")
+        sessao = SessaoProfiling(requests=requests, alvo=alvo)
+        _ativa = sessao
+        _guardar(sessao)
+        if alvo and alvo in _jobs_ativos:
+            _iniciar(sessao)
+    return sessao
+
+
+def parar() -> Optional[SessaoProfiling]:
+    """Encerra a sessão ativa; o que já foi amostrado é gravado."""
+    with _lock:
+        sessao = _ativa
+        if sessao is not None:
+            _encerrar(sessao)
+    return sessao
+
+
+def obter(sessao_id: str) -> Optional[SessaoProfiling]:
+    return _sessoes.get(sessao_id)
+
+
+def listar() -> List[Dict[str, Any]]:
+    return [s.como_dict() for s in reversed(_sessoes.values())]
+
+
+@contextmanager
+def request(caminho: str) -> Iterator[None]:
+    """Middleware: conta a request na sessão de "próximas N requests", se houver uma armada."""
+    sessao = _ativa
+    if sessao is None or not sessao.requests or caminho.startswith(ROTAS_FORA_DO_PROFILING):
+        yield
+        return
+    with _lock:
+        contada = sessao is _ativa and sessao._iniciadas < sessao.requests
+        if contada:
+            sessao._iniciadas += 1
+            sessao._em_voo += 1
+            if sessao.status == "armada":
+                _iniciar(sessao)
+    try:
+        yield
+    finally:
+        if contada:
+            with _lock:
+                sessao._em_voo -= 1
+                if sessao is _ativa and sessao._iniciadas >= sessao.requests and sessao._em_voo == 0:
+                    _encerrar(sessao)
+
+
+@contextmanager
+def job(alvo: str) -> Iterator[None]:
+    """Campanha/preview em execução neste worker; inicia/encerra a coleta armada para esse id."""
+    global _ident_loop
+    _ident_loop = threading.get_ident()
+    with _lock:
+        _jobs_ativos.add(alvo)
+        if _ativa is not None and _ativa.alvo == alvo and _ativa.status == "armada":
+            _iniciar(_ativa)
+    try:
+        yield
+    finally:
+        with _lock:
+            _jobs_ativos.discard(alvo)
+            if _ativa is not None and _ativa.alvo == alvo:
+                _encerrar(_ativa)
+
+
+# =========================
+# Monitor do event loop
+# =========================
+
+class _MonitorLoop:
+    """
+    Uma corrotina bate a cada LOOP_LAG_LIMIAR_MS/4 (o atraso de cada sleep vai para
+    videosmart_event_loop_lag_segundos) e uma thread vigia o batimento: parado além do limiar,
+    o loop está preso em código síncrono, e a pilha da thread do loop nesse instante mostra qual.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, limiar_s: float):
+        self.loop = loop
+        self.limiar = limiar_s
+        self.tick = limiar_s / 4
+        self.ident_loop = threading.get_ident()
+        self.batimento = time.monotonic()
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._vigiar, name="loop-watchdog", daemon=True)
+        self._task: Optional[asyncio.Task] = None
+
+    def iniciar(self) -> None:
+        self._task = self.loop.create_task(self._bater())
+        self._thread.start()
+
+    def parar(self) -> None:
+        self._parar.set()
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _bater(self) -> None:
+        while True:
+            inicio = time.monotonic()
+            self.batimento = inicio
+            await asyncio.sleep(self.tick)
+            LOOP_LAG_SEGUNDOS.observe(max(0.0, time.monotonic() - inicio - self.tick))
+
+    def _vigiar(self) -> None:
+        reportado = None
+        while not self._parar.wait(self.tick):
+            batimento = self.batimento
+            travado = time.monotonic() - batimento - self.tick
+            if travado < self.limiar or batimento == reportado:
+                continue
+            reportado = batimento  # um warning por travamento
+            frame = sys._current_frames().get(self.ident_loop)
+            if frame is None:
+                continue
+            try:
+                tarefa = asyncio.current_task(self.loop)
+            except Exception:
+                tarefa = None
+            corrotina = getattr(tarefa.get_coro(), "__qualname__", "-") if tarefa else "-"
+            logger.warning(
+                "event loop travado há %.0fms em %s (task %s, corrotina %s)",
+                travado * 1000, _nome_frame(frame), tarefa.get_name() if tarefa else "-", corrotina,
+                extra={"pilha": "".join(traceback.format_stack(frame, limit=25))},
+            )
+
+
+_monitor: Optional[_MonitorLoop] = None
+
+
+def iniciar_monitor_loop() -> None:
+    """Startup (lifespan): liga o monitor do event loop, se LOOP_LAG_LIMIAR_MS > 0."""
+    global _monitor, _ident_loop
+    _ident_loop = threading.get_ident()
+    if LOOP_LAG_LIMIAR_MS <= 0 or _monitor is not None:
+        return
+    _monitor = _MonitorLoop(asyncio.get_running_loop(), LOOP_LAG_LIMIAR_MS / 1000)
+    _monitor.iniciar()
+
+
+def encerrar() -> None:
+    """Shutdown: para o monitor e grava a sessão em andamento."""
+    global _monitor
+    if _monitor is not None:
+        _monitor.parar()
+        _monitor = None
+    parar()
@@ -2,50 +2,69 @@
 import redis.asyncio as redis
 import orjson
 import os
+from typing import Optional
 from urllib.parse import urlparse
 
-# Suporta REDIS_URL (formato: redis://host:port ou redis://:password@host:port)
-# ou variáveis individuais REDIS_HOST e REDIS_PORT
-REDIS_URL = os.getenv("REDIS_URL")
-if REDIS_URL:
-    # Parse da URL do Redis
-    parsed = urlparse(REDIS_URL)
-    redis_host = parsed.hostname or "localhost"
-    redis_port = parsed.port or 6379
-    redis_password = parsed.password
-    redis_db = int(parsed.path.lstrip("/")) if parsed.path else 0
-    
-    if redis_password:
-        redis_client = redis.Redis(
+# Cliente criado na primeira chamada a get_redis(): importar o módulo não abre
+# conexão nem lê configuração de rede (o pool do redis-py conecta sob demanda).
+_redis: Optional[redis.Redis] = None
+
+
+def _criar_cliente() -> redis.Redis:
+    # Suporta REDIS_URL (formato: redis://host:port ou redis://:password@host:port)
+    # ou variáveis individuais REDIS_HOST e REDIS_PORT
+    REDIS_URL = os.getenv("REDIS_URL")
+    if REDIS_URL:
+        # Parse da URL do Redis
+        parsed = urlparse(REDIS_URL)
+        redis_host = parsed.hostname or "localhost"
+        redis_port = parsed.port or 6379
+        redis_password = parsed.password
+        redis_db = int(parsed.path.lstrip("/")) if parsed.path.lstrip("/") else 0
+
+        return redis.Redis(
             host=redis_host,
             port=redis_port,
             password=redis_password,
             db=redis_db,
             decode_responses=False
         )
-    else:
-        redis_client = redis.Redis(
-            host=redis_host,
-            port=redis_port,
-            db=redis_db,
-            decode_responses=False
-        )
-else:
     # Fallback para variáveis individuais ou localhost
-    redis_host = os.getenv("REDIS_HOST", "localhost")
-    redis_port = int(os.getenv("REDIS_PORT", "6379"))
-    redis_client = redis.Redis(
-        host=redis_host,
-        port=redis_port,
+    return redis.Redis(
+        host=os.getenv("REDIS_HOST", "localhost"),
+        port=int(os.getenv("REDIS_PORT", "6379")),
         decode_responses=False
     )
 
+
+def get_redis() -> redis.Redis:
+    global _redis
+    if _redis is None:
+        _redis = _criar_cliente()
+    return _redis
+
+
+async def fechar_redis() -> None:
+    """Fecha o pool (shutdown do app); um próximo get_redis() cria outro cliente."""
+    global _redis
+    if _redis is not None:
+        cliente, _redis = _redis, None
+        await cliente.aclose()
+
 async def salvar_preview(user_id, data: dict, ttl=3600):
-    await redis_client.setex(f"preview:{user_id}", ttl, orjson.dumps(data))
+    await get_redis().setex(f"preview:{user_id}", ttl, orjson.dumps(data))
 
 async def obter_preview(user_id):
-    data = await redis_client.get(f"preview:{user_id}")
+    data = await get_redis().get(f"preview:{user_id}")
     return orjson.loads(data) if data else None
 
 async def remover_preview(user_id):
-    await redis_client.delete(f"preview:{user_id}")
+    await get_redis().delete(f"preview:{user_id}")
+
+# ---- Jobs de preview (status consultado em GET /previews/{id}) ----
+async def salvar_preview_job(preview_id: str, data: dict, ttl=3600):
+    await get_redis().setex(f"preview_job:{preview_id}", ttl, orjson.dumps(data))
+
+async def obter_preview_job(preview_id: str):
+    data = await get_redis().get(f"preview_job:{preview_id}")
+    return orjson.loads(data) if data else None
@@ -0,0 +1,26 @@
+# services/_lazy.py
+from importlib import import_module
+from typing import Callable, Dict, List, Tuple
+
+
+def exportar_sob_demanda(pacote: str, exports: Dict[str, str]) -> Tuple[Callable, Callable]:
+    """
+    `__getattr__`/`__dir__` de módulo (PEP 562): cada nome de `exports` (nome -> módulo,
+    relativo a `pacote` se começar com ".") só é importado no primeiro acesso.
+    Assim `from services import heygen` não carrega nada e cada papel (API, worker, CLI)
+    paga só pelos módulos que usa.
+    """
+    mod_pacote = import_module(pacote)
+
+    def __getattr__(nome: str):
+        origem = exports.get(nome)
+        if origem is None:
+            raise AttributeError(f"module {pacote!r} has no attribute {nome!r}")
+        valor = getattr(import_module(origem, pacote), nome)
+        setattr(mod_pacote, nome, valor)  # próximos acessos não passam mais por aqui
+        return valor
+
+    def __dir__() -> List[str]:
+        return sorted(set(vars(mod_pacote)) | set(exports))
+
+    return __getattr__, __dir__
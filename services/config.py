@@ -0,0 +1,67 @@
+# services/config.py
+import os
+
+# =====================
+# Config
+# =====================
+# Só variáveis de ambiente: importar não cria clientes, guards nem conexões
+# (esses ficam no client.py de cada pacote: evolution / eleven / heygen).
+
+# ---- Eleven: base só com /api; namespace separado e configurável ----
+API_BASE_ROOT = os.getenv("ELEVEN_NODE_API", "https://api-elevenlabs-nodejs.onrender.com/api").rstrip("/")
+ELEVEN_API_NS = (os.getenv("ELEVEN_API_NAMESPACE", "/elevenlabs") or "").strip()
+ELEVEN_AUTH_URL = os.getenv("ELEVEN_AUTH_URL", "https://api-elevenlabs-nodejs.onrender.com/api/auth/login").strip()
+ELEVEN_USERNAME = os.getenv("ELEVEN_USERNAME", "").strip()
+ELEVEN_PASSWORD = os.getenv("ELEVEN_PASSWORD", "").strip()
+
+# ---- Heygen ----
+HEYGEN_BASE_ROOT = os.getenv("HEYGEN_NODE_API", "https://api-heygen-nodejs.onrender.com/api").rstrip("/")
+HEYGEN_API_NS = (os.getenv("HEYGEN_API_NAMESPACE", "") or "").strip()
+HEYGEN_AUTH_URL = os.getenv("HEYGEN_AUTH_URL", "https://api-heygen-nodejs.onrender.com/api/auth/login").strip()
+HEYGEN_USERNAME = os.getenv("HEYGEN_USERNAME", "").strip()
+HEYGEN_PASSWORD = os.getenv("HEYGEN_PASSWORD", "").strip()
+
+# Dumps de request/response da Heygen em DEBUG (logging_config.py); desligado por padrão
+HEYGEN_DEBUG = os.getenv("HEYGEN_DEBUG", "0").strip() not in ("0", "false", "False", "")
+
+# API de Automação (importação de vozes)
+AUTOMATION_API_BASE = os.getenv("AUTOMATION_API_BASE", "http://localhost:3000").rstrip("/")
+
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "https://webhook.site/150557f8-3946-478e-8013-d5fedf0e56f2")
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "120.0"))
+PALAVRAS_ANTES = int(os.getenv("PALAVRAS_ANTES", "2"))
+PALAVRAS_DEPOIS = int(os.getenv("PALAVRAS_DEPOIS", "0"))
+AJUSTE_MS = int(os.getenv("AJUSTE_MS", "150"))  # ms
+HEYGEN_MIN_VIDEO_DURATION = float(os.getenv("HEYGEN_MIN_VIDEO_DURATION", "5.0"))  # segundos mínimos para o vídeo da Heygen
+# "full": a Heygen renderiza o script inteiro por contato.
+# "splice": renderiza o script base uma vez por campanha e, por contato, só a janela do nome.
+HEYGEN_MODO = os.getenv("HEYGEN_MODO", "full").strip().lower()
+
+# Evolution API
+EVO_BASE_DEFAULT     = os.getenv("EVO_BASE", "http://localhost:8080").rstrip("/")
+EVO_APIKEY_DEFAULT   = os.getenv("EVO_APIKEY", "")
+EVO_INSTANCE_DEFAULT = os.getenv("EVO_INSTANCE", "default")
+EVO_INTEGRATION      = os.getenv("EVO_INTEGRATION", "WHATSAPP-BAILEYS")  # exigido no create
+
+# Rotas oficiais (sem /v1)
+EVO_CREATE_PATH   = "instance/create"        # POST
+EVO_CONNECT_PATH  = "instance/connect"       # GET /instance/connect/{instance}
+EVO_STATUS_PATH   = "instance/connection"    # GET /instance/connection/{instance}
+EVO_DELETE_PATH   = "instances"              # DELETE /instances/{instance}
+
+WHATSAPP_VIDEO_SIZE_LIMIT_BYTES = 100 * 1024 * 1024  # ~100 MB
+SEND_RETRIES = 2
+SEND_BACKOFF_SEC = 2.0
+
+# Ritmo global de chamadas à Heygen (token bucket compartilhado entre workers via Redis)
+HEYGEN_RATE_PER_S = float(os.getenv("HEYGEN_RATE_PER_S", "2.0"))
+HEYGEN_RATE_BURST = int(os.getenv("HEYGEN_RATE_BURST", "5"))
+HEYGEN_MAX_429_RETRIES = int(os.getenv("HEYGEN_MAX_429_RETRIES", "3"))
+
+# Submissão de campanha: jobs de todos os contatos são criados de uma vez (limitados pelo governor)
+HEYGEN_BATCH_PATH = os.getenv("HEYGEN_BATCH_PATH", "").strip().strip("/")  # ex.: "videos/batch" no proxy Node; vazio = POSTs concorrentes
+HEYGEN_BATCH_MAX = int(os.getenv("HEYGEN_BATCH_MAX", "20"))
+HEYGEN_BATCH_WINDOW_S = float(os.getenv("HEYGEN_BATCH_WINDOW_S", "0.2"))
+CAMPANHA_MAX_PARALELO = int(os.getenv("CAMPANHA_MAX_PARALELO", "32"))  # contatos em polling + download ao mesmo tempo
+# Encodes ffmpeg (fallback TTS, overlay do splice) simultâneos: CPU, não I/O, então bem menos que CAMPANHA_MAX_PARALELO
+FFMPEG_MAX_PARALELO = int(os.getenv("FFMPEG_MAX_PARALELO", str(min(4, os.cpu_count() or 1))))
@@ -0,0 +1,13 @@
+# services/eleven/__init__.py
+# ElevenLabs (proxy Node): STT com timestamps e clonagem de voz.
+# Nada é importado aqui: cada nome carrega o seu módulo no primeiro acesso (services/_lazy.py).
+from services._lazy import exportar_sob_demanda
+
+_EXPORTS = {
+    "ELEVEN_GUARD":                     ".client",
+    "transcrever_audio_com_timestamps": ".stt",
+    "verificar_ou_criar_voz":           ".voz",
+}
+
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = exportar_sob_demanda(__name__, _EXPORTS)
@@ -0,0 +1,94 @@
+# services/eleven/client.py
+import asyncio
+import logging
+import random
+
+import httpx
+
+from services.config import (
+    API_BASE_ROOT, ELEVEN_API_NS, ELEVEN_AUTH_URL, ELEVEN_PASSWORD, ELEVEN_USERNAME, HTTP_TIMEOUT,
+)
+from services.metrics import UPSTREAM_RETRIES, rotulo_endpoint
+from services.resilience import criar_guard
+from services.upstream_auth import TokenManager, bearer_de
+
+logger = logging.getLogger(__name__)
+
+# Circuit breaker + concorrência adaptativa
+# (sobrescrevíveis por env: ELEVEN_MAX_CONCURRENCY, ELEVEN_LATENCY_TARGET_S, ELEVEN_INITIAL_CONCURRENCY...)
+ELEVEN_GUARD = criar_guard("eleven", concorrencia_inicial=4, concorrencia_max=8, latencia_alvo=30.0)
+
+# ---- Eleven ----
+_eleven_auth = TokenManager(
+    nome="eleven", rotulo="Eleven", auth_url=ELEVEN_AUTH_URL,
+    username=ELEVEN_USERNAME, password=ELEVEN_PASSWORD,
+    env_user="ELEVEN_USERNAME", env_pass="ELEVEN_PASSWORD", timeout=HTTP_TIMEOUT,
+)
+
+def _eleven_url(path: str) -> str:
+    base = API_BASE_ROOT.rstrip("/")
+    ns = (ELEVEN_API_NS or "").strip()
+    if ns and not ns.startswith("/"):
+        ns = "/" + ns
+    return f"{base}{ns}/{path.lstrip('/')}"
+
+async def _eleven_login(force: bool = False, rejeitado: str | None = None) -> str:
+    return await _eleven_auth.obter(force=force, rejeitado=rejeitado)
+
+async def _eleven_headers(include_json: bool = False) -> dict:
+    token = await _eleven_login()
+    h = {"Authorization": f"Bearer {token}"}
+    if include_json:
+        h["Content-Type"] = "application/json"
+    return h
+
+async def _eleven_request(method: str, url: str, **kwargs) -> httpx.Response:
+    """
+    Faz requisição para a API Eleven com retry para ReadError e timeout configurável.
+    Passa pelo ELEVEN_GUARD: com o circuito aberto falha na hora (sem retries), e o
+    backoff entre tentativas é exponencial com jitter.
+    """
+    # Para uploads/processamento, usa timeout maior (connect + read separados)
+    is_upload = kwargs.get("files") is not None
+    if is_upload:
+        # Timeout maior para uploads: 60s connect + 300s read (5min para processar)
+        timeout = httpx.Timeout(60.0, read=300.0, write=60.0, connect=60.0)
+    else:
+        timeout = HTTP_TIMEOUT
+    
+    max_retries = 3
+    last_error = None
+    
+    for attempt in range(max_retries):
+        try:
+            async with httpx.AsyncClient(timeout=timeout) as client:
+                # uploads (STT/clonagem) são longos por natureza: não entram no sinal de latência
+                async with ELEVEN_GUARD.chamada(medir_latencia=not is_upload, endpoint=rotulo_endpoint(method, url)) as chamada:
+                    resp = await client.request(method, url, **kwargs)
+                    if resp.status_code == 401:
+                        UPSTREAM_RETRIES.labels("eleven", "401").inc()
+                        # Refresh single-flight; não muta o dict de headers do chamador
+                        token = await _eleven_login(force=True, rejeitado=bearer_de(kwargs.get("headers")))
+                        headers = {**(kwargs.get("headers") or {}), "Authorization": f"Bearer {token}"}
+                        resp = await client.request(method, url, **{**kwargs, "headers": headers})
+                    chamada.resultado(resp)
+                resp.raise_for_status()
+                return resp
+        except (httpx.ReadError, httpx.ConnectError, httpx.NetworkError) as e:
+            last_error = e
+            if attempt < max_retries - 1:
+                UPSTREAM_RETRIES.labels("eleven", "conexao").inc()
+                wait_time = (2 ** attempt) * (1.0 + random.random())  # ~1-2s, 2-4s (com jitter)
+                logger.warning("Erro de conexão (tentativa %s/%s): %s. Aguardando %.1fs...", attempt + 1, max_retries, e, wait_time)
+                await asyncio.sleep(wait_time)
+            else:
+                logger.warning("Falha após %s tentativas: %s", max_retries, e)
+                raise
+        except httpx.HTTPStatusError as e:
+            # Erros HTTP não devem ser retentados
+            raise
+    
+    # Se chegou aqui, todas as tentativas falharam
+    if last_error:
+        raise last_error
+    raise RuntimeError("Falha desconhecida na requisição Eleven")
@@ -0,0 +1,184 @@
+# services/eleven/stt.py
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import tempfile
+from typing import Any, List, Tuple
+
+from services.eleven.client import _eleven_headers, _eleven_request, _eleven_url
+from services.metrics import cronometrado
+from services.segment_store import SegmentStore
+
+logger = logging.getLogger(__name__)
+
+
+def _to_seconds(v: Any) -> float | None:
+    if v is None:
+        return None
+    try:
+        x = float(v)
+    except (TypeError, ValueError):
+        return None
+    return x / 1000.0 if x > 10000 else x
+
+@cronometrado("ffmpeg_reducao_ruido")
+def _aplicar_reducao_ruido(caminho_audio: str) -> str:
+    """
+    Aplica um tratamento leve de ruído no áudio usando ffmpeg.
+    - Mantém o áudio mono 16k.
+    - Usa filtros simples (highpass/lowpass) que costumam funcionar bem para voz.
+    - Em caso de erro, retorna o caminho original sem quebrar o fluxo.
+    """
+    if not os.path.isfile(caminho_audio):
+        return caminho_audio
+
+    pasta = os.path.dirname(caminho_audio) or tempfile.gettempdir()
+    caminho_limpo = os.path.join(pasta, "audio_clean.wav")
+
+    try:
+        # Filtro bem conservador: remove ruídos muito graves e muito agudos
+        # sem distorcer demais a voz.
+        subprocess.run([
+            "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+            "-i", caminho_audio,
+            "-ac", "1", "-ar", "16000",
+            "-af", "highpass=f=100, lowpass=f=8000",
+            caminho_limpo
+        ], check=True)
+        return caminho_limpo
+    except Exception as e:
+        # Se qualquer coisa falhar, usa o áudio original
+        logger.warning("falha ao aplicar redução de ruído, usando áudio original: %s", e)
+        return caminho_audio
+
+def _melhorar_transcricao(transcricao: str, segmentos: SegmentStore) -> str:
+    """
+    Faz alguns ajustes simples de pontuação na transcrição:
+      - Usa pausas longas dos segmentos para sugerir fim de frase.
+      - Garante que as frases começam com letra maiúscula.
+      - Garante pontuação final (., ?, !).
+    Tudo é feito de forma conservadora para não "quebrar" o texto original.
+    """
+    if not transcricao:
+        # Se não veio texto da API, tenta reconstruir a partir dos segmentos
+        transcricao = " ".join(segmentos.textos)
+
+    transcricao = (transcricao or "").strip()
+    if not transcricao:
+        return ""
+
+    # Se não temos segmentos suficientes, apenas garante pontuação final
+    if not segmentos or len(segmentos) < 3:
+        if transcricao[-1] not in ".!?":
+            transcricao += "."
+        return transcricao
+
+    # Constrói frases usando gaps de tempo entre as palavras
+    palavras_seg = [(texto, start, end) for texto, start, end in segmentos if texto]
+    if not palavras_seg:
+        if transcricao[-1] not in ".!?":
+            transcricao += "."
+        return transcricao
+
+    frases: List[str] = []
+    atual: List[str] = []
+    ultimo_end = palavras_seg[0][2]
+
+    # Limite de pausa para "quebrar" frase (em segundos)
+    LIMIAR_PAUSA = 1.0
+
+    for palavra, start, end in palavras_seg:
+        gap = start - ultimo_end
+        if gap > LIMIAR_PAUSA and atual:
+            frases.append(" ".join(atual).strip())
+            atual = []
+        atual.append(palavra)
+        ultimo_end = end
+
+    if atual:
+        frases.append(" ".join(atual).strip())
+
+    # Se, por algum motivo, conseguimos apenas 1 frase e o texto original já tinha
+    # alguma pontuação, preferimos manter o original para não piorar.
+    if len(frases) <= 1 and any(c in transcricao for c in ".?!"):
+        texto_final = transcricao
+    else:
+        # Normaliza cada frase: capitaliza primeira letra e garante ponto final
+        frases_norm: List[str] = []
+        for f in frases:
+            f = f.strip()
+            if not f:
+                continue
+            # Capitaliza somente primeira letra visível
+            primeira = f[0].upper()
+            resto = f[1:]
+            f = primeira + resto
+            if f[-1] not in ".!?":
+                f += "."
+            frases_norm.append(f)
+        texto_final = " ".join(frases_norm).strip()
+
+    if texto_final and texto_final[-1] not in ".!?":
+        texto_final += "."
+
+    return texto_final
+
+@cronometrado("stt")
+async def transcrever_audio_com_timestamps(caminho_audio: str) -> Tuple[str, SegmentStore]:
+    """
+    Transcreve o áudio usando a API da ElevenLabs, aplicando:
+      - Tratamento leve de ruídos antes do envio.
+      - Melhoria de pontuação baseada nas pausas detectadas.
+    Em qualquer erro de pré-processamento, volta para o comportamento original.
+    """
+    # 1) Aplica redução de ruído em um arquivo auxiliar (se falhar, usa o original)
+    # (ffmpeg em thread para não travar o event loop enquanto os outros ramos do setup rodam)
+    caminho_para_stt = await asyncio.to_thread(_aplicar_reducao_ruido, caminho_audio)
+
+    with open(caminho_para_stt, "rb") as audio_file:
+        files = {"file": ("original.wav", audio_file, "audio/wav")}
+        headers = await _eleven_headers()
+        response = await _eleven_request(
+            "POST",
+            _eleven_url("speech-to-text?detailed=true"),
+            files=files,
+            headers=headers
+        )
+        try:
+            response_json = response.json()
+        except json.JSONDecodeError:
+            raise ValueError("Resposta da API de transcrição não é um JSON válido.")
+
+    transcricao = (
+        response_json.get("text", "")
+        or response_json.get("transcribed", {}).get("text", "")
+        or ""
+    )
+
+    brutos = (
+        response_json.get("words")
+        or response_json.get("transcribed", {}).get("words")
+        or response_json.get("segments")
+        or []
+    )
+
+    segmentos = SegmentStore.vazio()
+    for w in brutos:
+        if not isinstance(w, dict):
+            continue
+        wtype = w.get("type")
+        if wtype not in (None, "word", "token"):
+            continue
+        text = w.get("text") or w.get("word") or w.get("token")
+        start = _to_seconds(w.get("start") or w.get("startTime") or w.get("start_sec"))
+        end = _to_seconds(w.get("end") or w.get("endTime") or w.get("end_sec"))
+        if not text or start is None or end is None:
+            continue
+        segmentos.adicionar(str(text), float(start), float(end))
+
+    # 2) Ajusta pontuação de forma conservadora, usando os segmentos
+    transcricao = _melhorar_transcricao(transcricao, segmentos)
+
+    return transcricao, segmentos
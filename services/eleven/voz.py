@@ -0,0 +1,57 @@
+# services/eleven/voz.py
+import asyncio
+import logging
+import os
+
+from services.eleven.client import _eleven_headers, _eleven_request, _eleven_url
+from services.heygen.vozes import importar_voz_para_heygen
+from services.media.ffmpeg import _estender_audio_para_cadastro
+from services.metrics import cronometrado
+
+logger = logging.getLogger(__name__)
+
+
+@cronometrado("voz")
+async def verificar_ou_criar_voz(voz_padrao_nome: str, caminho_audio: str, pasta_temp: str) -> str:
+    headers = await _eleven_headers()
+    response = await _eleven_request("GET", _eleven_url("voices"), headers=headers)
+    vozes = response.json()
+    for voz in vozes:
+        if voz.get("name") == voz_padrao_nome:
+            return voz.get("voiceId") or voz.get("voice_id")
+
+    # Estende o áudio para cadastro (1h30min mínimo) apenas para o cadastro da voz
+    caminho_audio_para_cadastro = await asyncio.to_thread(_estender_audio_para_cadastro, caminho_audio, pasta_temp)
+    
+    caminho_convertido = os.path.join(pasta_temp, "converted_audio.wav")
+    with open(caminho_audio_para_cadastro, "rb") as audio_file:
+        files = {"file": ("original.wav", audio_file, "audio/wav")}
+        response = await _eleven_request("POST", _eleven_url("convert-audio"), files=files, headers=headers)
+        with open(caminho_convertido, "wb") as out_file:
+            out_file.write(response.content)
+
+    with open(caminho_convertido, "rb") as converted_file:
+        files = [("file", ("converted_audio.wav", converted_file, "audio/wav"))]
+        data = {"name": voz_padrao_nome, "language": "pt-BR"}
+        response = await _eleven_request(
+            "POST",
+            _eleven_url("add-voice"),
+            data=data,
+            files=files,
+            headers=headers
+        )
+        response_json = response.json()
+        vid = (
+            response_json.get("voiceId")
+            or response_json.get("voice_id")
+            or response_json.get("voice", {}).get("voiceId")
+        )
+        
+        # Após criar a voz, importa para a Heygen
+        if vid:
+            await importar_voz_para_heygen(voz_padrao_nome)
+            # Aguarda 3 segundos para garantir que a importação seja processada antes de buscar
+            logger.info("Aguardando 3 segundos após importação para processamento...")
+            await asyncio.sleep(3.0)
+        
+        return vid
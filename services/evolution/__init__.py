@@ -0,0 +1,20 @@
+# services/evolution/__init__.py
+# Evolution API (WhatsApp): instâncias e envio de mensagens.
+# Nada é importado aqui: cada nome carrega o seu módulo no primeiro acesso (services/_lazy.py).
+from services._lazy import exportar_sob_demanda
+
+_EXPORTS = {
+    "EVO_GUARD":                 ".client",
+    "sanitize_username":         ".instancias",
+    "make_instance_name":        ".instancias",
+    "evo_create_user_instance":  ".instancias",
+    "evo_connect":               ".instancias",
+    "evo_start_session":         ".instancias",
+    "evo_status":                ".instancias",
+    "evo_logout":                ".instancias",
+    "enviar_texto_via_whatsapp": ".mensagens",
+    "enviar_video_via_whatsapp": ".mensagens",
+}
+
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = exportar_sob_demanda(__name__, _EXPORTS)
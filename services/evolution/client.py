@@ -0,0 +1,52 @@
+# services/evolution/client.py
+import httpx
+
+from services.config import EVO_APIKEY_DEFAULT, EVO_BASE_DEFAULT, HTTP_TIMEOUT
+from services.metrics import rotulo_endpoint
+from services.resilience import criar_guard
+
+# Circuit breaker + concorrência adaptativa
+# (sobrescrevíveis por env: EVO_MAX_CONCURRENCY, EVO_LATENCY_TARGET_S, EVO_INITIAL_CONCURRENCY...)
+EVO_GUARD = criar_guard("evo", concorrencia_inicial=4, concorrencia_max=16, latencia_alvo=15.0)
+
+def _evo_headers(include_json: bool = False) -> dict:
+    h = {
+        "apikey": EVO_APIKEY_DEFAULT,
+        "Authorization": f"Bearer {EVO_APIKEY_DEFAULT}",
+    }
+    if include_json:
+        h["Content-Type"] = "application/json"
+    return h
+
+async def _evo_post(path: str, payload: dict, evo_base: str | None = None):
+    url = f"{(evo_base or EVO_BASE_DEFAULT).rstrip('/')}/{path.lstrip('/')}"
+    headers = _evo_headers(include_json=True)
+    async with httpx.AsyncClient(timeout=HTTP_TIMEOUT) as client:
+        async with EVO_GUARD.chamada(endpoint=rotulo_endpoint("POST", url)) as chamada:
+            resp = await client.post(url, headers=headers, json=payload)
+            chamada.resultado(resp)
+        resp.raise_for_status()
+        ct = resp.headers.get("content-type", "")
+        return resp.json() if ct and "application/json" in ct else resp.text
+
+async def _evo_get(path: str, evo_base: str | None = None):
+    url = f"{(evo_base or EVO_BASE_DEFAULT).rstrip('/')}/{path.lstrip('/')}"
+    headers = _evo_headers()
+    async with httpx.AsyncClient(timeout=HTTP_TIMEOUT) as client:
+        async with EVO_GUARD.chamada(endpoint=rotulo_endpoint("GET", url)) as chamada:
+            resp = await client.get(url, headers=headers)
+            chamada.resultado(resp)
+        resp.raise_for_status()
+        ct = resp.headers.get("content-type", "")
+        return resp.json() if ct and "application/json" in ct else resp.text
+
+async def _evo_delete(path: str, evo_base: str | None = None):
+    url = f"{(evo_base or EVO_BASE_DEFAULT).rstrip('/')}/{path.lstrip('/')}"
+    headers = _evo_headers()
+    async with httpx.AsyncClient(timeout=HTTP_TIMEOUT) as client:
+        async with EVO_GUARD.chamada(endpoint=rotulo_endpoint("DELETE", url)) as chamada:
+            resp = await client.delete(url, headers=headers)
+            chamada.resultado(resp)
+        resp.raise_for_status()
+        ct = resp.headers.get("content-type", "")
+        return resp.json() if ct and "application/json" in ct else resp.text
@@ -0,0 +1,147 @@
+# services/evolution/instancias.py
+import json
+import re
+import unicodedata
+from difflib import get_close_matches
+from typing import Any, Dict
+from urllib.parse import quote
+from uuid import UUID
+
+import httpx
+
+from services.config import (
+    EVO_CONNECT_PATH, EVO_CREATE_PATH, EVO_DELETE_PATH, EVO_INTEGRATION, EVO_STATUS_PATH,
+)
+from services.evolution.client import _evo_delete, _evo_get, _evo_post
+
+def sanitize_username(name: str) -> str:
+    if not name:
+        return "user"
+    n = unicodedata.normalize("NFKD", name)
+    n = "".join(c for c in n if not unicodedata.combining(c))
+    n = n.lower()
+    n = re.sub(r"[^a-z0-9]+", "-", n).strip("-")
+    return n or "user"
+
+def make_instance_name(user_name: str, user_id: UUID) -> str:
+    slug = sanitize_username(user_name)
+    return f"{slug}_{user_id}"
+
+# =====================
+# Resolução de instância
+# =====================
+
+async def _evo_list_instances(evo_base: str | None = None) -> list[str]:
+    try:
+        data = await _evo_get("instances", evo_base=evo_base)
+        if isinstance(data, list):
+            out: list[str] = []
+            for it in data:
+                if isinstance(it, str):
+                    out.append(it)
+                elif isinstance(it, dict):
+                    out.append(it.get("instanceName") or it.get("name") or it.get("id") or "")
+            return [x for x in out if x]
+    except Exception:
+        pass
+    return []
+
+async def _evo_resolve_instance_name(candidate: str, evo_base: str | None = None) -> str | None:
+    cand = (candidate or "").strip()
+    if not cand:
+        return None
+    names = await _evo_list_instances(evo_base=evo_base)
+    if not names:
+        return None
+    if cand in names:
+        return cand
+    lower_map = {n.lower(): n for n in names if isinstance(n, str)}
+    if cand.lower() in lower_map:
+        return lower_map[cand.lower()]
+    close = get_close_matches(cand.lower(), list(lower_map.keys()), n=1, cutoff=0.8)
+    if close:
+        return lower_map[close[0]]
+    return None
+
+def _escape_instance(instance: str) -> str:
+    return quote(instance, safe="")
+
+# =====================
+# Criação / conexão / status / logout
+# =====================
+
+async def evo_create_user_instance(user_name: str, user_id: UUID, evo_base: str | None = None) -> Dict[str, Any]:
+    instance_name = make_instance_name(user_name, user_id)
+    payload = {"instanceName": instance_name, "integration": EVO_INTEGRATION, "qrcode": False}
+    try:
+        resp = await _evo_post(EVO_CREATE_PATH, payload, evo_base=evo_base)
+        return {"instance": instance_name, "create": resp}
+    except httpx.HTTPStatusError as e:
+        status = e.response.status_code if e.response else None
+        if status == 403:
+            try:
+                detail = e.response.json()
+            except Exception:
+                detail = {"raw": e.response.text if e.response else str(e)}
+            return {"instance": instance_name, "create": {"__status__": 403, "__error__": True, "response": detail}}
+        elif status == 400:
+            try:
+                detail = e.response.json()
+            except Exception:
+                detail = {"raw": e.response.text if e.response else str(e)}
+            raise RuntimeError(json.dumps({
+                "message": "Falha ao criar instância (verifique EVO_INTEGRATION).",
+                "instanceName": instance_name,
+                "integration_sent": EVO_INTEGRATION,
+                "create_return": detail
+            }, ensure_ascii=False))
+        raise
+
+async def evo_connect(instance: str, evo_base: str | None = None) -> Dict[str, Any] | str:
+    instance_name = (instance or "").strip()
+    if not instance_name:
+        raise ValueError("instance inválida.")
+    esc = _escape_instance(instance_name)
+    try:
+        return await _evo_get(f"{EVO_CONNECT_PATH}/{esc}", evo_base=evo_base)
+    except httpx.HTTPStatusError as e:
+        if e.response is not None and e.response.status_code == 404:
+            resolved = await _evo_resolve_instance_name(instance_name, evo_base=evo_base)
+            if resolved and resolved != instance_name:
+                return await _evo_get(f"{EVO_CONNECT_PATH}/{_escape_instance(resolved)}", evo_base=evo_base)
+            names = await _evo_list_instances(evo_base=evo_base)
+            raise RuntimeError(json.dumps({
+                "message": "Instância não encontrada ao tentar connect(). Verifique o nome/casing.",
+                "instanceName": instance_name,
+                "availableInstances": names
+            }, ensure_ascii=False)) from e
+        raise
+
+async def evo_start_session(instance: str, evo_base: str | None = None):
+    return {"instance": instance, "qr": await evo_connect(instance, evo_base=evo_base)}
+
+async def evo_status(instance: str, evo_base: str | None = None):
+    instance_name = (instance or "").strip()
+    if not instance_name:
+        raise ValueError("instance inválida.")
+    esc = _escape_instance(instance_name)
+    try:
+        return await _evo_get(f"{EVO_STATUS_PATH}/{esc}", evo_base=evo_base)
+    except httpx.HTTPStatusError as e:
+        if e.response is not None and e.response.status_code == 404:
+            resolved = await _evo_resolve_instance_name(instance_name, evo_base=evo_base)
+            if resolved and resolved != instance_name:
+                return await _evo_get(f"{EVO_STATUS_PATH}/{_escape_instance(resolved)}", evo_base=evo_base)
+            names = await _evo_list_instances(evo_base=evo_base)
+            raise RuntimeError(json.dumps({
+                "message": "Instância não encontrada no status(). Verifique o nome exato (case-sensitive).",
+                "instanceName": instance_name,
+                "availableInstances": names
+            }, ensure_ascii=False)) from e
+        raise
+
+async def evo_logout(instance: str, evo_base: str | None = None):
+    instance_name = (instance or "").strip()
+    if not instance_name:
+        raise ValueError("instance inválida.")
+    return await _evo_delete(f"{EVO_DELETE_PATH}/{_escape_instance(instance_name)}", evo_base=evo_base)
@@ -0,0 +1,122 @@
+# services/evolution/mensagens.py
+import asyncio
+import base64
+import os
+
+import httpx
+
+from services.config import (
+    EVO_INSTANCE_DEFAULT, SEND_BACKOFF_SEC, SEND_RETRIES, WHATSAPP_VIDEO_SIZE_LIMIT_BYTES,
+)
+from services.evolution.client import _evo_post
+from services.metrics import UPSTREAM_RETRIES, cronometrado
+
+def _strip_data_uri(s: str) -> str:
+    if not isinstance(s, str):
+        return s
+    marker = ";base64,"
+    idx = s.find(marker)
+    return s[idx + len(marker):] if idx != -1 else s
+
+def _file_to_b64(path: str) -> str:
+    with open(path, "rb") as f:
+        raw = f.read()
+    b64 = base64.b64encode(raw).decode("ascii")
+    b64 = _strip_data_uri(b64)
+    return b64
+
+def _mk_candidates(num: str) -> list[dict]:
+    digits = "".join(ch for ch in (num or "") if ch.isdigit())
+    seen = set()
+    cands: list[dict] = []
+    if digits:
+        plus = f"+{digits}"
+        for n in (plus, digits):
+            if n not in seen:
+                cands.append({"number": n})
+                seen.add(n)
+    return cands or [{"number": num}]
+
+async def enviar_texto_via_whatsapp(
+    telefone: str,
+    texto: str,
+    evo_instance: str | None = None,
+    evo_base: str | None = None
+):
+    destinos = _mk_candidates(telefone)
+    for dst in destinos:
+        payload = {**dst, "text": texto, "options": {"delay": 0, "presence": "composing", "linkPreview": False}}
+        for attempt in range(SEND_RETRIES + 1):
+            try:
+                return await _evo_post(
+                    f"message/sendText/{(evo_instance or EVO_INSTANCE_DEFAULT)}",
+                    payload, evo_base=evo_base
+                )
+            except httpx.HTTPError:
+                if attempt < SEND_RETRIES:
+                    UPSTREAM_RETRIES.labels("evo", "envio").inc()
+                    await asyncio.sleep(SEND_BACKOFF_SEC)
+    raise RuntimeError("Falha ao enviar texto via WhatsApp")
+
+async def _send_media_video(numero: str, caminho_video: str, caption: str,
+                            evo_instance: str | None, evo_base: str | None):
+    file_name = os.path.basename(caminho_video)
+    b64 = _file_to_b64(caminho_video)
+    payload = {
+        "number": numero,
+        "mediatype": "video",
+        "fileName": file_name,
+        "caption": "",  # Sem caption - apenas o vídeo
+        "media": b64,
+        "mimetype": "video/mp4",
+        "isBase64": True,
+        "options": {"delay": 0, "presence": "composing"}
+    }
+    return await _evo_post(f"message/sendMedia/{(evo_instance or EVO_INSTANCE_DEFAULT)}",
+                           payload, evo_base=evo_base)
+
+async def _send_media_document(numero: str, caminho_video: str, caption: str,
+                               evo_instance: str | None, evo_base: str | None):
+    file_name = os.path.basename(caminho_video)
+    b64 = _file_to_b64(caminho_video)
+    payload = {
+        "number": numero,
+        "mediatype": "document",
+        "fileName": file_name,
+        "caption": "",  # Sem caption - apenas o vídeo
+        "media": b64,
+        "mimetype": "video/mp4",
+        "isBase64": True,
+        "options": {"delay": 0, "presence": "composing"}
+    }
+    return await _evo_post(f"message/sendMedia/{(evo_instance or EVO_INSTANCE_DEFAULT)}",
+                           payload, evo_base=evo_base)
+
+@cronometrado("whatsapp_envio")
+async def enviar_video_via_whatsapp(
+    caminho_video: str,
+    telefone: str,
+    caption: str = "",
+    evo_instance: str | None = None,
+    evo_base: str | None = None
+):
+    tamanho = os.path.getsize(caminho_video)
+    prefer_video = tamanho <= WHATSAPP_VIDEO_SIZE_LIMIT_BYTES
+    destinos = _mk_candidates(telefone)
+    last_exc = None
+    for dst in destinos:
+        numero = dst["number"]
+        for attempt in range(SEND_RETRIES + 1):
+            try:
+                if prefer_video:
+                    return await _send_media_video(numero, caminho_video, caption, evo_instance, evo_base)
+                else:
+                    return await _send_media_document(numero, caminho_video, caption, evo_instance, evo_base)
+            except httpx.HTTPError as e:
+                last_exc = e
+                UPSTREAM_RETRIES.labels("evo", "envio").inc()
+                if prefer_video:
+                    prefer_video = False
+                elif attempt < SEND_RETRIES:
+                    await asyncio.sleep(SEND_BACKOFF_SEC)
+    raise last_exc or RuntimeError("Falha ao enviar mídia via WhatsApp")
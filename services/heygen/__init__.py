@@ -0,0 +1,28 @@
+# services/heygen/__init__.py
+# Heygen (proxy Node): vozes, grupos de avatar/treino e render de vídeo.
+# Nada é importado aqui: cada nome carrega o seu módulo no primeiro acesso (services/_lazy.py).
+from services._lazy import exportar_sob_demanda
+
+_EXPORTS = {
+    "heygen_upload_photo":                         ".avatar",
+    "heygen_create_group":                         ".avatar",
+    "heygen_group_add":                            ".avatar",
+    "heygen_group_train":                          ".avatar",
+    "heygen_group_avatars":                        ".avatar",
+    "heygen_verificar_status_treino":              ".avatar",
+    "heygen_aguardar_treino":                      ".avatar",
+    "heygen_find_group_by_name":                   ".avatar",
+    "heygen_delete_group":                         ".avatar",
+    "heygen_verificar_ou_criar_avatar_do_usuario": ".avatar",
+    "HEYGEN_GUARD":                                ".client",
+    "HEYGEN_RATE":                                 ".client",
+    "heygen_criar_video":                          ".video",
+    "heygen_aguardar_video":                       ".video",
+    "importar_voz_para_heygen":                    ".vozes",
+    "heygen_listar_vozes":                         ".vozes",
+    "heygen_buscar_voz_por_nome":                  ".vozes",
+    "heygen_resolver_voz_do_usuario":              ".vozes",
+}
+
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = exportar_sob_demanda(__name__, _EXPORTS)
@@ -0,0 +1,337 @@
+# services/heygen/avatar.py
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+from uuid import UUID
+
+import httpx
+
+from services import heygen_group_cache as group_cache
+from services.heygen.client import (
+    _heygen_headers, _heygen_request, _heygen_url, _log_heygen_error, _unwrap_data,
+)
+from services.heygen_training import aguardar_treino
+from services.media.ffmpeg import _ffmpeg_extrair_frame_meio
+from services.metrics import cronometrado
+from services.rate_limit import retry_after_segundos
+from services.segment_store import SegmentStore
+
+logger = logging.getLogger(__name__)
+
+
+async def heygen_upload_photo(image_path: str) -> str:
+    url = _heygen_url("photo-avatar/upload")
+    headers = await _heygen_headers()
+    try:
+        with open(image_path, "rb") as f:
+            files = {"image": (os.path.basename(image_path), f, "image/jpeg")}
+            resp = await _heygen_request("POST", url, headers=headers, files=files)
+        try:
+            j = resp.json()
+        except Exception:
+            j = {}
+        d = _unwrap_data(j)
+        key = (d.get("image_key") if isinstance(d, dict) else None) or j.get("image_key") or j.get("key") or j.get("id") or resp.text.strip()
+        if not key:
+            raise RuntimeError(f"[Heygen] upload photo falhou: {j or resp.text[:200]!r}")
+        logger.info("upload OK -> image_key=%s", key)
+        return key
+    except Exception as e:
+        _log_heygen_error(e, extra={"image_path": image_path})
+        raise
+
+async def heygen_create_group(name: str, image_key: str) -> str:
+    url = _heygen_url("photo-avatar/group")
+    headers = await _heygen_headers(include_json=True)
+    body = {"name": name, "image_key": image_key}
+    try:
+        resp = await _heygen_request("POST", url, headers=headers, json=body)
+        j = resp.json()
+        d = _unwrap_data(j)
+        gid = (d.get("group_id") if isinstance(d, dict) else None) or (d.get("id") if isinstance(d, dict) else None) or j.get("group_id") or j.get("id")
+        reused = (d.get("reused") if isinstance(d, dict) else None) or j.get("reused", False)
+        
+        if not gid:
+            raise RuntimeError(f"[Heygen] create group sem id: {j!r}")
+        
+        if reused:
+            logger.info("group reutilizado -> id=%s, name=%s", gid, name)
+            # Se foi reutilizado, verifica se tem looks válidos (cache evita listar de novo)
+            estado = await group_cache.obter_estado_grupo(gid)
+            if estado in (group_cache.COMPLETED, group_cache.TRAINING):
+                has_valid = True
+            elif estado == group_cache.BROKEN:
+                has_valid = False
+            else:
+                has_valid = await _heygen_grupo_tem_look_valido(gid, nome=name)
+            if not has_valid:
+                logger.info("Grupo reutilizado não tem looks válidos. Deletando e criando novo com nome único...")
+                try:
+                    await heygen_delete_group(gid)
+                    await group_cache.invalidar_grupo(gid)
+                    # Aguarda um pouco para garantir que foi deletado
+                    await asyncio.sleep(1.0)
+                except Exception as e:
+                    logger.warning("Erro ao deletar grupo reutilizado: %s", e)
+                
+                # Cria com nome único (adiciona timestamp)
+                unique_name = f"{name}_{int(time.time())}"
+                body_unique = {"name": unique_name, "image_key": image_key}
+                resp_unique = await _heygen_request("POST", url, headers=headers, json=body_unique)
+                j_unique = resp_unique.json()
+                d_unique = _unwrap_data(j_unique)
+                gid = (d_unique.get("group_id") if isinstance(d_unique, dict) else None) or (d_unique.get("id") if isinstance(d_unique, dict) else None) or j_unique.get("group_id") or j_unique.get("id")
+                if not gid:
+                    raise RuntimeError(f"[Heygen] create group (único) sem id: {j_unique!r}")
+                logger.info("group OK (novo) -> id=%s, name=%s", gid, unique_name)
+                await group_cache.salvar_estado_grupo(gid, group_cache.TRAINING, nome=name)
+        else:
+            logger.info("group OK -> id=%s, name=%s", gid, name)
+            await group_cache.salvar_estado_grupo(gid, group_cache.TRAINING, nome=name)
+        return gid
+    except Exception as e:
+        _log_heygen_error(e, extra={"body": body})
+        raise
+
+async def heygen_group_add(group_id: str, image_keys: List[str]) -> None:
+    url = _heygen_url(f"photo-avatar/group/{group_id}/add")
+    headers = await _heygen_headers(include_json=True)
+    body = {"image_keys": image_keys}
+    try:
+        resp = await _heygen_request("POST", url, headers=headers, json=body)
+        _ = resp.json() if resp.headers.get("content-type","").startswith("application/json") else None
+        logger.info("group add OK -> group_id=%s, added=%s", group_id, len(image_keys))
+    except Exception as e:
+        _log_heygen_error(e, extra={"group_id": group_id, "body": body})
+        raise
+
+async def heygen_group_train(group_id: str, max_retries: int = 10, retry_delay: float = 3.0) -> Dict[str, Any]:
+    """
+    Inicia o treinamento do grupo de forma assíncrona (waitForCompleted=false).
+    Retorna a resposta completa (pode ser job_id, status, etc) para guardar no Redis.
+    Se der erro 409 (fotos não processadas), tenta novamente após aguardar.
+    Continua tentando até conseguir iniciar o treino ou esgotar todas as tentativas.
+    Levanta exceção apenas se não conseguir iniciar após todas as tentativas.
+    """
+    url = _heygen_url(f"photo-avatar/group/{group_id}/train?waitForCompleted=true")
+    headers = await _heygen_headers()
+    
+    for attempt in range(max_retries):
+        try:
+            resp = await _heygen_request("POST", url, headers=headers)
+            try:
+                j = resp.json()
+            except Exception:
+                j = {}
+            
+            d = _unwrap_data(j)
+            # Retorna a resposta completa (pode ser dict ou string)
+            result = d if isinstance(d, dict) else (j if isinstance(j, dict) else {"raw": resp.text})
+            
+            logger.info("train iniciado -> group_id=%s, resposta=%s (tentativa %s/%s)", group_id, result, attempt + 1, max_retries)
+            return result
+        except httpx.HTTPStatusError as e:
+            # Erro 409: fotos ainda não processadas
+            if e.response.status_code == 409:
+                if attempt < max_retries - 1:
+                    # Respeita Retry-After se vier; senão backoff exponencial a partir de retry_delay
+                    espera = retry_after_segundos(e.response) or min(15.0, retry_delay * (1.5 ** attempt))
+                    logger.info("Fotos ainda não processadas (tentativa %s/%s). Aguardando %.1fs...", attempt + 1, max_retries, espera)
+                    await asyncio.sleep(espera)
+                    continue
+                else:
+                    error_body = {}
+                    try:
+                        error_body = e.response.json()
+                    except:
+                        error_body = {"error": str(e)}
+                    error_msg = error_body.get("error", "Erro desconhecido")
+                    logger.error("Não foi possível iniciar treino após %s tentativas: %s", max_retries, error_msg)
+                    raise RuntimeError(f"Não foi possível iniciar treino após {max_retries} tentativas: {error_msg}")
+            # Outros erros HTTP são propagados
+            _log_heygen_error(e, extra={"group_id": group_id})
+            raise
+        except Exception as e:
+            # Se não for HTTPStatusError, verifica se é o último attempt
+            if attempt < max_retries - 1:
+                logger.warning("Erro ao iniciar treino (tentativa %s/%s): %s. Aguardando %ss...", attempt + 1, max_retries, e, retry_delay)
+                await asyncio.sleep(retry_delay)
+                continue
+            _log_heygen_error(e, extra={"group_id": group_id})
+            raise
+    
+    # Se chegou aqui, esgotou todas as tentativas
+    raise RuntimeError(f"Não foi possível iniciar treino após {max_retries} tentativas")
+
+async def heygen_group_avatars(group_id: str) -> List[dict]:
+    url = _heygen_url(f"photo-avatar/group/{group_id}/avatars")
+    headers = await _heygen_headers()
+    try:
+        resp = await _heygen_request("GET", url, headers=headers)
+        raw = resp.json() if resp.headers.get("content-type","").startswith("application/json") else []
+        items = _unwrap_data(raw)
+        if not isinstance(items, list) and isinstance(items, dict) and "items" in items:
+            items = items["items"]
+        logger.info("avatars OK -> group_id=%s, total=%s", group_id, len(items) if isinstance(items, list) else 'n/a')
+        return items if isinstance(items, list) else []
+    except Exception as e:
+        _log_heygen_error(e, extra={"group_id": group_id})
+        raise
+
+async def _heygen_grupo_tem_look_valido(group_id: str, nome: Optional[str] = None) -> bool:
+    """Lista os looks do grupo e grava no cache se ele está utilizável (completed) ou não (broken)."""
+    avatars = await heygen_group_avatars(group_id)
+    valido = any((av.get("status") or "").lower() == "completed" for av in avatars or [])
+    await group_cache.salvar_estado_grupo(group_id, group_cache.COMPLETED if valido else group_cache.BROKEN, nome=nome)
+    return valido
+
+async def heygen_verificar_status_treino(group_id: str) -> bool:
+    """
+    Verifica se o treino está pronto usando a rota correta:
+    GET /photo-avatar/train/status/{groupId}
+    Retorna True se status == "ready"
+    """
+    url = _heygen_url(f"photo-avatar/train/status/{group_id}")
+    headers = await _heygen_headers()
+
+    try:
+        resp = await _heygen_request("GET", url, headers=headers)
+        data = resp.json() if resp.headers.get("content-type", "").startswith("application/json") else {}
+
+        status = (
+            data.get("status")
+            or data.get("data", {}).get("status")
+            or data.get("result", {}).get("status")
+        )
+
+        logger.info("Status do treino para group_id=%s: %s", group_id, status)
+
+        return str(status).lower() == "ready"
+
+    except Exception as e:
+        _log_heygen_error(e, extra={"group_id": group_id})
+        return False
+
+async def heygen_aguardar_treino(
+    group_id: str,
+    user_id: Optional[UUID] = None,
+    save_ready_async: Optional[Callable[[UUID, str], Any]] = None,
+) -> bool:
+    """
+    Aguarda o treino do grupo (watcher único por group_id, backoff + deadline).
+    Quando fica pronto, persiste via save_ready_async(user_id, group_id) para que as
+    próximas campanhas nem precisem verificar.
+    """
+    async def on_pronto(gid: str):
+        await group_cache.salvar_estado_grupo(gid, group_cache.COMPLETED)
+        if user_id and save_ready_async:
+            await save_ready_async(user_id, gid)
+    return await aguardar_treino(group_id, heygen_verificar_status_treino, on_pronto=on_pronto)
+
+async def heygen_find_group_by_name(name: str) -> Optional[str]:
+    """
+    Melhor esforço: se o backend expuser lista de grupos (/photo-avatar/groups) filtramos por nome.
+    """
+    try:
+        url = _heygen_url("photo-avatar/groups")
+        headers = await _heygen_headers()
+        resp = await _heygen_request("GET", url, headers=headers)
+        raw = resp.json() if resp.headers.get("content-type","").startswith("application/json") else []
+        items = _unwrap_data(raw)
+        if not isinstance(items, list) and isinstance(items, dict) and "items" in items:
+            items = items["items"]
+        for g in items or []:
+            if (g.get("name") or "").strip() == name:
+                gid = g.get("group_id") or g.get("id")
+                logger.info("group found by name -> %s = %s", name, gid)
+                return gid
+    except Exception as e:
+        _log_heygen_error(e, extra={"name": name})
+    return None
+
+async def heygen_delete_group(group_id: str) -> None:
+    """
+    Deleta um grupo de avatares da Heygen.
+    """
+    url = _heygen_url(f"photo-avatar/group/{group_id}")
+    headers = await _heygen_headers()
+    try:
+        resp = await _heygen_request("DELETE", url, headers=headers)
+        await group_cache.invalidar_grupo(group_id)
+        logger.info("group deleted -> group_id=%s", group_id)
+    except Exception as e:
+        _log_heygen_error(e, extra={"group_id": group_id})
+        raise
+
+@cronometrado("avatar")
+async def heygen_verificar_ou_criar_avatar_do_usuario(
+    user_group_name: str,
+    source_video: Optional[str] = None,
+    segmentos: Optional[SegmentStore] = None,
+    palavra_chave: Optional[str] = None,
+    pasta_temp: Optional[str] = None,
+    num_fotos: int = 10,
+    source_image: Optional[str] = None,
+    existing_group_id: Optional[str] = None,
+    user_id: Optional[UUID] = None,
+    save_group_id_async: Optional[Callable[[UUID, str], Any]] = None,
+) -> str:
+    """
+    Retorna group_id do avatar do usuário.
+    Se o grupo existir e tiver avatares válidos (status="completed"), retorna o group_id.
+    Se não existir ou não tiver avatares válidos, cria um novo grupo e retorna o group_id.
+    O estado do grupo fica em cache (Redis): sem mudanças, o setup não faz nenhuma chamada à Heygen.
+    """
+    group_id = (
+        existing_group_id
+        or await group_cache.obter_grupo_por_nome(user_group_name)
+        or await heygen_find_group_by_name(user_group_name)
+    )
+
+    # Se grupo existe, verificar se tem avatares válidos
+    if group_id:
+        estado = await group_cache.obter_estado_grupo(group_id)
+        if estado in (group_cache.COMPLETED, group_cache.TRAINING):
+            logger.info("Grupo %s em cache (status=%s)", group_id, estado)
+            return group_id
+
+        if estado != group_cache.BROKEN and await _heygen_grupo_tem_look_valido(group_id, nome=user_group_name):
+            logger.info("Grupo %s tem avatar válido (status=completed)", group_id)
+            return group_id
+        
+        # Se não tem avatar válido, deleta o grupo antigo para criar um novo
+        logger.info("Grupo %s existe mas não tem avatares válidos. Deletando e criando novo...", group_id)
+        try:
+            await heygen_delete_group(group_id)
+        except Exception as e:
+            logger.warning("Erro ao deletar grupo antigo (pode não existir): %s", e)
+        group_id = None
+
+    # Se não existe grupo ou foi deletado, criar novo
+    if not group_id:
+        if source_image:
+            image_path = source_image
+        elif source_video and pasta_temp:
+            image_path = _ffmpeg_extrair_frame_meio(source_video, pasta_temp)
+        else:
+            raise ValueError("É necessário fornecer source_image ou source_video para criar o avatar.")
+
+        # Upload da imagem + cria grupo
+        first_key = await heygen_upload_photo(image_path)
+        group_id = await heygen_create_group(user_group_name, first_key)
+
+        logger.info("Grupo criado: %s", group_id)
+        if user_id and save_group_id_async:
+            try:
+                await save_group_id_async(user_id, group_id)
+            except Exception as e:
+                logger.warning("falha ao persistir group_id para usuário %s: %s", user_id, e)
+        # Aguarda um pouco para a foto ser processada pela Heygen antes de tentar treinar
+        logger.info("Aguardando processamento da foto (5s)...")
+        await asyncio.sleep(5.0)
+        return group_id
+
+    # Fallback: retorna o group_id existente
+    return group_id
@@ -0,0 +1,223 @@
+# services/heygen/client.py
+import json
+import logging
+from typing import Any
+
+import httpx
+
+from services.config import (
+    HEYGEN_API_NS, HEYGEN_AUTH_URL, HEYGEN_BASE_ROOT, HEYGEN_MAX_429_RETRIES,
+    HEYGEN_PASSWORD, HEYGEN_RATE_BURST, HEYGEN_RATE_PER_S, HEYGEN_USERNAME, HTTP_TIMEOUT,
+)
+from services.metrics import UPSTREAM_RETRIES, rotulo_endpoint
+from services.rate_limit import RateGovernor
+from services.resilience import criar_guard
+from services.upstream_auth import TokenManager, bearer_de
+
+logger = logging.getLogger(__name__)
+
+# Circuit breaker + concorrência adaptativa
+# (sobrescrevíveis por env: HEYGEN_MAX_CONCURRENCY, HEYGEN_LATENCY_TARGET_S, HEYGEN_INITIAL_CONCURRENCY...)
+HEYGEN_GUARD = criar_guard("heygen", concorrencia_inicial=4, concorrencia_max=16, latencia_alvo=15.0)
+
+# Ritmo global de chamadas à Heygen (token bucket compartilhado entre workers via Redis)
+HEYGEN_RATE = RateGovernor("heygen", taxa=HEYGEN_RATE_PER_S, rajada=HEYGEN_RATE_BURST)
+
+# =====================
+# Logs
+# =====================
+
+def _mask(s: str | None) -> str:
+    if not s:
+        return ""
+    if len(s) <= 12:
+        return "*" * len(s)
+    return s[:6] + "..." + s[-4:]
+
+def _safe_json_dump(obj: Any, max_len: int = 4000) -> str:
+    try:
+        out = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+    except Exception:
+        out = str(obj)
+    if len(out) > max_len:
+        return out[:max_len] + f"... (truncado, {len(out)-max_len} chars)"
+    return out
+
+# Dumps de request/response só em DEBUG (HEYGEN_DEBUG=1 ou LOG_LEVEL=DEBUG): o isEnabledFor evita
+# serializar payloads e bodies de todas as chamadas quando o nível não vai emitir nada.
+
+def _log_heygen_request(method: str, url: str, headers: dict | None, json_body: Any = None, data: Any = None, files: Any = None):
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    dump: dict[str, Any] = {}
+    if headers:
+        redacted = {**headers}
+        if "Authorization" in redacted:
+            tok = (redacted["Authorization"] or "")
+            tok = tok.replace("Bearer", "").strip()
+            redacted["Authorization"] = f"Bearer {_mask(tok)}"
+        dump["headers"] = redacted
+    if json_body is not None:
+        dump["json"] = json_body
+    if data is not None:
+        dump["data"] = data
+    if files is not None:
+        try:
+            if isinstance(files, dict):
+                dump["files"] = {k: (v[0] if isinstance(v, (list, tuple)) else getattr(v, "name", None)) for k, v in files.items()}
+            else:
+                dump["files"] = str(type(files))
+        except Exception:
+            dump["files"] = "<unlogged>"
+    logger.debug("request %s %s %s", method, url, _safe_json_dump(dump))
+
+def _log_heygen_response(resp: httpx.Response):
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    try:
+        ct = resp.headers.get("content-type", "")
+        body = resp.json() if "application/json" in ct else resp.text
+        logger.debug("response status=%s body=%s", resp.status_code, _safe_json_dump(body))
+    except Exception as e:
+        logger.debug("response status=%s <erro ao logar resposta: %s>", resp.status_code, e)
+
+def _log_heygen_error(e: Exception, extra: dict | None = None):
+    # Warning curto (ids e status); payloads e body da resposta só em DEBUG
+    status = None
+    if isinstance(e, httpx.HTTPStatusError) and e.response is not None:
+        status = e.response.status_code
+    ids = {k: v for k, v in (extra or {}).items() if isinstance(v, (str, int, float)) and len(str(v)) <= 200}
+    logger.warning("erro Heygen status=%s %s: %r", status, " ".join(f"{k}={v}" for k, v in ids.items()), e)
+    if logger.isEnabledFor(logging.DEBUG):
+        if extra:
+            logger.debug("erro Heygen extra=%s", _safe_json_dump(extra))
+        if status is not None:
+            _log_heygen_response(e.response)
+
+# =====================
+# Auth + requisições
+# =====================
+
+# ---- Heygen ----
+_heygen_auth = TokenManager(
+    nome="heygen", rotulo="Heygen", auth_url=HEYGEN_AUTH_URL,
+    username=HEYGEN_USERNAME, password=HEYGEN_PASSWORD,
+    env_user="HEYGEN_USERNAME", env_pass="HEYGEN_PASSWORD", timeout=HTTP_TIMEOUT,
+)
+
+def _heygen_url(path: str) -> str:
+    """
+    Monta a URL da Heygen.
+    Os endpoints públicos do Swagger ficam diretamente em /api/<path> (sem namespace extra).
+    Se HEYGEN_API_NS estiver vazio, usamos direto.
+    Se vier um namespace por engano, ignoramos para rotas conhecidas.
+    """
+    base = HEYGEN_BASE_ROOT.rstrip("/")  # ex: https://api-heygen-nodejs.onrender.com/api
+    p = path.lstrip("/")
+    ns = (HEYGEN_API_NS or "").strip()
+
+    # Rotas que NÃO usam namespace (conforme Swagger)
+    # Adicionado "voices" para usar a rota correta: /api/voices
+    no_ns_prefixes = ("photo-avatar", "videos", "auth", "voices")
+    if not ns or p.startswith(no_ns_prefixes):
+        return f"{base}/{p}"
+
+    if not ns.startswith("/"):
+        ns = "/" + ns
+    return f"{base}{ns}/{p}"
+
+async def _heygen_login(force: bool = False, rejeitado: str | None = None) -> str:
+    return await _heygen_auth.obter(force=force, rejeitado=rejeitado)
+
+async def _heygen_headers(include_json: bool = False) -> dict:
+    token = await _heygen_login()
+    h = {"Authorization": f"Bearer {token}"}
+    if include_json:
+        h["Content-Type"] = "application/json"
+    return h
+
+def _rebobinar_arquivos(files: Any) -> None:
+    """Volta os arquivos de um multipart ao início para reenviar a requisição."""
+    itens = files.values() if isinstance(files, dict) else (files or [])
+    for item in itens:
+        if isinstance(item, (list, tuple)) and len(item) == 2 and isinstance(item[1], (list, tuple)):
+            item = item[1]  # formato [("campo", (nome, arquivo, mime))]
+        arquivo = item[1] if isinstance(item, (list, tuple)) and len(item) > 1 else item
+        if hasattr(arquivo, "seek"):
+            try:
+                arquivo.seek(0)
+            except Exception:
+                pass
+
+async def _heygen_request(method: str, url: str, **kwargs) -> httpx.Response:
+    """
+    Wrapper com logs detalhados + refresh de token em 401.
+    Passa pelo HEYGEN_RATE (ritmo global + Retry-After/429, com retry) e pelo
+    HEYGEN_GUARD (circuit breaker + concorrência adaptativa).
+    """
+    try:
+        _log_heygen_request(
+            method=method,
+            url=url,
+            headers=kwargs.get("headers"),
+            json_body=kwargs.get("json"),
+            data=kwargs.get("data"),
+            files=kwargs.get("files"),
+        )
+    except Exception:
+        pass
+
+    endpoint = rotulo_endpoint(method, url)
+    async with httpx.AsyncClient(timeout=HTTP_TIMEOUT) as client:
+        try:
+            for tentativa in range(HEYGEN_MAX_429_RETRIES + 1):
+                if tentativa:
+                    _rebobinar_arquivos(kwargs.get("files"))
+                await HEYGEN_RATE.adquirir()
+                async with HEYGEN_GUARD.chamada(endpoint=endpoint) as chamada:
+                    resp = await client.request(method, url, **kwargs)
+                    if resp.status_code == 401:
+                        UPSTREAM_RETRIES.labels("heygen", "401").inc()
+                        # Refresh single-flight; não muta o dict de headers do chamador
+                        token = await _heygen_login(force=True, rejeitado=bearer_de(kwargs.get("headers")))
+                        headers = {**(kwargs.get("headers") or {}), "Authorization": f"Bearer {token}"}
+                        kwargs = {**kwargs, "headers": headers}
+
+                        _log_heygen_request(
+                            method=method,
+                            url=url,
+                            headers=kwargs.get("headers"),
+                            json_body=kwargs.get("json"),
+                            data=kwargs.get("data"),
+                            files=kwargs.get("files"),
+                        )
+
+                        _rebobinar_arquivos(kwargs.get("files"))
+                        await HEYGEN_RATE.adquirir()
+                        resp = await client.request(method, url, **kwargs)
+                    chamada.resultado(resp)
+
+                # 429 / janela esgotada: o governor pausa o bucket (todos os workers) e tentamos de novo
+                pausa = await HEYGEN_RATE.observar(resp, tentativa)
+                if resp.status_code == 429 and tentativa < HEYGEN_MAX_429_RETRIES:
+                    UPSTREAM_RETRIES.labels("heygen", "429").inc()
+                    logger.warning("429 em %s %s (tentativa %s/%s), aguardando %.1fs", method, url, tentativa + 1, HEYGEN_MAX_429_RETRIES + 1, pausa)
+                    continue
+                break
+
+            _log_heygen_response(resp)
+            resp.raise_for_status()
+            return resp
+
+        except Exception as e:
+            _log_heygen_error(e, extra={"url": url, "method": method})
+            raise
+
+def _unwrap_data(j: Any) -> Any:
+    """Se a resposta vier como {'data': {...}}, devolve o conteúdo de data; caso contrário, devolve j."""
+    try:
+        if isinstance(j, dict) and "data" in j and j["data"] is not None:
+            return j["data"]
+    except Exception:
+        pass
+    return j
@@ -0,0 +1,252 @@
+# services/heygen/video.py
+import asyncio
+import contextlib
+import logging
+import os
+import time
+from typing import AsyncContextManager, Callable, List, Optional, Tuple
+
+import httpx
+from opentelemetry import trace
+
+from services import render_cache
+from services.config import HEYGEN_BATCH_MAX, HEYGEN_BATCH_PATH, HEYGEN_BATCH_WINDOW_S, HTTP_TIMEOUT
+from services.heygen.client import (
+    _heygen_headers, _heygen_request, _heygen_url, _log_heygen_error, _unwrap_data,
+)
+from services.metrics import ETAPA_SEGUNDOS, etapa
+
+logger = logging.getLogger(__name__)
+
+async def heygen_criar_video(group_id: str, voice_id: str, script: str, test: bool = True) -> str:
+    """
+    Cria job de vídeo e retorna jobId.
+    Payload: {"talking_photo_id": "...", "voice_id": "...", "script": "..."}
+    O campo talking_photo_id recebe o group_id (os IDs são os mesmos).
+    
+    Resposta esperada:
+    {
+      "message": "Job criado",
+      "jobId": "ab3000cd-4202-4f0b-93fc-4443645f7c0c",
+      "heygenVideoId": "faa5d078ea34401194049b9fd26a9a06"
+    }
+    
+    Retorna o jobId para usar em GET /videos/{jobId}
+    Com HEYGEN_BATCH_PATH configurado, jobs criados ao mesmo tempo vão juntos num único POST.
+    """
+    # Payload em snake_case: talking_photo_id recebe o group_id
+    payload = {
+        "talking_photo_id": str(group_id).strip(),
+        "voice_id": str(voice_id).strip(),
+        "script": str(script).strip(),
+        "test": False
+    }
+    if HEYGEN_BATCH_PATH and _LOTE_HEYGEN.ativo:
+        return await _LOTE_HEYGEN.submeter(payload)
+    return await _heygen_criar_video_unitario(payload)
+
+async def _heygen_criar_video_unitario(payload: dict) -> str:
+    url = _heygen_url("videos")
+    headers = await _heygen_headers(include_json=True)
+    try:
+        resp = await _heygen_request("POST", url, headers=headers, json=payload)
+        j = resp.json() if resp.headers.get("content-type","").startswith("application/json") else {}
+        d = _unwrap_data(j)
+        # Extrai jobId da resposta (pode estar em data ou diretamente)
+        job_id = (d.get("jobId") if isinstance(d, dict) else None) or j.get("jobId") or j.get("id")
+        if not job_id:
+            raise RuntimeError(f"[Heygen] POST /videos sem jobId: {j!r}")
+        logger.info("video job OK -> jobId=%s", job_id)
+        return job_id
+    except Exception as e:
+        _log_heygen_error(e, extra={"payload": payload})
+        raise
+
+class _LoteHeygen:
+    """
+    Agrupa criações de job que chegam dentro de HEYGEN_BATCH_WINDOW_S (até HEYGEN_BATCH_MAX)
+    num único POST em HEYGEN_BATCH_PATH: {"items": [payload, ...]} -> lista de {jobId} na mesma ordem.
+    Se o proxy não tiver o endpoint (404/405), desliga o lote e volta aos POSTs individuais.
+    """
+
+    def __init__(self):
+        self.ativo = True
+        self._pendentes: List[Tuple[dict, "asyncio.Future[str]"]] = []
+        self._timer: Optional[asyncio.Task] = None
+        self._envios: set = set()  # referência às tasks de envio (evita GC no meio do POST)
+
+    async def submeter(self, payload: dict) -> str:
+        fut = asyncio.get_running_loop().create_future()
+        self._pendentes.append((payload, fut))
+        if len(self._pendentes) >= HEYGEN_BATCH_MAX:
+            self._disparar()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._disparar_apos_janela())
+        return await fut
+
+    async def _disparar_apos_janela(self) -> None:
+        await asyncio.sleep(HEYGEN_BATCH_WINDOW_S)
+        self._timer = None
+        self._disparar()
+
+    def _disparar(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        lote, self._pendentes = self._pendentes, []
+        if lote:
+            task = asyncio.create_task(self._enviar(lote))
+            self._envios.add(task)
+            task.add_done_callback(self._envios.discard)
+
+    async def _enviar(self, lote: List[Tuple[dict, "asyncio.Future[str]"]]) -> None:
+        try:
+            job_ids = await self._post_lote([payload for payload, _ in lote])
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code not in (404, 405):
+                for _, fut in lote:
+                    if not fut.done():
+                        fut.set_exception(e)
+                return
+            logger.warning("Endpoint de lote indisponível (%s); usando POSTs individuais", e.response.status_code)
+            self.ativo = False
+            job_ids = [None] * len(lote)
+        except Exception as e:
+            for _, fut in lote:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+
+        async def _individual(payload: dict, fut: "asyncio.Future[str]") -> None:
+            try:
+                fut.set_result(await _heygen_criar_video_unitario(payload))
+            except Exception as e:
+                fut.set_exception(e)
+
+        individuais = []
+        for (payload, fut), job_id in zip(lote, job_ids):
+            if fut.done():
+                continue
+            if job_id:
+                fut.set_result(job_id)
+            else:
+                individuais.append(_individual(payload, fut))
+        await asyncio.gather(*individuais)
+
+    async def _post_lote(self, payloads: List[dict]) -> List[Optional[str]]:
+        url = _heygen_url(HEYGEN_BATCH_PATH)
+        headers = await _heygen_headers(include_json=True)
+        resp = await _heygen_request("POST", url, headers=headers, json={"items": payloads})
+        j = resp.json() if resp.headers.get("content-type", "").startswith("application/json") else {}
+        itens = _unwrap_data(j)
+        if isinstance(itens, dict):
+            itens = itens.get("items") or itens.get("jobs") or []
+        job_ids: List[Optional[str]] = []
+        for i in range(len(payloads)):
+            item = itens[i] if isinstance(itens, list) and i < len(itens) else None
+            job_ids.append((item.get("jobId") or item.get("id")) if isinstance(item, dict) else None)
+        logger.info("lote OK -> %s/%s jobs criados", sum(1 for x in job_ids if x), len(payloads))
+        return job_ids
+
+_LOTE_HEYGEN = _LoteHeygen()
+
+_STATUS_NA_FILA = {"", "PENDING", "QUEUED", "WAITING"}
+
+async def heygen_aguardar_video(job_id: str, sleep: float = 3.0, max_sleep: float = 20.0) -> str:
+    """
+    Faz polling em GET /videos/{jobId} até COMPLETED e retorna a URL para download (video_url).
+    Usa o jobId retornado por heygen_criar_video.
+    
+    O rate limit é responsabilidade do HEYGEN_RATE (em _heygen_request), então não há mais
+    espera fixa inicial: o intervalo começa em `sleep` e cresce 1.5x até `max_sleep`.
+    """
+    url = _heygen_url(f"videos/{job_id}")
+    headers = await _heygen_headers()
+    intervalo = sleep
+    inicio = time.perf_counter()
+    na_fila = True  # até o job sair da fila da Heygen (heygen_fila no /metrics)
+    status_anterior = None
+
+    while True:
+        try:
+            resp = await _heygen_request("GET", url, headers=headers)
+            j = resp.json() if resp.headers.get("content-type","").startswith("application/json") else {}
+            d = _unwrap_data(j)
+            st = ((d.get("status") if isinstance(d, dict) else None) or j.get("status") or "").upper()
+            # Mudança de status em INFO; o mesmo status repetido é ruído de polling (DEBUG, amostrado)
+            if st != status_anterior:
+                logger.info("poll job=%s status=%s", job_id, st)
+                status_anterior = st
+            else:
+                logger.debug("poll job=%s status=%s (próximo em %.1fs)", job_id, st, intervalo, extra={"amostra": "heygen_poll"})
+            if na_fila and st not in _STATUS_NA_FILA:
+                na_fila = False
+                ETAPA_SEGUNDOS.labels("heygen_fila", "ok").observe(time.perf_counter() - inicio)
+                trace.get_current_span().add_event("heygen_saiu_da_fila", {"heygen.status": st})
+            video_url = (d.get("video_url") if isinstance(d, dict) else None) or j.get("video_url")
+            if st == "COMPLETED" and video_url:
+                logger.info("video pronto -> job=%s", job_id)
+                return video_url
+            if st in ("FAILED","ERROR"):
+                raise RuntimeError(f"[Heygen] job {job_id} falhou: {j!r}")
+            
+            # Backoff entre verificações
+            await asyncio.sleep(intervalo)
+            intervalo = min(max_sleep, intervalo * 1.5)
+        except Exception as e:
+            _log_heygen_error(e, extra={"job_id": job_id})
+            raise
+
+_DOWNLOAD_CHUNK_BYTES = 1024 * 1024
+
+async def _baixar_video(url: str, destino: str) -> None:
+    """
+    Baixa em streaming para `destino`.part (blocos de 1 MB, gravados em thread) e renomeia no fim:
+    com a campanha em paralelo, vídeos inteiros em memória seriam picos de RSS por worker.
+    """
+    parcial = destino + ".part"
+    try:
+        async with httpx.AsyncClient(timeout=HTTP_TIMEOUT) as client:
+            async with client.stream("GET", url) as r:
+                r.raise_for_status()
+                with open(parcial, "wb") as f:
+                    async for chunk in r.aiter_bytes(_DOWNLOAD_CHUNK_BYTES):
+                        await asyncio.to_thread(f.write, chunk)
+        os.replace(parcial, destino)
+    except BaseException:
+        try:
+            os.remove(parcial)
+        except OSError:
+            pass
+        raise
+
+async def _heygen_renderizar(
+    group_id: str,
+    voice_id: str,
+    script: str,
+    destino: str,
+    coleta: Optional[Callable[[], AsyncContextManager]] = None,
+) -> str:
+    """
+    Renderiza `script` na Heygen e grava em `destino`.
+    Mesmo avatar + voz + script já renderizado (nome repetido, campanha reenviada): reaproveita do cache.
+    O job é criado assim que possível (o ritmo é do governor/guard, e o lote junta as criações);
+    `coleta`, se informada, é a vaga que limita só o polling e o download (ver gerar_videos_campanha).
+    """
+    chave = render_cache.chave_render(group_id, voice_id, script)
+    async with render_cache.trava(chave):
+        # cópia de MBs + scan do diretório (eviction): em thread, fora do event loop
+        if await asyncio.to_thread(render_cache.obter_render, chave, destino):
+            logger.info("render cache hit (%s) -> %s", chave[:12], os.path.basename(destino))
+            return destino
+
+        async with etapa("heygen_criacao"):
+            job_id = await heygen_criar_video(group_id, voice_id, script, test=True)
+
+        async with coleta() if coleta else contextlib.nullcontext():
+            async with etapa("heygen_render"):
+                video_url = await heygen_aguardar_video(job_id)
+            async with etapa("download"):
+                await _baixar_video(video_url, destino)
+        await asyncio.to_thread(render_cache.salvar_render, chave, destino)
+        return destino
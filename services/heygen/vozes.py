@@ -0,0 +1,100 @@
+# services/heygen/vozes.py
+import asyncio
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+import httpx
+import logging
+
+from services.config import AUTOMATION_API_BASE, HTTP_TIMEOUT
+from services.heygen.client import _heygen_headers, _heygen_request, _heygen_url, _log_heygen_error
+
+logger = logging.getLogger(__name__)
+
+
+async def importar_voz_para_heygen(voice_name: str) -> None:
+    """
+    Chama o endpoint de automação para importar a voz do ElevenLabs para a Heygen.
+    """
+    url = f"{AUTOMATION_API_BASE}/import-voice"
+    try:
+        async with httpx.AsyncClient(timeout=HTTP_TIMEOUT) as client:
+            resp = await client.post(url, json={"voiceName": voice_name})
+            resp.raise_for_status()
+            logger.info("Voz '%s' importada para Heygen com sucesso", voice_name)
+    except httpx.HTTPStatusError as e:
+        logger.warning("Erro ao importar voz '%s': %s - %s", voice_name, e.response.status_code, e.response.text)
+        # Não levanta exceção para não quebrar o fluxo, mas loga o erro
+    except Exception as e:
+        logger.warning("Erro ao chamar endpoint de importação: %s", e)
+
+async def heygen_listar_vozes() -> List[Dict[str, Any]]:
+    """
+    Lista todas as vozes disponíveis na Heygen.
+    Estrutura esperada: {"error": null, "data": {"voices": [...]}}
+    """
+    url = _heygen_url("voices")
+    headers = await _heygen_headers()
+    try:
+        resp = await _heygen_request("GET", url, headers=headers)
+        raw = resp.json() if resp.headers.get("content-type", "").startswith("application/json") else {}
+        
+        # Estrutura: {"error": null, "data": {"voices": [...]}}
+        items = []
+        if isinstance(raw, dict):
+            if "data" in raw and isinstance(raw["data"], dict):
+                if "voices" in raw["data"] and isinstance(raw["data"]["voices"], list):
+                    items = raw["data"]["voices"]
+            # Fallback para outras estruturas
+            elif "voices" in raw and isinstance(raw["voices"], list):
+                items = raw["voices"]
+            elif "items" in raw and isinstance(raw["items"], list):
+                items = raw["items"]
+            elif "data" in raw and isinstance(raw["data"], list):
+                items = raw["data"]
+        
+        logger.info("Listou %s vozes", len(items))
+        return items if isinstance(items, list) else []
+    except Exception as e:
+        _log_heygen_error(e, extra={"url": url})
+        return []
+
+async def heygen_buscar_voz_por_nome(voice_name: str) -> Optional[str]:
+    """
+    Busca uma voz na Heygen pelo campo 'name' e retorna o voice_id.
+    Estrutura esperada: {"voice_id": "...", "name": "..."}
+    """
+    vozes = await heygen_listar_vozes()
+    voice_name_norm = (voice_name or "").strip().casefold()
+    
+    for voz in vozes:
+        # Busca pelo campo 'name' (conforme estrutura do JSON)
+        nome_voz = (voz.get("name") or "").strip()
+        if nome_voz and nome_voz.casefold() == voice_name_norm:
+            voice_id = (
+                voz.get("voice_id") 
+                or voz.get("voiceId") 
+                or voz.get("id")
+            )
+            if voice_id:
+                logger.info("Voz encontrada pelo nome: '%s' -> voice_id=%s", voice_name, voice_id)
+                return voice_id
+    
+    logger.info("Voz '%s' não encontrada na Heygen (total de %s vozes verificadas)", voice_name, len(vozes))
+    return None
+
+async def heygen_resolver_voz_do_usuario(user_id: UUID) -> str:
+    """Busca o voice_id da Heygen pelo nome (importando da Eleven se ainda não existir)."""
+    voice_name_heygen = f"user_{user_id}"
+    heygen_voice_id = await heygen_buscar_voz_por_nome(voice_name_heygen)
+    if not heygen_voice_id:
+        # Se não encontrou, tenta importar e buscar novamente
+        logger.info("Voz '%s' não encontrada. Tentando importar...", voice_name_heygen)
+        await importar_voz_para_heygen(voice_name_heygen)
+        # Aguarda 3 segundos após importação para processamento antes de buscar
+        logger.info("Aguardando 3 segundos após importação para processamento...")
+        await asyncio.sleep(3.0)
+        heygen_voice_id = await heygen_buscar_voz_por_nome(voice_name_heygen)
+        if not heygen_voice_id:
+            raise RuntimeError(f"Voz '{voice_name_heygen}' não encontrada na Heygen após tentativa de importação.")
+    return heygen_voice_id
@@ -0,0 +1,74 @@
+# services/heygen_group_cache.py
+import os
+from typing import Optional
+
+import orjson
+
+from redis_client import get_redis
+
+# =====================
+# Config
+# =====================
+# Quanto tempo confiar em cada estado antes de consultar a Heygen de novo
+HEYGEN_GROUP_COMPLETED_TTL = int(os.getenv("HEYGEN_GROUP_COMPLETED_TTL", str(6 * 3600)))
+HEYGEN_GROUP_TRAINING_TTL = int(os.getenv("HEYGEN_GROUP_TRAINING_TTL", str(15 * 60)))
+HEYGEN_GROUP_BROKEN_TTL = int(os.getenv("HEYGEN_GROUP_BROKEN_TTL", str(10 * 60)))
+
+COMPLETED = "completed"  # grupo tem look válido: pode renderizar
+TRAINING = "training"    # grupo recém-criado / em treino: não recriar
+BROKEN = "broken"        # sem looks válidos: precisa ser recriado
+
+_TTL_POR_ESTADO = {
+    COMPLETED: HEYGEN_GROUP_COMPLETED_TTL,
+    TRAINING: HEYGEN_GROUP_TRAINING_TTL,
+    BROKEN: HEYGEN_GROUP_BROKEN_TTL,
+}
+
+# Cache é só otimização: Redis fora do ar = consulta a Heygen como antes.
+
+
+def _key_estado(group_id: str) -> str:
+    return f"heygen_group_state:{group_id}"
+
+
+def _key_nome(nome: str) -> str:
+    return f"heygen_group_name:{nome}"
+
+
+async def obter_estado_grupo(group_id: str) -> Optional[str]:
+    try:
+        raw = await get_redis().get(_key_estado(group_id))
+        return orjson.loads(raw).get("estado") if raw else None
+    except Exception:
+        return None
+
+
+async def salvar_estado_grupo(group_id: str, estado: str, nome: Optional[str] = None) -> None:
+    ttl = _TTL_POR_ESTADO[estado]
+    try:
+        await get_redis().setex(_key_estado(group_id), ttl, orjson.dumps({"estado": estado, "nome": nome}))
+        if nome:
+            await get_redis().setex(_key_nome(nome), max(ttl, HEYGEN_GROUP_COMPLETED_TTL), group_id.encode("utf-8"))
+    except Exception:
+        pass
+
+
+async def obter_grupo_por_nome(nome: str) -> Optional[str]:
+    try:
+        raw = await get_redis().get(_key_nome(nome))
+        return raw.decode("utf-8") if raw else None
+    except Exception:
+        return None
+
+
+async def invalidar_grupo(group_id: Optional[str]) -> None:
+    """Esquece o estado do grupo (e o mapeamento nome -> group_id): a próxima verificação vai à Heygen."""
+    if not group_id:
+        return
+    try:
+        raw = await get_redis().get(_key_estado(group_id))
+        nome = orjson.loads(raw).get("nome") if raw else None
+        chaves = [_key_estado(group_id)] + ([_key_nome(nome)] if nome else [])
+        await get_redis().delete(*chaves)
+    except Exception:
+        pass
@@ -0,0 +1,74 @@
+# services/heygen_training.py
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# =====================
+# Config
+# =====================
+HEYGEN_TRAIN_DEADLINE_S = float(os.getenv("HEYGEN_TRAIN_DEADLINE_S", str(30 * 60)))  # desiste após 30 min
+HEYGEN_TRAIN_POLL_INITIAL_S = float(os.getenv("HEYGEN_TRAIN_POLL_INITIAL_S", "3.0"))
+HEYGEN_TRAIN_POLL_MAX_S = float(os.getenv("HEYGEN_TRAIN_POLL_MAX_S", "60.0"))
+
+# Um watcher por group_id neste processo; todos os interessados aguardam a mesma task
+_watchers: Dict[str, "asyncio.Task[bool]"] = {}
+
+
+async def _vigiar(
+    group_id: str,
+    verificar: Callable[[str], Awaitable[bool]],
+    deadline_s: float,
+    on_pronto: Optional[Callable[[str], Awaitable[Any]]],
+) -> bool:
+    limite = time.monotonic() + deadline_s
+    intervalo = HEYGEN_TRAIN_POLL_INITIAL_S
+    tentativa = 0
+    while True:
+        tentativa += 1
+        if await verificar(group_id):
+            logger.info("Treino completo para group_id=%s após %s verificação(ões)", group_id, tentativa)
+            if on_pronto:
+                try:
+                    await on_pronto(group_id)
+                except Exception as e:
+                    logger.warning("falha ao persistir treino pronto de group_id=%s: %s", group_id, e)
+            return True
+
+        restante = limite - time.monotonic()
+        if restante <= 0:
+            logger.warning("treino de group_id=%s não completou em %.0fs", group_id, deadline_s)
+            return False
+        espera = min(intervalo, restante)
+        logger.info("Tentativa %s: treino ainda não completo, aguardando %.1fs...", tentativa, espera)
+        await asyncio.sleep(espera)
+        intervalo = min(HEYGEN_TRAIN_POLL_MAX_S, intervalo * 1.5)
+
+
+async def aguardar_treino(
+    group_id: str,
+    verificar: Callable[[str], Awaitable[bool]],
+    deadline_s: float = HEYGEN_TRAIN_DEADLINE_S,
+    on_pronto: Optional[Callable[[str], Awaitable[Any]]] = None,
+) -> bool:
+    """
+    Aguarda o treino do grupo ficar pronto. Chamadas concorrentes para o mesmo group_id
+    compartilham um único watcher (backoff exponencial + deadline) e são notificadas juntas.
+    `on_pronto` roda uma vez, no watcher, quando o treino completa (o de quem criou o watcher).
+    Retorna False se o deadline estourar.
+    """
+    task = _watchers.get(group_id)
+    if task is None or task.done():
+        task = asyncio.create_task(_vigiar(group_id, verificar, deadline_s, on_pronto))
+        _watchers[group_id] = task
+
+        def _remover(t: "asyncio.Task[bool]") -> None:
+            if _watchers.get(group_id) is t:
+                _watchers.pop(group_id, None)
+
+        task.add_done_callback(_remover)
+    # shield: se um dos interessados for cancelado, o watcher continua para os demais
+    return await asyncio.shield(task)
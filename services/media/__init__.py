@@ -0,0 +1,18 @@
+# services/media/__init__.py
+# ffmpeg/ffprobe e arquivos em disco (sem dependência de upstream).
+# Nada é importado aqui: cada nome carrega o seu módulo no primeiro acesso (services/_lazy.py).
+from services._lazy import exportar_sob_demanda
+
+_EXPORTS = {
+    "salvar_video_em_disco":      ".arquivos",
+    "salvar_imagem_em_disco":     ".arquivos",
+    "salvar_audio_em_wav":        ".arquivos",
+    "extrair_audio_do_video":     ".ffmpeg",
+    "converter_audio_para_wav":   ".ffmpeg",
+    "_ffmpeg_obter_duracao":      ".ffmpeg",
+    "_ffmpeg_obter_propriedades": ".ffmpeg",
+    "overlay_clip_on_interval":   ".ffmpeg",
+}
+
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = exportar_sob_demanda(__name__, _EXPORTS)
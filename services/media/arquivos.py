@@ -0,0 +1,32 @@
+# services/media/arquivos.py
+import os
+from typing import Optional
+
+from services.media.ffmpeg import converter_audio_para_wav
+
+def salvar_video_em_disco(video_bytes: bytes, nome_video: str, pasta_temp: str) -> str:
+    caminho_video = os.path.join(pasta_temp, nome_video)
+    with open(caminho_video, "wb") as f:
+        f.write(video_bytes)
+    return caminho_video
+
+def _nome_seguro(nome: Optional[str], padrao: str) -> str:
+    base = (nome or "").strip() or padrao
+    base = os.path.basename(base)
+    return base or padrao
+
+def salvar_imagem_em_disco(foto_bytes: bytes, nome_foto: Optional[str], pasta_temp: str) -> str:
+    nome = _nome_seguro(nome_foto, "foto_usuario.jpg")
+    if "." not in os.path.basename(nome):
+        nome = f"{nome}.jpg"
+    caminho_foto = os.path.join(pasta_temp, nome)
+    with open(caminho_foto, "wb") as f:
+        f.write(foto_bytes)
+    return caminho_foto
+
+def salvar_audio_em_wav(audio_bytes: bytes, nome_audio: Optional[str], pasta_temp: str) -> str:
+    nome = _nome_seguro(nome_audio, "audio_usuario")
+    caminho_original = os.path.join(pasta_temp, nome)
+    with open(caminho_original, "wb") as f:
+        f.write(audio_bytes)
+    return converter_audio_para_wav(caminho_original, pasta_temp)
@@ -0,0 +1,311 @@
+# services/media/ffmpeg.py
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import tempfile
+from typing import Any, Dict, List, Optional
+
+from services.config import FFMPEG_MAX_PARALELO
+from services.metrics import cronometrado
+
+logger = logging.getLogger(__name__)
+
+# Vaga para encodes pesados (rodam em thread): `async with ENCODES: await asyncio.to_thread(...)`
+ENCODES = asyncio.Semaphore(FFMPEG_MAX_PARALELO)
+
+
+@cronometrado("ffmpeg_extrair_audio")
+def extrair_audio_do_video(caminho_video: str, pasta_temp: str) -> str:
+    caminho_audio = os.path.join(pasta_temp, "original_audio.wav")
+    subprocess.run([
+        "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+        "-i", caminho_video, "-ac", "1", "-ar", "16000", "-vn", caminho_audio
+    ], check=True)
+    return caminho_audio
+
+@cronometrado("ffmpeg_converter_audio")
+def converter_audio_para_wav(caminho_original: str, pasta_temp: str) -> str:
+    """Converte o áudio enviado (qualquer formato) para WAV mono 16 kHz em pasta_temp."""
+    caminho_audio = os.path.join(pasta_temp, "original_audio.wav")
+    subprocess.run([
+        "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+        "-i", caminho_original, "-ac", "1", "-ar", "16000", caminho_audio
+    ], check=True)
+    return caminho_audio
+
+def _ffmpeg_obter_duracao_audio(caminho_audio: str) -> float:
+    """
+    Obtém a duração total do áudio em segundos usando ffprobe.
+    """
+    try:
+        result = subprocess.run([
+            "ffprobe", "-v", "error", "-show_entries", "format=duration",
+            "-of", "default=noprint_wrappers=1:nokey=1", caminho_audio
+        ], capture_output=True, text=True, check=True)
+        duracao = float(result.stdout.strip())
+        return duracao
+    except (subprocess.CalledProcessError, ValueError) as e:
+        logger.warning("Erro ao obter duração do áudio: %s", e)
+        raise RuntimeError(f"Não foi possível obter a duração do áudio: {e}")
+
+@cronometrado("ffmpeg_estender_audio")
+def _estender_audio_para_cadastro(caminho_audio: str, pasta_temp: str, duracao_minima_segundos: float = 5400.0) -> str:
+    """
+    Estende o áudio repetindo-o até atingir a duração mínima necessária para cadastro na ElevenLabs.
+    A duração mínima padrão é 1h30min (5400 segundos).
+    
+    Se o áudio já tiver duração maior ou igual à mínima, retorna o caminho original.
+    Caso contrário, cria um novo arquivo com o áudio repetido até atingir a duração mínima.
+    
+    Args:
+        caminho_audio: Caminho do arquivo de áudio original
+        pasta_temp: Pasta temporária para salvar o áudio estendido
+        duracao_minima_segundos: Duração mínima em segundos (padrão: 5400 = 1h30min)
+    
+    Returns:
+        Caminho do áudio estendido (ou original se já tiver duração suficiente)
+    """
+    try:
+        duracao_atual = _ffmpeg_obter_duracao_audio(caminho_audio)
+        logger.info("Duração atual do áudio: %.2f segundos (%.2f minutos)", duracao_atual, duracao_atual/60)
+        
+        if duracao_atual >= duracao_minima_segundos:
+            logger.info("Áudio já tem duração suficiente (%.2fs >= %.2fs). Usando original.", duracao_atual, duracao_minima_segundos)
+            return caminho_audio
+        
+        # Calcula quantas repetições são necessárias
+        num_repeticoes = int(duracao_minima_segundos / duracao_atual) + 1
+        logger.info("Estendendo áudio de %.2fs para %.2fs (repetindo %s vezes)", duracao_atual, duracao_minima_segundos, num_repeticoes)
+        
+        # Cria arquivo de lista para concatenação
+        caminho_audio_estendido = os.path.join(pasta_temp, "audio_estendido_cadastro.wav")
+        lista_concat = os.path.join(pasta_temp, "lista_concat.txt")
+        
+        # Cria lista de arquivos para concatenação (mesmo arquivo repetido)
+        caminho_abs = os.path.abspath(caminho_audio).replace("\\", "/")
+        with open(lista_concat, "w", encoding="utf-8") as f:
+            for _ in range(num_repeticoes):
+                f.write(f"file '{caminho_abs}'\n")
+        
+        # Concatena o áudio usando ffmpeg
+        subprocess.run([
+            "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+            "-f", "concat", "-safe", "0", "-i", lista_concat,
+            "-ac", "1", "-ar", "16000",  # Mantém formato mono 16kHz
+            "-c:a", "pcm_s16le",  # Formato WAV
+            caminho_audio_estendido
+        ], check=True)
+        
+        # Verifica a duração final
+        duracao_final = _ffmpeg_obter_duracao_audio(caminho_audio_estendido)
+        logger.info("Áudio estendido criado com sucesso: %.2f segundos (%.2f minutos)", duracao_final, duracao_final/60)
+        
+        return caminho_audio_estendido
+        
+    except Exception as e:
+        logger.warning("Erro ao estender áudio: %s. Usando áudio original.", e)
+        return caminho_audio
+
+def _ffmpeg_obter_duracao(input_video: str) -> float:
+    """
+    Obtém a duração total do vídeo em segundos usando ffprobe.
+    """
+    try:
+        result = subprocess.run([
+            "ffprobe", "-v", "error", "-show_entries", "format=duration",
+            "-of", "default=noprint_wrappers=1:nokey=1", input_video
+        ], capture_output=True, text=True, check=True)
+        duracao = float(result.stdout.strip())
+        return duracao
+    except (subprocess.CalledProcessError, ValueError) as e:
+        logger.warning("Erro ao obter duração do vídeo: %s", e)
+        # Fallback: retorna uma duração padrão ou usa outro método
+        raise RuntimeError(f"Não foi possível obter a duração do vídeo: {e}")
+
+def _ffmpeg_obter_propriedades(input_video: str) -> Dict[str, Any]:
+    """
+    Obtém propriedades do vídeo (largura, altura, fps) usando ffprobe.
+    """
+    try:
+        result = subprocess.run([
+            "ffprobe", "-v", "error", "-select_streams", "v:0",
+            "-show_entries", "stream=width,height,r_frame_rate",
+            "-of", "json", input_video
+        ], capture_output=True, text=True, check=True)
+        data = json.loads(result.stdout)
+        stream = data.get("streams", [{}])[0]
+        width = stream.get("width", 1920)
+        height = stream.get("height", 1080)
+        r_frame_rate = stream.get("r_frame_rate", "30/1")
+        # Calcu
+        if "/" in r_frame_rate:
+            num, den = map(int, r_frame_rate.split("/"))
+            fps = num / den if den > 0 else 30.0
+        else:
+            fps = float(r_frame_rate) if r_frame_rate else 30.0
+        return {"width": width, "height": height, "fps": fps}
+    except Exception as e:
+        logger.warning("Erro ao obter propriedades do vídeo: %s, usando padrão 1920x1080@30fps", e)
+        return {"width": 1920, "height": 1080, "fps": 30.0}
+
+@cronometrado("ffmpeg_frames")
+def _ffmpeg_extrair_frame_meio(input_video: str, pasta: str, qualidade: int = 2) -> str:
+    """
+    Extrai um frame de alta qualidade do meio do vídeo.
+    Retorna o caminho do arquivo de imagem gerado.
+    """
+    duracao = _ffmpeg_obter_duracao(input_video)
+    tempo_meio = duracao / 2.0
+    
+    out = os.path.join(pasta, "avatar_frame_meio.jpg")
+    subprocess.run([
+        "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+        "-ss", f"{tempo_meio:.3f}",
+        "-i", input_video,
+        "-frames:v", "1",
+        "-q:v", str(qualidade),  # qualidade: 2 = alta qualidade (escala 1-31, menor = melhor)
+        "-vf", "scale=1920:-2",  # escala para alta resolução mantendo aspect ratio
+        out
+    ], check=True)
+    
+    logger.info("Frame do meio extraído em %.2fs (duração total: %.2fs)", tempo_meio, duracao)
+    return out
+
+@cronometrado("ffmpeg_frames")
+def _ffmpeg_pegar_frames(input_video: str, start_s: float, end_s: float, num: int, pasta: str) -> List[str]:
+    """
+    Extrai N frames uniformemente no intervalo [start_s, end_s] em JPGs.
+    """
+    dur = max(0.01, end_s - start_s)
+    caminhos: List[str] = []
+    for i in range(num):
+        t = start_s + (dur * (i + 0.5) / num)
+        out = os.path.join(pasta, f"avatar_frame_{i+1:02d}.jpg")
+        subprocess.run([
+            "ffmpeg","-y","-hide_banner","-loglevel","error",
+            "-ss", f"{t:.3f}","-i", input_video,"-frames:v","1","-q:v","2", out
+        ], check=True)
+        caminhos.append(out)
+    return caminhos
+
+@cronometrado("ffmpeg_overlay")
+def overlay_clip_on_interval(
+    input_video: str,
+    insert_clip: str,
+    start_s: float,
+    end_s: float,
+    out_path: str,
+    overlay_x: str = "(W-w)/2",  # centro
+    overlay_y: str = "H-h",      # rodapé
+    scale_w: Optional[int] = 720,
+    fade_ms: int = 0,  # Sem fade - transição instantânea
+) -> str:
+    """
+    Insere um clip sobreposto no intervalo especificado do vídeo.
+    Transição instantânea para parecer um vídeo único, não editado.
+    Mantém o formato original do vídeo usando -c copy quando possível.
+
+    O trecho [start_s, end_s] do vídeo passa a durar o mesmo que o clip (medido com
+    ffprobe), com o áudio do clip inteiro: o que vem depois de end_s é deslocado. Se o
+    clip for mais longo que o intervalo, o último quadro do trecho fica congelado por
+    baixo dele; se for mais curto, o trecho é cortado. O clip nunca é repetido nem cortado.
+    """
+    with tempfile.TemporaryDirectory() as td:
+        duracao_total = _ffmpeg_obter_duracao(input_video)
+        dur_clip = _ffmpeg_obter_duracao(insert_clip)
+        if dur_clip <= 0.0:
+            raise RuntimeError(f"Não foi possível obter a duração do clip {insert_clip}")
+        
+        before = os.path.join(td, "before.mp4")
+        middle = os.path.join(td, "middle.mp4")
+        after = os.path.join(td, "after.mp4")
+        scaled = os.path.join(td, "insert_scaled.mp4")
+        middle_overlay = os.path.join(td, "middle_overlay.mp4")
+        
+        # before - extrai até start_s
+        if start_s > 0.01:
+            subprocess.run([
+                "ffmpeg","-y","-hide_banner","-loglevel","error",
+                "-ss","0","-to", f"{start_s:.3f}","-i", input_video,
+                "-c","copy",
+                before
+            ], check=True)
+        else:
+            before = None
+        
+        # middle - extrai o trecho onde será inserido o overlay, ajustado à duração do clip
+        # (congela o último quadro se o clip for mais longo, corta se for mais curto)
+        subprocess.run([
+            "ffmpeg","-y","-hide_banner","-loglevel","error",
+            "-ss", f"{start_s:.3f}","-to", f"{end_s:.3f}","-i", input_video,
+            "-vf", f"tpad=stop_mode=clone:stop_duration={dur_clip:.3f},trim=duration={dur_clip:.3f}",
+            "-c:v","libx264","-preset","medium","-crf","23",
+            "-an",  # Remove áudio do vídeo original
+            middle
+        ], check=True)
+        
+        # after - extrai do end_s até o final
+        if end_s < duracao_total - 0.01:
+            subprocess.run([
+                "ffmpeg","-y","-hide_banner","-loglevel","error",
+                "-ss", f"{end_s:.3f}","-i", input_video,
+                "-c","copy",
+                after
+            ], check=True)
+        else:
+            after = None
+        
+        # scale no clip inserido (duração e áudio originais)
+        vf = []
+        if scale_w:
+            vf.append(f"scale={scale_w}:-2")
+        vf_arg = ",".join(vf) if vf else "null"
+        
+        subprocess.run([
+            "ffmpeg","-y","-hide_banner","-loglevel","error",
+            "-i", insert_clip,
+            "-vf", vf_arg,
+            "-c:v","libx264","-preset","medium","-crf","23",
+            "-c:a","aac","-b:a","192k",
+            scaled
+        ], check=True)
+        
+        # overlay - combina o vídeo original do trecho com o clip inserido
+        # Ambos têm a duração do clip; o áudio é o do clip, sem corte
+        filter_complex = f"[0:v][1:v]overlay=x={overlay_x}:y={overlay_y}[outv]"
+        subprocess.run([
+            "ffmpeg","-y","-hide_banner","-loglevel","error",
+            "-i", middle,"-i", scaled,
+            "-filter_complex", filter_complex,
+            "-map","[outv]","-map","1:a:0",
+            "-c:v","libx264","-preset","medium","-crf","23",
+            "-c:a","aac","-b:a","192k",
+            "-vsync","cfr",  # Garante frame rate constante
+            middle_overlay
+        ], check=True)
+        
+        # Concatena - sempre re-encoda para garantir compatibilidade e evitar erros de NAL units
+        concat_list = os.path.join(td, "list.txt")
+        with open(concat_list, "w", encoding="utf-8") as f:
+            if before:
+                before_abs = os.path.abspath(before).replace("\\", "/")
+                f.write(f"file '{before_abs}'\n")
+            middle_abs = os.path.abspath(middle_overlay).replace("\\", "/")
+            f.write(f"file '{middle_abs}'\n")
+            if after:
+                after_abs = os.path.abspath(after).replace("\\", "/")
+                f.write(f"file '{after_abs}'\n")
+        
+        # Re-encoda tudo na concatenação final para garantir compatibilidade
+        # Isso evita erros de NAL units e mantém formato consistente
+        subprocess.run([
+            "ffmpeg","-y","-hide_banner","-loglevel","error",
+            "-f","concat","-safe","0","-i", concat_list,
+            "-c:v","libx264","-preset","medium","-crf","23",
+            "-c:a","aac","-b:a","192k",
+            "-avoid_negative_ts","make_zero",
+            out_path
+        ], check=True)
+    return out_path
@@ -0,0 +1,169 @@
+# services/metrics.py
+import functools
+import inspect
+import re
+import time
+from typing import Optional
+from urllib.parse import urlsplit
+
+from prometheus_client import Counter, Gauge, Histogram, REGISTRY
+from prometheus_client.core import GaugeMetricFamily
+
+from services import tracing
+
+# =====================
+# Métricas Prometheus (expostas em GET /metrics)
+# =====================
+# Labels só com valores de conjunto fechado: nome da etapa, upstream, rota com ids trocados
+# por {id}, classe de status. Nunca user_id, job_id, telefone ou nome de instância.
+
+_BUCKETS_ETAPA = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200, 3600)
+_BUCKETS_UPSTREAM = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+ETAPA_SEGUNDOS = Histogram(
+    "videosmart_etapa_segundos",
+    "Duração de cada etapa do pipeline (stt, voz, avatar, heygen_fila, heygen_render, download, ffmpeg_*, whatsapp_envio...)",
+    ["etapa", "resultado"],
+    buckets=_BUCKETS_ETAPA,
+)
+UPSTREAM_SEGUNDOS = Histogram(
+    "videosmart_upstream_segundos",
+    "Latência das chamadas HTTP aos upstreams, por rota",
+    ["upstream", "endpoint", "status"],
+    buckets=_BUCKETS_UPSTREAM,
+)
+UPSTREAM_RATE_LIMIT = Counter(
+    "videosmart_upstream_429_total",
+    "Respostas 429 recebidas dos upstreams",
+    ["upstream"],
+)
+UPSTREAM_RETRIES = Counter(
+    "videosmart_upstream_retries_total",
+    "Chamadas refeitas (429, token expirado, erro de conexão, envio)",
+    ["upstream", "motivo"],
+)
+FALLBACKS = Counter(
+    "videosmart_fallback_total",
+    "Contatos desviados do caminho principal (heygen -> tts, splice -> render completo)",
+    ["de", "para", "motivo"],
+)
+CONTATOS = Counter(
+    "videosmart_contatos_total",
+    "Contatos processados em campanhas, por resultado",
+    ["status"],
+)
+JOBS_EM_ANDAMENTO = Gauge(
+    "videosmart_jobs_em_andamento",
+    "Jobs em background rodando neste worker",
+    ["tipo"],
+)
+CONTATOS_NA_FILA = Gauge(
+    "videosmart_campanha_contatos_na_fila",
+    "Contatos com o job da Heygen criado, aguardando vaga de CAMPANHA_MAX_PARALELO para a coleta",
+)
+CONTATOS_EM_GERACAO = Gauge(
+    "videosmart_campanha_contatos_em_geracao",
+    "Contatos em coleta agora (polling + download do vídeo na Heygen)",
+)
+LOOP_LAG_SEGUNDOS = Histogram(
+    "videosmart_event_loop_lag_segundos",
+    "Atraso do event loop: quanto um sleep curto demorou além do pedido (profiling.py)",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+
+class _Etapa:
+    """
+    Cronometra um bloco (`with` ou `async with`) e registra em ETAPA_SEGUNDOS com resultado ok/erro.
+    O bloco também vira um span de mesmo nome (services/tracing.py), filho do span atual.
+    """
+    __slots__ = ("nome", "_inicio", "_span")
+
+    def __init__(self, nome: str):
+        self.nome = nome
+        self._inicio = 0.0
+        self._span = None
+
+    def __enter__(self) -> "_Etapa":
+        self._span = tracing.span(self.nome)
+        self._span.__enter__()
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        ETAPA_SEGUNDOS.labels(self.nome, "erro" if exc_type else "ok").observe(time.perf_counter() - self._inicio)
+        self._span.__exit__(exc_type, exc, tb)
+        return False
+
+    async def __aenter__(self) -> "_Etapa":
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        return self.__exit__(exc_type, exc, tb)
+
+
+def etapa(nome: str) -> _Etapa:
+    return _Etapa(nome)
+
+
+def cronometrado(nome: str):
+    """Decorator: cada chamada da função (sync ou async) vira uma observação da etapa `nome`."""
+    def decorar(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with _Etapa(nome):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Etapa(nome):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorar
+
+
+_SEGMENTO_FIXO = re.compile(r"^[A-Za-z][A-Za-z-]{0,39}$")
+
+
+def rotulo_endpoint(method: str, url: str) -> str:
+    """
+    "GET /api/videos/{id}" a partir da URL: segmentos com dígitos, "_" ou muito longos
+    (ids, jobIds, nomes de instância) viram {id}; query string é descartada.
+    """
+    partes = [p for p in urlsplit(url).path.split("/") if p]
+    return f"{method.upper()} /" + "/".join(p if _SEGMENTO_FIXO.match(p) else "{id}" for p in partes)
+
+
+def classe_status(status: Optional[int]) -> str:
+    if status is None:
+        return "erro"
+    if status == 429:
+        return "429"
+    return f"{status // 100}xx"
+
+
+class _ColetorGuards:
+    """Estado dos guards de upstream (services/resilience.py) lido na hora do scrape, sem custo no caminho quente."""
+
+    def describe(self):
+        # sem describe o registry chamaria collect() já no import (resilience ainda carregando)
+        return []
+
+    def collect(self):
+        from services.resilience import GUARDS
+
+        limite = GaugeMetricFamily("videosmart_upstream_concorrencia_limite", "Limite AIMD atual de chamadas simultâneas", labels=["upstream"])
+        em_uso = GaugeMetricFamily("videosmart_upstream_em_voo", "Chamadas em andamento", labels=["upstream"])
+        aguardando = GaugeMetricFamily("videosmart_upstream_aguardando", "Chamadas esperando vaga no limite", labels=["upstream"])
+        aberto = GaugeMetricFamily("videosmart_upstream_circuito_aberto", "1 se o circuit breaker recusa chamadas", labels=["upstream"])
+        for nome, guard in GUARDS.items():
+            limite.add_metric([nome], int(guard.limiter.limite))
+            em_uso.add_metric([nome], guard.limiter.em_uso)
+            aguardando.add_metric([nome], guard.limiter.aguardando)
+            aberto.add_metric([nome], 1 if guard.breaker.aberto else 0)
+        return [limite, em_uso, aguardando, aberto]
+
+
+REGISTRY.register(_ColetorGuards())
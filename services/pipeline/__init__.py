@@ -0,0 +1,17 @@
+# services/pipeline/__init__.py
+# Campanha: setup, geração por contato (Heygen/splice/TTS) e envio.
+# Nada é importado aqui: cada nome carrega o seu módulo no primeiro acesso (services/_lazy.py).
+from services._lazy import exportar_sob_demanda
+
+_EXPORTS = {
+    "processar_video":           ".campanha",
+    "gerar_videos_campanha":     ".campanha",
+    "SetupError":                ".campanha",
+    "preparar_recursos_usuario": ".campanha",
+    "gerar_video_para_nome":     ".geracao",
+    "gerar_video_para_nome_tts": ".geracao",
+    "enviar_video_para_webhook": ".geracao",
+}
+
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = exportar_sob_demanda(__name__, _EXPORTS)
@@ -0,0 +1,314 @@
+# services/pipeline/campanha.py
+import asyncio
+import contextlib
+import logging
+import os
+import shutil
+import tempfile
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from opentelemetry import trace
+
+from services.config import CAMPANHA_MAX_PARALELO
+from services.eleven.stt import transcrever_audio_com_timestamps
+from services.eleven.voz import verificar_ou_criar_voz
+from services.evolution.client import EVO_GUARD
+from services.evolution.mensagens import enviar_video_via_whatsapp
+from services.heygen.avatar import heygen_verificar_ou_criar_avatar_do_usuario
+from services.heygen.client import HEYGEN_GUARD
+from services.heygen.vozes import heygen_resolver_voz_do_usuario
+from services.media.ffmpeg import converter_audio_para_wav
+from services.metrics import CONTATOS_EM_GERACAO, CONTATOS_NA_FILA, FALLBACKS, cronometrado
+from services.tracing import tracer
+from services.pipeline.geracao import gerar_video_para_nome, gerar_video_para_nome_tts
+from services.resilience import CircuitOpenError
+from services.segment_store import SegmentStore
+from services.transcript_index import TranscriptIndex
+
+logger = logging.getLogger(__name__)
+
+
+async def processar_video(
+    user_id: UUID,
+    contatos: List[Dict[str, str]],
+    palavra_chave: str,
+    caminho_foto: str,
+    caminho_audio_upload: str,
+    evo_instance: str | None = None,
+    evo_base: str | None = None,
+    heygen_group_id: Optional[str] = None,
+    save_group_id_async: Optional[Callable[[UUID, str], Any]] = None,
+    foto_sha256: Optional[str] = None,
+    audio_sha256: Optional[str] = None,
+    pasta_staging: Optional[str] = None,
+    status_contato_async: Optional[Callable[[Dict[str, str], str, Optional[str]], Any]] = None,
+):
+    """
+    Pipeline completo da campanha. Recebe apenas os caminhos dos uploads já gravados
+    em disco (staging do job) e seus hashes — nunca os bytes. Se `pasta_staging` for
+    informada, ela é removida ao final. `status_contato_async(contato, status, erro)`
+    recebe o resultado de cada contato ("sent", "failed" ou "skipped").
+    """
+    try:
+        await _processar_video(
+            user_id=user_id,
+            contatos=contatos,
+            palavra_chave=palavra_chave,
+            caminho_foto=caminho_foto,
+            caminho_audio_upload=caminho_audio_upload,
+            evo_instance=evo_instance,
+            evo_base=evo_base,
+            heygen_group_id=heygen_group_id,
+            save_group_id_async=save_group_id_async,
+            foto_sha256=foto_sha256,
+            audio_sha256=audio_sha256,
+            status_contato_async=status_contato_async,
+        )
+    finally:
+        if pasta_staging:
+            shutil.rmtree(pasta_staging, ignore_errors=True)
+
+async def _processar_video(
+    user_id: UUID,
+    contatos: List[Dict[str, str]],
+    palavra_chave: str,
+    caminho_foto: str,
+    caminho_audio_upload: str,
+    evo_instance: str | None,
+    evo_base: str | None,
+    heygen_group_id: Optional[str],
+    save_group_id_async: Optional[Callable[[UUID, str], Any]],
+    foto_sha256: Optional[str],
+    audio_sha256: Optional[str],
+    status_contato_async: Optional[Callable[[Dict[str, str], str, Optional[str]], Any]],
+):
+    async def _status(contato: Dict[str, str], status: str, erro: Optional[str] = None):
+        if status_contato_async:
+            await status_contato_async(contato, status, erro)
+
+    logger.info("user=%s foto_sha256=%s audio_sha256=%s", user_id, foto_sha256, audio_sha256)
+    with tempfile.TemporaryDirectory() as pasta_temp:
+        # ffmpeg do upload em thread: o transcode não pode parar o event loop
+        caminho_audio = await asyncio.to_thread(converter_audio_para_wav, caminho_audio_upload, pasta_temp)
+
+        # STT, voz Eleven e avatar Heygen em paralelo (ver preparar_recursos_usuario)
+        transcricao, segmentos, user_voice_id, group_id = await preparar_recursos_usuario(
+            user_id=user_id,
+            caminho_audio=caminho_audio,
+            caminho_foto=caminho_foto,
+            pasta_temp=pasta_temp,
+            palavra_chave=palavra_chave,
+            heygen_group_id=heygen_group_id,
+            save_group_id_async=save_group_id_async,
+        )
+
+        def _norm(s: str) -> str: return (s or "").strip().casefold()
+        seen = set()
+        unicos = []
+        for c in contatos:
+            nome = (c.get("nome") or "").strip()
+            telefone = (c.get("telefone") or "").strip()
+            if not nome or not telefone:
+                continue
+            key = (_norm(nome), _norm(telefone))
+            if key in seen:
+                continue
+            seen.add(key)
+            unicos.append({"nome": nome, "telefone": telefone})
+
+        # Todos os renders começam juntos; cada vídeo é enviado assim que fica pronto
+        async for contato, caminho, erro in gerar_videos_campanha(
+            contatos=unicos,
+            palavra_chave=palavra_chave,
+            transcricao=transcricao,
+            segmentos=segmentos,
+            user_voice_id=user_voice_id,
+            caminho_audio=caminho_audio,
+            caminho_foto=caminho_foto,
+            pasta_temp=pasta_temp,
+            user_id=user_id,
+            group_id=group_id,
+        ):
+            nome, telefone = contato["nome"], contato["telefone"]
+            try:
+                if erro is not None:
+                    raise erro
+                await enviar_video_via_whatsapp(
+                    caminho, telefone, caption="",
+                    evo_instance=evo_instance, evo_base=evo_base
+                )
+                await _status(contato, "sent")
+            except CircuitOpenError as e:
+                logger.warning("Contato '%s' (%s) pulado: %s", nome, telefone, e)
+                await _status(contato, "skipped", str(e))
+            except Exception as e:
+                # Qualquer falha de um contato (disco, resposta malformada, timeout...) fica nele:
+                # deixar escapar cancelaria os renders em andamento de todos os outros
+                logger.warning("Falha com contato '%s' (%s): %r", nome, telefone, e)
+                await _status(contato, "failed", str(e))
+
+async def gerar_videos_campanha(
+    contatos: List[Dict[str, str]],
+    palavra_chave: str,
+    transcricao: str,
+    segmentos: SegmentStore,
+    user_voice_id: str,
+    caminho_audio: str,
+    caminho_foto: str,
+    pasta_temp: str,
+    user_id: UUID,
+    group_id: Optional[str],
+    enviar_webhook: bool = True,
+) -> AsyncIterator[Tuple[Dict[str, str], Optional[str], Optional[Exception]]]:
+    """
+    Gera os vídeos de todos os contatos (já deduplicados) ao mesmo tempo e devolve
+    (contato, caminho, erro) na ordem em que ficam prontos, para o envio começar logo.
+    Duas etapas por contato:
+      1. submissão: o job da Heygen é criado logo, sem esperar vaga da campanha — quem dita
+         o ritmo é o governor de rate limit e o guard da Heygen (com HEYGEN_BATCH_PATH, as
+         criações vão em lote);
+      2. coleta: polling + download do vídeo pronto, no máximo CAMPANHA_MAX_PARALELO por vez;
+         os encodes (overlay do splice, fallback TTS) ainda esperam vaga em ENCODES.
+    Cada contato usa uma subpasta própria.
+    """
+    # voice_id da Heygen resolvido uma vez para a campanha. Só o circuito aberto manda todos
+    # os contatos para o TTS; outro erro (5xx, timeout pontual) deixa cada contato resolver
+    # a voz por conta própria em gerar_video_para_nome, com fallback individual.
+    heygen_voice_id = None
+    heygen_disponivel = True
+    try:
+        HEYGEN_GUARD.verificar()
+        heygen_voice_id = await heygen_resolver_voz_do_usuario(user_id)
+    except CircuitOpenError as e:
+        heygen_disponivel = False
+        logger.info("Heygen indisponível para a campanha (%s); contatos vão para o fallback TTS", e)
+    except Exception as e:
+        logger.warning("Falha ao resolver a voz Heygen da campanha (%r); cada contato tenta de novo", e)
+
+    limite = asyncio.Semaphore(CAMPANHA_MAX_PARALELO)
+    indice = TranscriptIndex(segmentos)  # palavra-chave localizada uma vez para todos os contatos
+
+    @contextlib.asynccontextmanager
+    async def _vaga_coleta():
+        # Só o polling + download espera vaga: o job do contato já foi criado na Heygen
+        with CONTATOS_NA_FILA.track_inprogress():
+            await limite.acquire()
+        try:
+            with CONTATOS_EM_GERACAO.track_inprogress():
+                yield
+        finally:
+            limite.release()
+
+    async def _um(i: int, contato: Dict[str, str]):
+        # Span do contato: filho do span da campanha (a task herda o contexto); termina depois do envio
+        span = tracer.start_span("contato", attributes={"contato.indice": i})
+        try:
+            with trace.use_span(span, end_on_exit=False):
+                # Sem Evolution não há como entregar: não gasta render com o contato
+                EVO_GUARD.verificar()
+                pasta_contato = os.path.join(pasta_temp, f"contato_{i:05d}")
+                os.makedirs(pasta_contato, exist_ok=True)
+                kwargs = dict(
+                    nome=contato["nome"],
+                    palavra_chave=palavra_chave,
+                    transcricao=transcricao,
+                    segmentos=segmentos,
+                    user_voice_id=user_voice_id,
+                    caminho_audio=caminho_audio,
+                    caminho_foto=caminho_foto,
+                    pasta_temp=pasta_contato,
+                    user_id=user_id,
+                    enviar_webhook=enviar_webhook,
+                    indice=indice,
+                )
+                if heygen_disponivel:
+                    caminho = await gerar_video_para_nome(
+                        group_id=group_id, heygen_voice_id=heygen_voice_id, pasta_base=pasta_temp,
+                        coleta=_vaga_coleta, **kwargs
+                    )
+                else:
+                    FALLBACKS.labels("heygen", "tts", "campanha_sem_heygen").inc()
+                    caminho = await gerar_video_para_nome_tts(**kwargs)
+                return contato, caminho, None, span
+        except Exception as e:
+            span.record_exception(e)
+            return contato, None, e, span
+        except BaseException:
+            span.end()  # cancelado: ninguém mais vai fechar o span
+            raise
+
+    tarefas = [asyncio.create_task(_um(i, c)) for i, c in enumerate(contatos)]
+    try:
+        for pronto in asyncio.as_completed(tarefas):
+            contato, caminho, erro, span = await pronto
+            # O gerador roda no contexto de quem consome: enquanto o item está com o consumidor
+            # (envio no WhatsApp), o span do contato é o atual, e fecha quando ele pede o próximo.
+            with trace.use_span(span, end_on_exit=True):
+                yield contato, caminho, erro
+    finally:
+        for t in tarefas:
+            t.cancel()
+
+class SetupError(RuntimeError):
+    """Falha em um ou mais ramos do setup da campanha (stt / voz / avatar)."""
+
+    def __init__(self, falhas: Dict[str, BaseException]):
+        self.falhas = falhas
+        detalhes = "; ".join(f"{ramo}: {erro}" for ramo, erro in falhas.items())
+        super().__init__(f"Falha no setup ({detalhes})")
+
+@cronometrado("setup")
+async def preparar_recursos_usuario(
+    user_id: UUID,
+    caminho_audio: str,
+    caminho_foto: str,
+    pasta_temp: str,
+    palavra_chave: Optional[str] = None,
+    heygen_group_id: Optional[str] = None,
+    save_group_id_async: Optional[Callable[[UUID, str], Any]] = None,
+) -> Tuple[str, SegmentStore, str, str]:
+    """
+    Setup da campanha/preview como grafo de dependências:
+      áudio -> STT (transcrição + timestamps)
+      áudio -> voz Eleven (+ importação na Heygen)
+      foto  -> grupo de avatar Heygen
+    Os três ramos são independentes, então rodam juntos e a latência do setup passa a ser
+    a do ramo mais lento. Todos os ramos vão até o fim (o que um ramo criou fica pronto para
+    a próxima tentativa); se algum falhar, levanta SetupError com a falha de cada ramo.
+    Retorna (transcricao, segmentos, user_voice_id, group_id); `segmentos` é um SegmentStore
+    colunar (inicios/fins/texto), não uma lista de dicts por palavra.
+    """
+    voz_padrao_nome = f"user_{user_id}"  # nome da voice Eleven
+    avatar_group_name = f"{voz_padrao_nome}"  # manter mesmo padrão "nome_id"
+
+    ramos = {
+        "stt": transcrever_audio_com_timestamps(caminho_audio),
+        # voice Eleven (mantemos criação/checar — Heygen usa voice_id daqui)
+        "voz": verificar_ou_criar_voz(voz_padrao_nome, caminho_audio, pasta_temp),
+        # avatar Heygen (group_id) — cria/usa existente
+        "avatar": heygen_verificar_ou_criar_avatar_do_usuario(
+            user_group_name=avatar_group_name,
+            source_image=caminho_foto,
+            palavra_chave=palavra_chave,
+            pasta_temp=pasta_temp,
+            num_fotos=10,
+            existing_group_id=heygen_group_id,
+            user_id=user_id,
+            save_group_id_async=save_group_id_async,
+        ),
+    }
+    resultados = await asyncio.gather(*ramos.values(), return_exceptions=True)
+
+    falhas: Dict[str, BaseException] = {}
+    for ramo, resultado in zip(ramos, resultados):
+        if isinstance(resultado, BaseException):
+            logger.warning("Ramo '%s' falhou para user=%s: %r", ramo, user_id, resultado)
+            falhas[ramo] = resultado
+    if falhas:
+        raise SetupError(falhas)
+
+    (transcricao, segmentos), user_voice_id, group_id = resultados
+    if not transcricao:
+        raise ValueError("Transcrição retornou vazia. Verifique o áudio original.")
+    return transcricao, segmentos, user_voice_id, group_id
@@ -0,0 +1,259 @@
+# services/pipeline/geracao.py
+import asyncio
+import logging
+import os
+import subprocess
+from typing import AsyncContextManager, Callable, Optional
+from uuid import UUID
+
+import httpx
+
+from services import heygen_group_cache as group_cache
+from services.config import AJUSTE_MS, HEYGEN_MODO, HTTP_TIMEOUT, PALAVRAS_ANTES, PALAVRAS_DEPOIS, WEBHOOK_URL
+from services.eleven.client import _eleven_headers, _eleven_request, _eleven_url
+from services.heygen.avatar import heygen_create_group, heygen_upload_photo
+from services.heygen.client import HEYGEN_GUARD
+from services.heygen.video import _heygen_renderizar
+from services.heygen.vozes import heygen_resolver_voz_do_usuario
+from services.media.ffmpeg import ENCODES
+from services.metrics import FALLBACKS, cronometrado, etapa
+from services.pipeline.splice import _gerar_video_splice
+from services.resilience import CircuitOpenError
+from services.segment_store import SegmentStore
+from services.transcript_index import TranscriptIndex, substituir_palavra_chave
+
+logger = logging.getLogger(__name__)
+
+# =====================
+# Geração final (Heygen primeiro; TTS fallback)
+# =====================
+
+async def gerar_video_para_nome(
+    nome: str,
+    palavra_chave: str,
+    transcricao: str,
+    segmentos: SegmentStore,
+    user_voice_id: str,
+    caminho_audio: str,
+    caminho_foto: str,
+    pasta_temp: str,
+    user_id: UUID,
+    group_id: Optional[str] = None,
+    enviar_webhook: bool = True,
+    heygen_voice_id: Optional[str] = None,
+    pasta_base: Optional[str] = None,
+    indice: Optional[TranscriptIndex] = None,
+    coleta: Optional[Callable[[], AsyncContextManager]] = None,
+):
+    """
+    Novo fluxo: gera o vídeo completo diretamente na Heygen a partir de uma foto estática.
+    Melhorias:
+      - Usa a transcrição pós-processada (pontuação melhorada).
+      - Substituição da palavra-chave usando regex com proteção contra nomes compostos
+        e evitando substituir pedaços de outras palavras.
+    Se algo falhar, cai no fallback que monta um vídeo simples (foto + TTS).
+    `pasta_base` é a pasta compartilhada da campanha (vídeo base do splice); padrão: pasta_temp.
+    `indice` é o TranscriptIndex da campanha (montado uma vez a partir de `segmentos`).
+    `coleta` é a vaga da campanha para polling + download na Heygen (ver _heygen_renderizar).
+    """
+    try:
+        # Heygen fora do ar (circuito aberto): vai direto para o fallback, sem esperar timeouts
+        HEYGEN_GUARD.verificar()
+
+        # 1) Texto base (já deve ter vindo do STT com pontuação melhorada)
+        texto_completo = transcricao or ""
+
+        # Protege contra substituir dentro de outras palavras (ex: "ana" em "analisar")
+        # e funciona mesmo se a palavra-chave tiver espaços (frase completa).
+        # Nome pode ser composto, com espaços, acentos etc.: entra literal.
+        novo_texto = substituir_palavra_chave(texto_completo, palavra_chave, nome)
+
+        # 2) Já devemos ter group_id (criado/checado no processar_video), mas mantemos opção de receber None
+        if not group_id:
+            if not os.path.isfile(caminho_foto):
+                raise RuntimeError("Foto base não encontrada para criar avatar na Heygen.")
+            first_key = await heygen_upload_photo(caminho_foto)
+            gname = f"user_{user_id}"
+            group_id = await heygen_create_group(gname, first_key)
+
+        # 3) voice_id da Heygen (a campanha resolve uma vez e repassa)
+        if not heygen_voice_id:
+            heygen_voice_id = await heygen_resolver_voz_do_usuario(user_id)
+
+        # 4) Renderiza: só a janela do nome sobre o vídeo base (splice) ou o script inteiro
+        caminho_saida_video = os.path.join(pasta_temp, f"video_{nome}.mp4")
+        feito = False
+        if HEYGEN_MODO == "splice" and palavra_chave:
+            try:
+                await _gerar_video_splice(
+                    nome, palavra_chave, transcricao or "", group_id, heygen_voice_id,
+                    pasta_temp, caminho_saida_video, pasta_base=pasta_base, coleta=coleta,
+                )
+                feito = True
+            except CircuitOpenError:
+                raise
+            except Exception as e:
+                FALLBACKS.labels("splice", "heygen_completo", "erro").inc()
+                logger.info("Falhou para '%s' (%s); renderizando o script completo", nome, e)
+        if not feito:
+            await _heygen_renderizar(group_id, heygen_voice_id, novo_texto, caminho_saida_video, coleta=coleta)
+
+        if enviar_webhook:
+            await enviar_video_para_webhook(caminho_saida_video, nome, user_id)
+
+        return caminho_saida_video
+
+    except Exception as e:
+        logger.warning("%s — usando TTS antigo…", e)
+        FALLBACKS.labels("heygen", "tts", "circuito" if isinstance(e, CircuitOpenError) else "erro").inc()
+        if group_id and not isinstance(e, CircuitOpenError):
+            # Render falhou: a próxima preparação volta a conferir o grupo na Heygen
+            await group_cache.invalidar_grupo(group_id)
+        # Fallback antigo (áudio)
+        return await gerar_video_para_nome_tts(
+            nome=nome,
+            palavra_chave=palavra_chave,
+            transcricao=transcricao,
+            segmentos=segmentos,
+            user_voice_id=user_voice_id,
+            caminho_audio=caminho_audio,
+            caminho_foto=caminho_foto,
+            pasta_temp=pasta_temp,
+            user_id=user_id,
+            enviar_webhook=enviar_webhook,
+            indice=indice,
+        )
+
+# ===== Fallback TTS antigo =====
+@cronometrado("video_tts")
+async def gerar_video_para_nome_tts(
+    nome: str,
+    palavra_chave: str,
+    transcricao: str,
+    segmentos: SegmentStore,
+    user_voice_id: str,
+    caminho_audio: str,
+    caminho_foto: str,
+    pasta_temp: str,
+    user_id: UUID,
+    enviar_webhook: bool = True,
+    indice: Optional[TranscriptIndex] = None,
+):
+    """
+    Fallback de geração de vídeo usando TTS.
+    Melhorias:
+      - Suporte a palavra-chave com mais de uma palavra.
+      - Proteção para nomes compostos na inserção (usa regex com limites de palavra).
+    """
+    if not segmentos:
+        raise ValueError("Transcrição não retornou palavras com timestamps (lista vazia).")
+
+    indice = indice or TranscriptIndex(segmentos)
+    if not indice.tokens:
+        raise ValueError("Transcrição não contém palavras utilizáveis para localizar a palavra-chave.")
+
+    if not (palavra_chave or "").strip():
+        raise ValueError("Palavra-chave vazia.")
+
+    achado = indice.localizar(palavra_chave)
+    if achado is None:
+        raise ValueError(f"Palavra-chave '{palavra_chave}' não encontrada na transcrição.")
+    # Palavra-chave composta: usa o índice da palavra "central" para o contexto temporal
+    primeiro, ultimo = achado
+    idx = primeiro + (ultimo - primeiro + 1) // 2
+
+    if not user_voice_id:
+        raise ValueError("ID da voz do usuário está vazio.")
+
+    inicio = max(0.0, segmentos.inicios[max(0, idx - PALAVRAS_ANTES)] - (AJUSTE_MS / 1000))
+    fim = segmentos.fins[min(len(segmentos) - 1, idx + PALAVRAS_DEPOIS)] + (AJUSTE_MS / 1000)
+
+    contexto = segmentos.palavras_no_intervalo(inicio, fim)
+    texto_original = segmentos.texto(contexto.start, contexto.stop - 1) if contexto else ""
+
+    formato_pausa = ". {nome}."
+    nome_formatado = formato_pausa.format(nome=nome)
+
+    # Substitui apenas a primeira ocorrência da palavra-chave (frase ou palavra),
+    # respeitando limites de palavra para não pegar pedaços de outras palavras.
+    novo_texto = substituir_palavra_chave(texto_original, palavra_chave, nome_formatado, count=1)
+
+    payload = {"voiceId": user_voice_id, "text": novo_texto}
+    headers = await _eleven_headers(include_json=True)
+    tts_resp = await _eleven_request("POST", _eleven_url("text-to-speech"), json=payload, headers=headers)
+    caminho_trecho_ia = os.path.join(pasta_temp, f"ia_{nome}.mp3")
+    with open(caminho_trecho_ia, "wb") as f:
+        f.write(tts_resp.content)
+
+    caminho_saida_video = os.path.join(pasta_temp, f"video_{nome}.mp4")
+
+    # Corta/concatena o áudio e codifica o vídeo (libx264) em thread: vários contatos caem
+    # no fallback juntos e o encode não pode parar o event loop. ENCODES limita a CPU.
+    async with ENCODES:
+        with etapa("ffmpeg_tts"):
+            await asyncio.to_thread(
+                _montar_video_tts, nome, caminho_audio, caminho_trecho_ia, caminho_foto,
+                inicio, fim, pasta_temp, caminho_saida_video,
+            )
+
+    if enviar_webhook:
+        await enviar_video_para_webhook(caminho_saida_video, nome, user_id)
+
+    return caminho_saida_video
+
+def _montar_video_tts(
+    nome: str,
+    caminho_audio: str,
+    caminho_trecho_ia: str,
+    caminho_foto: str,
+    inicio: float,
+    fim: float,
+    pasta_temp: str,
+    caminho_saida_video: str,
+) -> None:
+    """Áudio original até `inicio` + trecho TTS + original após `fim`, sobre a foto estática."""
+    # Nomes por contato: os contatos da campanha compartilham pasta_temp e rodam em paralelo
+    caminho_audio_antes = os.path.join(pasta_temp, f"antes_{nome}.wav")
+    caminho_audio_depois = os.path.join(pasta_temp, f"depois_{nome}.wav")
+    caminho_audio_final = os.path.join(pasta_temp, f"audio_final_{nome}.wav")
+
+    subprocess.run([
+        "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+        "-i", caminho_audio, "-ss", "0", "-to", f"{inicio:.3f}", caminho_audio_antes
+    ], check=True)
+    subprocess.run([
+        "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+        "-i", caminho_audio, "-ss", f"{fim:.3f}", caminho_audio_depois
+    ], check=True)
+    subprocess.run([
+        "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+        "-i", caminho_audio_antes, "-i", caminho_trecho_ia, "-i", caminho_audio_depois,
+        "-filter_complex", "[0:0][1:0][2:0]concat=n=3:v=0:a=1[out]",
+        "-map", "[out]", caminho_audio_final
+    ], check=True)
+    subprocess.run([
+        "ffmpeg", "-y", "-hide_banner", "-loglevel", "error",
+        "-loop", "1", "-i", caminho_foto, "-i", caminho_audio_final,
+        "-c:v", "libx264", "-tune", "stillimage",
+        "-c:a", "aac", "-b:a", "192k",
+        "-pix_fmt", "yuv420p",
+        "-shortest",
+        caminho_saida_video
+    ], check=True)
+
+# =====================
+# Webhook
+# =====================
+
+@cronometrado("webhook")
+async def enviar_video_para_webhook(caminho_video: str, nome: str, user_id: UUID, telefone: str | None = None):
+    try:
+        async with httpx.AsyncClient(timeout=HTTP_TIMEOUT) as client:
+            with open(caminho_video, "rb") as final_video:
+                files = {"file": (f"video_{nome}.mp4", final_video, "video/mp4")}
+                data = {"user_id": str(user_id), "nome": nome}
+                if telefone:
+                    data["telefone"] = telefone
+                await client.post(WEBHOOK_URL, data=data, files=files)
+    except httpx.HTTPError as e:
+        logger.warning("nome=%s tel=%s err=%s", nome, telefone or '-', e)
@@ -0,0 +1,167 @@
+# services/pipeline/splice.py
+import asyncio
+import logging
+import os
+import tempfile
+from typing import AsyncContextManager, Callable, Dict, Optional, Tuple
+
+from services import render_cache
+from services.config import AJUSTE_MS, HEYGEN_MIN_VIDEO_DURATION, PALAVRAS_ANTES, PALAVRAS_DEPOIS
+from services.eleven.stt import transcrever_audio_com_timestamps
+from services.heygen.video import _heygen_renderizar
+from services.media.ffmpeg import ENCODES, _ffmpeg_obter_propriedades, extrair_audio_do_video, overlay_clip_on_interval
+from services.metrics import cronometrado
+from services.segment_store import SegmentStore
+from services.transcript_index import TranscriptIndex
+
+logger = logging.getLogger(__name__)
+
+
+def _extrair_intervalo_por_palavra(
+    segmentos: SegmentStore,
+    palavra_chave: str,
+    min_duration: Optional[float] = None,
+    indice: Optional[TranscriptIndex] = None,
+) -> Tuple[float, float, str]:
+    """
+    Extrai intervalo de tempo ao redor da palavra-chave (uma ou mais palavras).
+    Se min_duration for fornecido (ou HEYGEN_MIN_VIDEO_DURATION configurado),
+    garante que o intervalo tenha pelo menos essa duração mínima.
+    `indice` (TranscriptIndex dos mesmos segmentos) evita reindexar a cada chamada.
+    """
+    if not segmentos:
+        raise ValueError("Lista de segmentos vazia.")
+    
+    # Usa min_duration fornecido ou a variável de ambiente
+    if min_duration is None:
+        min_duration = HEYGEN_MIN_VIDEO_DURATION
+    
+    # Encontra a palavra-chave nos segmentos
+    indice = indice or TranscriptIndex(segmentos)
+    achado = indice.localizar(palavra_chave)
+    if achado is None:
+        raise ValueError(f"Palavra-chave '{palavra_chave}' não encontrada nos segmentos.")
+    primeiro, ultimo = achado
+    
+    # Calcula intervalo inicial baseado nas palavras antes e depois
+    inicio = max(0.0, segmentos.inicios[max(0, primeiro - PALAVRAS_ANTES)] - (AJUSTE_MS / 1000))
+    fim = segmentos.fins[min(len(segmentos)-1, ultimo + PALAVRAS_DEPOIS)] + (AJUSTE_MS / 1000)
+    
+    # Duração total do vídeo: fim da última palavra
+    duracao_total = segmentos.duracao_total
+    
+    # Calcula o tempo central da palavra-chave (meio do intervalo da palavra)
+    palavra_start = segmentos.inicios[primeiro]
+    palavra_end = segmentos.fins[ultimo]
+    tempo_central = (palavra_start + palavra_end) / 2.0
+    
+    # Verifica se precisa expandir o intervalo para atingir a duração mínima
+    duracao_atual = fim - inicio
+    if duracao_atual < min_duration and duracao_total > 0:
+        # Expande simetricamente ao redor do tempo central da palavra-chave
+        # Calcula quanto expandir de cada lado
+        expansao_total = min_duration - duracao_atual
+        expansao_por_lado = expansao_total / 2.0
+        
+        # Expande para trás (início) e para frente (fim)
+        novo_inicio = max(0.0, tempo_central - (min_duration / 2.0))
+        novo_fim = min(duracao_total, tempo_central + (min_duration / 2.0))
+        
+        # Se chegou no limite do vídeo em um lado, expande mais no outro lado
+        if novo_inicio <= 0.0:
+            # Não pode expandir mais para trás, expande tudo para frente
+            novo_inicio = 0.0
+            novo_fim = min(duracao_total, min_duration)
+        elif novo_fim >= duracao_total:
+            # Não pode expandir mais para frente, expande tudo para trás
+            novo_fim = duracao_total
+            novo_inicio = max(0.0, duracao_total - min_duration)
+        
+        # Garante que não ultrapasse os limites
+        novo_inicio = max(0.0, novo_inicio)
+        novo_fim = min(duracao_total, novo_fim)
+        
+        # Atualiza apenas se a nova duração for maior que a atual
+        if (novo_fim - novo_inicio) > duracao_atual:
+            inicio = novo_inicio
+            fim = novo_fim
+            logger.info("Intervalo expandido para garantir duração mínima: %ss (de %.2fs para %.2fs)", min_duration, duracao_atual, fim - inicio)
+        else:
+            logger.warning("Não foi possível expandir intervalo para %ss (duração total do vídeo: %.2fs)", min_duration, duracao_total)
+    elif duracao_total == 0.0:
+        logger.warning("Não foi possível determinar duração total do vídeo. Usando intervalo original: %.2fs", duracao_atual)
+
+    # Coleta palavras do contexto expandido (busca binária nos tempos)
+    contexto = segmentos.palavras_no_intervalo(inicio, fim)
+    texto_original = segmentos.texto(contexto.start, contexto.stop - 1) if contexto else ""
+    palavra_alvo_literal = segmentos.texto(primeiro, ultimo)
+    return inicio, fim, texto_original.replace(palavra_alvo_literal, ". {nome}.", 1)
+
+# Por script base + palavra-chave: (início, fim, texto da janela com "{nome}", largura do vídeo)
+# medidos no próprio render base
+_SPLICE_JANELAS_MAX = 256
+
+_splice_janelas: Dict[str, Tuple[float, float, str, int]] = {}
+
+async def _splice_base(
+    group_id: str, voice_id: str, transcricao: str, palavra_chave: str, pasta_temp: str
+) -> Tuple[str, float, float, str, int]:
+    """
+    Vídeo base da campanha (script completo com a palavra-chave original, renderizado uma vez)
+    e a janela ao redor da palavra-chave, medida por STT do próprio render — o ritmo da voz
+    da Heygen não é o mesmo do áudio enviado pelo usuário. A largura do base (ffprobe) é lida
+    junto e guardada com a janela, em vez de uma vez por contato.
+    O base depende só do script; a janela depende também da palavra-chave (a mesma
+    transcrição pode ser usada em campanhas com palavras-chave diferentes).
+    """
+    chave = render_cache.chave_render(group_id, voice_id, transcricao)
+    caminho_base = os.path.join(pasta_temp, f"splice_base_{chave[:16]}.mp4")
+    chave_janela = f"{chave}:{palavra_chave}"
+    async with render_cache.trava(f"splice:{chave_janela}"):
+        if not os.path.isfile(caminho_base):
+            await _heygen_renderizar(group_id, voice_id, transcricao, caminho_base)
+
+        janela = _splice_janelas.get(chave_janela)
+        if janela is None:
+            with tempfile.TemporaryDirectory(dir=pasta_temp) as td:
+                caminho_audio_base = await asyncio.to_thread(extrair_audio_do_video, caminho_base, td)
+                _, segmentos_base = await transcrever_audio_com_timestamps(caminho_audio_base)
+            largura = (await asyncio.to_thread(_ffmpeg_obter_propriedades, caminho_base))["width"]
+            janela = (*_extrair_intervalo_por_palavra(segmentos_base, palavra_chave), largura)
+            if len(_splice_janelas) >= _SPLICE_JANELAS_MAX:
+                _splice_janelas.pop(next(iter(_splice_janelas)))
+            _splice_janelas[chave_janela] = janela
+            logger.info("Base pronta: janela %.2fs–%.2fs -> '%s'", janela[0], janela[1], janela[2])
+    inicio, fim, texto_janela, largura = janela
+    return caminho_base, inicio, fim, texto_janela, largura
+
+@cronometrado("video_splice")
+async def _gerar_video_splice(
+    nome: str,
+    palavra_chave: str,
+    transcricao: str,
+    group_id: str,
+    voice_id: str,
+    pasta_temp: str,
+    caminho_saida_video: str,
+    pasta_base: Optional[str] = None,
+    coleta: Optional[Callable[[], AsyncContextManager]] = None,
+) -> str:
+    """
+    Modo splice: a Heygen renderiza só a janela curta com o nome (≥ HEYGEN_MIN_VIDEO_DURATION),
+    que substitui em tela cheia o mesmo trecho do vídeo base da campanha. O trecho assume a
+    duração real do clip (a fala do nome não é cortada nem repetida).
+    """
+    caminho_base, inicio, fim, texto_janela, largura = await _splice_base(
+        group_id, voice_id, transcricao, palavra_chave, pasta_base or pasta_temp
+    )
+    clip = os.path.join(pasta_temp, f"heygen_clip_{nome}.mp4")
+    await _heygen_renderizar(group_id, voice_id, texto_janela.replace("{nome}", nome), clip, coleta=coleta)
+
+    async with ENCODES:  # overlay re-encoda o vídeo: mesma vaga de CPU do fallback TTS
+        await asyncio.to_thread(
+            overlay_clip_on_interval,
+            caminho_base, clip, inicio, fim, caminho_saida_video,
+            overlay_x="0", overlay_y="0", scale_w=largura,
+        )
+    return caminho_saida_video
@@ -0,0 +1,168 @@
+# services/rate_limit.py
+import asyncio
+import logging
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+import httpx
+
+from redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# =====================
+# Token bucket compartilhado (Redis)
+# =====================
+# Executado atomicamente no Redis; usa o relógio do próprio Redis (TIME) para que
+# workers com relógios diferentes enxerguem o mesmo bucket.
+# Retorna (como string) quantos segundos esperar: "0" = token concedido.
+_LUA_TOKEN_BUCKET = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local pause_until = tonumber(redis.call('GET', KEYS[2]) or '0')
+if pause_until > now then
+  return tostring(pause_until - now)
+end
+local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(data[1]) or burst
+local ts = tonumber(data[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+else
+  wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], 600000)
+return tostring(wait)
+"""
+
+_LUA_PAUSE = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local until_ts = now + tonumber(ARGV[1])
+local atual = tonumber(redis.call('GET', KEYS[1]) or '0')
+if until_ts > atual then
+  redis.call('SET', KEYS[1], tostring(until_ts), 'PX', math.ceil(tonumber(ARGV[1]) * 1000) + 1000)
+end
+return tostring(until_ts)
+"""
+
+
+def retry_after_segundos(resp: httpx.Response) -> Optional[float]:
+    """Lê Retry-After (segundos ou data HTTP)."""
+    valor = (resp.headers.get("retry-after") or "").strip()
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(valor).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _reset_segundos(resp: httpx.Response) -> Optional[float]:
+    """X-RateLimit-Reset / RateLimit-Reset: segundos até a janela reabrir (ou epoch)."""
+    valor = resp.headers.get("x-ratelimit-reset") or resp.headers.get("ratelimit-reset")
+    if not valor:
+        return None
+    try:
+        reset = float(valor)
+    except ValueError:
+        return None
+    # alguns servidores mandam epoch absoluto
+    return max(0.0, reset - time.time()) if reset > 1_000_000_000 else max(0.0, reset)
+
+
+class RateGovernor:
+    """
+    Governa o ritmo de TODAS as chamadas a um upstream (create, poll, voices, avatars...):
+      - token bucket de `taxa` req/s com rajada `rajada`, compartilhado entre workers via Redis
+        (cai para um bucket local se o Redis estiver fora);
+      - 429 / Retry-After / X-RateLimit-Remaining=0 pausam o bucket inteiro até a janela
+        reabrir, em vez de cada chamada descobrir o limite sozinha.
+    """
+
+    def __init__(self, nome: str, taxa: float, rajada: int):
+        self.nome = nome
+        self.taxa = taxa
+        self.rajada = rajada
+        # scripts registrados no primeiro uso (o cliente Redis é criado sob demanda)
+        self._script_bucket = None
+        self._script_pausa = None
+        # fallback local
+        self._tokens = float(rajada)
+        self._ts = time.monotonic()
+        self._pausa_ate = 0.0
+
+    def _registrar_scripts(self) -> None:
+        if self._script_bucket is None:
+            r = get_redis()
+            self._script_bucket = r.register_script(_LUA_TOKEN_BUCKET)
+            self._script_pausa = r.register_script(_LUA_PAUSE)
+
+    @property
+    def _keys(self) -> list[str]:
+        return [f"ratelimit:{self.nome}:bucket", f"ratelimit:{self.nome}:pause_until"]
+
+    def _tentar_local(self) -> float:
+        agora = time.monotonic()
+        if self._pausa_ate > agora:
+            return self._pausa_ate - agora
+        self._tokens = min(self.rajada, self._tokens + (agora - self._ts) * self.taxa)
+        self._ts = agora
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.taxa
+
+    async def _tentar(self) -> float:
+        try:
+            self._registrar_scripts()
+            return float(await self._script_bucket(keys=self._keys, args=[self.taxa, self.rajada]))
+        except Exception:
+            return self._tentar_local()
+
+    async def adquirir(self) -> None:
+        """Espera até haver vaga no ritmo permitido."""
+        while True:
+            espera = await self._tentar()
+            if espera <= 0:
+                return
+            # jitter pequeno para os workers não acordarem todos juntos
+            await asyncio.sleep(espera + random.uniform(0, 0.05))
+
+    async def pausar(self, segundos: float) -> None:
+        self._pausa_ate = max(self._pausa_ate, time.monotonic() + segundos)
+        try:
+            self._registrar_scripts()
+            await self._script_pausa(keys=self._keys[1:], args=[segundos])
+        except Exception:
+            pass
+
+    async def observar(self, resp: httpx.Response, tentativa: int = 0) -> Optional[float]:
+        """
+        Lê os headers de rate limit da resposta. Em 429 (ou janela esgotada) pausa o bucket
+        compartilhado e retorna por quantos segundos; caso contrário retorna None.
+        """
+        pausa = None
+        if resp.status_code == 429:
+            pausa = retry_after_segundos(resp) or _reset_segundos(resp)
+            if pausa is None:
+                pausa = min(60.0, 2.0 * (2 ** tentativa))
+        else:
+            restante = resp.headers.get("x-ratelimit-remaining") or resp.headers.get("ratelimit-remaining")
+            if restante is not None and restante.strip() == "0":
+                pausa = _reset_segundos(resp) or retry_after_segundos(resp)
+        if pausa:
+            logger.info("%s: limite atingido (status=%s), pausando %.1fs", self.nome, resp.status_code, pausa)
+            await self.pausar(pausa)
+        return pausa
@@ -0,0 +1,103 @@
+# services/render_cache.py
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import weakref
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# =====================
+# Config
+# =====================
+RENDER_CACHE_DIR = os.getenv(
+    "RENDER_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "videosmartai_renders"),
+)
+RENDER_CACHE_MAX_BYTES = int(os.getenv("RENDER_CACHE_MAX_BYTES", str(5 * 1024 * 1024 * 1024)))  # 5 GB
+
+# Um lock por chave: renders iguais e simultâneos (ex.: duas "Maria") viram um só
+_travas: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+def chave_render(group_id: str, voice_id: str, script: str) -> str:
+    """sha256 de (group_id, voice_id da Heygen, script final já com o nome substituído)."""
+    payload = json.dumps([group_id, voice_id, script], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _caminho(chave: str) -> str:
+    return os.path.join(RENDER_CACHE_DIR, f"{chave}.mp4")
+
+
+def trava(chave: str) -> asyncio.Lock:
+    lock = _travas.get(chave)
+    if lock is None:
+        lock = asyncio.Lock()
+        _travas[chave] = lock
+    return lock
+
+
+def obter_render(chave: str, destino: str) -> Optional[str]:
+    """
+    Copia o render em cache para `destino` (o chamador pode mover/apagar a cópia). None se não houver.
+    Bloqueante (cópia de arquivo): chamar via asyncio.to_thread, assim como salvar_render.
+    """
+    origem = _caminho(chave)
+    try:
+        shutil.copyfile(origem, destino)
+        os.utime(origem)  # LRU por mtime
+    except OSError:
+        return None
+    return destino
+
+
+def salvar_render(chave: str, caminho_video: str) -> None:
+    """Guarda uma cópia do render no cache (escrita atômica) e aplica o limite de tamanho."""
+    tmp = None
+    try:
+        os.makedirs(RENDER_CACHE_DIR, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=RENDER_CACHE_DIR, suffix=".part")
+        os.close(fd)
+        shutil.copyfile(caminho_video, tmp)
+        os.replace(tmp, _caminho(chave))
+    except OSError as e:
+        logger.warning("falha ao gravar %s: %s", chave, e)
+        # .part não entra na conta do _evictar: se ficasse, vazaria (disco cheio é o caso típico)
+        if tmp:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+        return
+    _evictar()
+
+
+def _evictar() -> None:
+    """Remove os renders menos usados recentemente até caber em RENDER_CACHE_MAX_BYTES."""
+    entradas = []
+    total = 0
+    for nome in os.listdir(RENDER_CACHE_DIR):
+        if not nome.endswith(".mp4"):
+            continue
+        caminho = os.path.join(RENDER_CACHE_DIR, nome)
+        try:
+            st = os.stat(caminho)
+        except OSError:
+            continue
+        entradas.append((st.st_mtime, st.st_size, caminho))
+        total += st.st_size
+    if total <= RENDER_CACHE_MAX_BYTES:
+        return
+    for _, tamanho, caminho in sorted(entradas):
+        try:
+            os.remove(caminho)
+            total -= tamanho
+        except OSError:
+            pass
+        if total <= RENDER_CACHE_MAX_BYTES:
+            break
@@ -0,0 +1,244 @@
+# services/resilience.py
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+import httpx
+
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+# =====================
+# Config
+# =====================
+CB_FAILURE_THRESHOLD = int(os.getenv("CB_FAILURE_THRESHOLD", "5"))  # falhas seguidas para abrir
+CB_COOLDOWN_S = float(os.getenv("CB_COOLDOWN_S", "30"))             # tempo aberto antes de testar (half-open)
+
+# =====================
+# Circuit breaker
+# =====================
+
+class CircuitOpenError(RuntimeError):
+    """Upstream marcado como indisponível: falha imediata em vez de esperar timeout."""
+
+    def __init__(self, upstream: str, retry_em: float):
+        self.upstream = upstream
+        self.retry_em = retry_em
+        super().__init__(f"Circuit breaker aberto para '{upstream}' (nova tentativa em {max(0.0, retry_em):.0f}s)")
+
+
+class CircuitBreaker:
+    """
+    closed -> open após `limite_falhas` falhas seguidas (5xx, timeout, erro de conexão);
+    open -> half-open após `cooldown` segundos, liberando uma única chamada de teste;
+    half-open -> closed se o teste passar, ou de volta a open se falhar.
+    """
+    FECHADO = "closed"
+    ABERTO = "open"
+    MEIO_ABERTO = "half-open"
+
+    def __init__(self, nome: str, limite_falhas: int = CB_FAILURE_THRESHOLD, cooldown: float = CB_COOLDOWN_S):
+        self.nome = nome
+        self.limite_falhas = limite_falhas
+        self.cooldown = cooldown
+        self._estado = self.FECHADO
+        self._falhas = 0
+        self._aberto_em = 0.0
+        self._sonda_em_voo = False
+
+    @property
+    def estado(self) -> str:
+        if self._estado == self.ABERTO and time.monotonic() - self._aberto_em >= self.cooldown:
+            self._estado = self.MEIO_ABERTO
+            self._sonda_em_voo = False
+        return self._estado
+
+    @property
+    def aberto(self) -> bool:
+        """True enquanto chamadas novas seriam recusadas (open, ou half-open com sonda em voo)."""
+        estado = self.estado
+        return estado == self.ABERTO or (estado == self.MEIO_ABERTO and self._sonda_em_voo)
+
+    def segundos_para_retry(self) -> float:
+        return self.cooldown - (time.monotonic() - self._aberto_em)
+
+    def permitir(self) -> None:
+        estado = self.estado
+        if estado == self.FECHADO:
+            return
+        if estado == self.MEIO_ABERTO and not self._sonda_em_voo:
+            self._sonda_em_voo = True
+            return
+        raise CircuitOpenError(self.nome, self.segundos_para_retry())
+
+    def liberar_sonda(self) -> None:
+        """Sonda half-open terminou sem resposta conclusiva: libera para a próxima chamada."""
+        if self._estado == self.MEIO_ABERTO:
+            self._sonda_em_voo = False
+
+    def registrar_sucesso(self) -> None:
+        if self._estado != self.FECHADO:
+            logger.info("%s: upstream respondeu, circuito fechado", self.nome)
+        self._estado = self.FECHADO
+        self._falhas = 0
+        self._sonda_em_voo = False
+
+    def registrar_falha(self) -> None:
+        self._falhas += 1
+        if self._estado == self.MEIO_ABERTO or self._falhas >= self.limite_falhas:
+            if self._estado != self.ABERTO:
+                logger.info("%s: %s falha(s) seguida(s), circuito aberto por %.0fs", self.nome, self._falhas, self.cooldown)
+            self._estado = self.ABERTO
+            self._aberto_em = time.monotonic()
+            self._sonda_em_voo = False
+
+# =====================
+# Concorrência adaptativa (AIMD)
+# =====================
+
+class AdaptiveLimiter:
+    """
+    Limite de chamadas simultâneas ajustado por AIMD:
+      - sucesso dentro da latência alvo: +1/limite (≈ +1 por "rodada" de chamadas);
+      - latência acima do alvo: limite × 0.9;
+      - 429 / 5xx / timeout: limite × 0.5.
+    """
+
+    def __init__(self, nome: str, inicial: float, minimo: float, maximo: float, latencia_alvo: float):
+        self.nome = nome
+        self.minimo = minimo
+        self.maximo = maximo
+        self.latencia_alvo = latencia_alvo
+        self.limite = max(minimo, min(maximo, inicial))
+        self.em_uso = 0
+        self.aguardando = 0
+        self._cond = asyncio.Condition()
+
+    async def adquirir(self) -> None:
+        async with self._cond:
+            self.aguardando += 1
+            try:
+                await self._cond.wait_for(lambda: self.em_uso < int(self.limite))
+            finally:
+                self.aguardando -= 1
+            self.em_uso += 1
+
+    async def liberar(self, latencia: Optional[float], sobrecarga: bool) -> None:
+        async with self._cond:
+            self.em_uso -= 1
+            if sobrecarga:
+                self.limite = max(self.minimo, self.limite * 0.5)
+            elif latencia is not None and latencia > self.latencia_alvo:
+                self.limite = max(self.minimo, self.limite * 0.9)
+            elif latencia is not None:
+                self.limite = min(self.maximo, self.limite + 1.0 / self.limite)
+            self._cond.notify_all()
+
+# =====================
+# Guarda por upstream (breaker + limiter)
+# =====================
+
+class _Chamada:
+    def __init__(self):
+        self.status: Optional[int] = None
+
+    def resultado(self, resp: httpx.Response) -> None:
+        self.status = resp.status_code
+
+
+class _ContextoChamada:
+    def __init__(self, guard: "UpstreamGuard", medir_latencia: bool, endpoint: str):
+        self.guard = guard
+        self.medir_latencia = medir_latencia
+        self.endpoint = endpoint
+        self.chamada = _Chamada()
+        self._inicio = 0.0
+
+    async def __aenter__(self) -> _Chamada:
+        self.guard.breaker.permitir()
+        try:
+            await self.guard.limiter.adquirir()
+        except BaseException:
+            self.guard.breaker.liberar_sonda()
+            raise
+        self._inicio = time.monotonic()
+        return self.chamada
+
+    async def __aexit__(self, exc_type, exc, tb) -> bool:
+        latencia = time.monotonic() - self._inicio
+        status = self.chamada.status
+        if isinstance(exc, httpx.HTTPStatusError) and exc.response is not None:
+            status = exc.response.status_code
+        if status is not None or isinstance(exc, httpx.TransportError):
+            metrics.UPSTREAM_SEGUNDOS.labels(self.guard.nome, self.endpoint, metrics.classe_status(status)).observe(latencia)
+        if status == 429:
+            metrics.UPSTREAM_RATE_LIMIT.labels(self.guard.nome).inc()
+
+        if isinstance(exc, httpx.TransportError):
+            falha, sobrecarga = True, True
+        elif status is not None and status >= 500:
+            falha, sobrecarga = True, True
+        elif status == 429:
+            # saudável porém limitado: reduz concorrência sem abrir o circuito
+            falha, sobrecarga = False, True
+        else:
+            falha, sobrecarga = False, False
+
+        if falha:
+            self.guard.breaker.registrar_falha()
+        elif status is not None:
+            self.guard.breaker.registrar_sucesso()
+        else:
+            self.guard.breaker.liberar_sonda()
+
+        await self.guard.limiter.liberar(
+            latencia if (self.medir_latencia and status is not None) else None,
+            sobrecarga,
+        )
+        return False
+
+
+class UpstreamGuard:
+    """
+    Uso:
+        async with HEYGEN_GUARD.chamada() as chamada:
+            resp = await client.request(...)
+            chamada.resultado(resp)
+    Falha imediata (CircuitOpenError) quando o upstream está fora; espera vaga no limite
+    adaptativo quando está lento/limitado.
+    """
+
+    def __init__(self, nome: str, breaker: CircuitBreaker, limiter: AdaptiveLimiter):
+        self.nome = nome
+        self.breaker = breaker
+        self.limiter = limiter
+
+    def verificar(self) -> None:
+        """Levanta CircuitOpenError se o upstream está aberto (sem consumir a sonda half-open)."""
+        if self.breaker.aberto:
+            raise CircuitOpenError(self.nome, self.breaker.segundos_para_retry())
+
+    def chamada(self, medir_latencia: bool = True, endpoint: str = "outro") -> _ContextoChamada:
+        """`endpoint`: rota sem ids (metrics.rotulo_endpoint), usada só como label de métrica."""
+        return _ContextoChamada(self, medir_latencia, endpoint)
+
+
+GUARDS: Dict[str, UpstreamGuard] = {}  # por nome, para o /metrics (services/metrics.py)
+
+
+def criar_guard(nome: str, concorrencia_inicial: int, concorrencia_max: int, latencia_alvo: float) -> UpstreamGuard:
+    """Cria a guarda de um upstream; valores podem ser sobrescritos por env (<NOME>_MAX_CONCURRENCY etc.)."""
+    prefixo = nome.upper()
+    inicial = float(os.getenv(f"{prefixo}_INITIAL_CONCURRENCY", str(concorrencia_inicial)))
+    maximo = float(os.getenv(f"{prefixo}_MAX_CONCURRENCY", str(concorrencia_max)))
+    alvo = float(os.getenv(f"{prefixo}_LATENCY_TARGET_S", str(latencia_alvo)))
+    guard = UpstreamGuard(
+        nome,
+        CircuitBreaker(nome),
+        AdaptiveLimiter(nome, inicial=inicial, minimo=1.0, maximo=maximo, latencia_alvo=alvo),
+    )
+    GUARDS[nome] = guard
+    return guard
@@ -0,0 +1,88 @@
+# services/segment_store.py
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, Iterator, List, Union
+
+
+class SegmentStore:
+    """
+    Palavras da transcrição em colunas: `inicios`/`fins` em array('d') (8 bytes por valor)
+    e `textos` internados, em vez de um dict por palavra.
+    Os tempos são crescentes (ordem do STT), então intervalo -> palavras é busca binária.
+    """
+    __slots__ = ("inicios", "fins", "textos")
+
+    def __init__(self, inicios: array, fins: array, textos: List[str]):
+        self.inicios = inicios
+        self.fins = fins
+        self.textos = textos
+
+    @classmethod
+    def vazio(cls) -> "SegmentStore":
+        return cls(array("d"), array("d"), [])
+
+    def adicionar(self, texto: str, inicio: float, fim: float) -> None:
+        self.textos.append(sys.intern(texto))
+        self.inicios.append(inicio)
+        self.fins.append(fim)
+
+    @classmethod
+    def de_segmentos(cls, segmentos: Iterable[Dict[str, Any]]) -> "SegmentStore":
+        """Converte o formato antigo (lista de dicts {type, text, start, end}); ignora não-palavras."""
+        store = cls.vazio()
+        for w in segmentos:
+            if str(w.get("type", "word")) != "word" or not w.get("text"):
+                continue
+            store.adicionar(str(w["text"]), float(w.get("start") or 0.0), float(w.get("end") or 0.0))
+        return store
+
+    # ---- Redis / JSON ----
+
+    def para_json(self) -> Dict[str, list]:
+        """Forma colunar (uma lista por campo) para o estado do preview no Redis."""
+        return {"start": self.inicios.tolist(), "end": self.fins.tolist(), "text": list(self.textos)}
+
+    @classmethod
+    def de_json(cls, data: Union[Dict[str, list], List[Dict[str, Any]], None]) -> "SegmentStore":
+        """Aceita a forma colunar ou a lista de dicts de previews gravados antes da mudança."""
+        if not data:
+            return cls.vazio()
+        if isinstance(data, list):
+            return cls.de_segmentos(data)
+        return cls(
+            array("d", data.get("start") or []),
+            array("d", data.get("end") or []),
+            [sys.intern(str(t)) for t in data.get("text") or []],
+        )
+
+    # ---- Consultas ----
+
+    def __len__(self) -> int:
+        return len(self.textos)
+
+    def __iter__(self) -> Iterator[tuple]:
+        """(texto, início, fim) de cada palavra."""
+        return zip(self.textos, self.inicios, self.fins)
+
+    @property
+    def duracao_total(self) -> float:
+        return self.fins[-1] if self.fins else 0.0
+
+    def palavras_no_intervalo(self, inicio: float, fim: float) -> range:
+        """Índices das palavras inteiramente dentro de [inicio, fim]."""
+        primeiro = bisect_left(self.inicios, inicio)
+        ultimo = bisect_right(self.fins, fim)
+        return range(primeiro, max(primeiro, ultimo))
+
+    def texto(self, primeiro: int, ultimo: int) -> str:
+        """Texto das palavras de `primeiro` a `ultimo` (inclusive)."""
+        return " ".join(self.textos[primeiro:ultimo + 1])
+
+
+def como_store(segmentos: Union[SegmentStore, Iterable[Dict[str, Any]], Dict[str, list], None]) -> SegmentStore:
+    if isinstance(segmentos, SegmentStore):
+        return segmentos
+    if isinstance(segmentos, dict):
+        return SegmentStore.de_json(segmentos)
+    return SegmentStore.de_segmentos(segmentos or [])
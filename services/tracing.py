@@ -0,0 +1,88 @@
+# services/tracing.py
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional, Sequence
+
+from opentelemetry import context as otel_context
+from opentelemetry import trace
+
+logger = logging.getLogger(__name__)
+
+# =====================
+# Config do tracing (OpenTelemetry)
+# =====================
+# Sem OTEL_EXPORTER_OTLP_ENDPOINT nem TRACING_ARQUIVO o tracing fica desligado: o tracer abaixo
+# é o no-op da API e os spans não custam nada além da chamada.
+OTEL_EXPORTER_OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "").strip()
+OTEL_SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "videosmartai-api").strip()
+TRACING_ARQUIVO = os.getenv("TRACING_ARQUIVO", "").strip()  # um span JSON por linha (testes/debug local)
+
+# Proxy da API: passa a exportar quando configurar_tracing() instala o provider
+tracer = trace.get_tracer("videosmartai")
+
+_provider = None
+
+
+def _exportador_arquivo(caminho: str):
+    from opentelemetry.sdk.trace.export import SpanExporter, SpanExportResult
+
+    class ExportadorArquivo(SpanExporter):
+        """Acrescenta cada span terminado em `caminho`, um JSON por linha."""
+
+        def __init__(self):
+            self._lock = threading.Lock()
+
+        def export(self, spans: Sequence[Any]) -> "SpanExportResult":
+            linhas = "".join(s.to_json(indent=None) + "\n" for s in spans)
+            with self._lock, open(caminho, "a", encoding="utf-8") as f:
+                f.write(linhas)
+            return SpanExportResult.SUCCESS
+
+        def shutdown(self) -> None:
+            pass
+
+    return ExportadorArquivo()
+
+
+def configurar_tracing() -> bool:
+    """
+    Instala o provider com os exportadores configurados (OTLP e/ou arquivo) e instrumenta o httpx,
+    que passa a propagar o traceparent para os proxies Node. Chamado no startup; True se ligou.
+    """
+    global _provider
+    if _provider is not None or not (OTEL_EXPORTER_OTLP_ENDPOINT or TRACING_ARQUIVO):
+        return _provider is not None
+
+    from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, SimpleSpanProcessor
+
+    provider = TracerProvider(resource=Resource.create({"service.name": OTEL_SERVICE_NAME}))
+    if OTEL_EXPORTER_OTLP_ENDPOINT:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))  # endpoint/headers lidos do env OTEL_*
+    if TRACING_ARQUIVO:
+        provider.add_span_processor(SimpleSpanProcessor(_exportador_arquivo(TRACING_ARQUIVO)))
+    trace.set_tracer_provider(provider)
+    HTTPXClientInstrumentor().instrument()
+    _provider = provider
+    logger.info("ligado: otlp=%s arquivo=%s", OTEL_EXPORTER_OTLP_ENDPOINT or '-', TRACING_ARQUIVO or '-')
+    return True
+
+
+def encerrar_tracing() -> None:
+    """Exporta os spans pendentes (shutdown do app)."""
+    if _provider is not None:
+        _provider.shutdown()
+
+
+def span(nome: str, atributos: Optional[Dict[str, Any]] = None):
+    """Span filho do span atual (`with tracing.span("..."):`)."""
+    return tracer.start_as_current_span(nome, attributes=atributos)
+
+
+def span_raiz(nome: str, atributos: Optional[Dict[str, Any]] = None):
+    """Span que abre um trace novo (ex: uma campanha), sem herdar o span da request que a disparou."""
+    return tracer.start_as_current_span(nome, context=otel_context.Context(), attributes=atributos)
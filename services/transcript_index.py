@@ -0,0 +1,84 @@
+# services/transcript_index.py
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from services.segment_store import SegmentStore
+
+_NAO_ALFANUM = re.compile(r"[\W_]+")
+
+
+def normalizar_token(s: str) -> str:
+    """
+    Forma canônica para comparar palavras: sem acentos, casefold, pontuação vira espaço.
+    Única definição usada para localizar a palavra-chave (Heygen, splice e fallback TTS).
+    """
+    if not s:
+        return ""
+    s = unicodedata.normalize("NFKD", s)
+    s = "".join(c for c in s if not unicodedata.combining(c))
+    return _NAO_ALFANUM.sub(" ", s.casefold()).strip()
+
+
+@lru_cache(maxsize=256)
+def padrao_palavra_chave(palavra_chave: str) -> "re.Pattern[str]":
+    """
+    Regex (compilada uma vez por palavra-chave) que casa a palavra-chave inteira no texto:
+    não pega pedaços de outras palavras (ex: "ana" em "analisar") e aceita qualquer
+    espaçamento entre as palavras de uma palavra-chave composta.
+    """
+    partes = [re.escape(p) for p in palavra_chave.split()]
+    return re.compile(r"(?<!\w)" + r"\s+".join(partes) + r"(?!\w)", re.IGNORECASE)
+
+
+def substituir_palavra_chave(texto: str, palavra_chave: str, substituto: str, count: int = 0) -> str:
+    """Troca a palavra-chave por `substituto` (literal, sem interpretar backreferences)."""
+    if not palavra_chave or not palavra_chave.strip():
+        return texto
+    return padrao_palavra_chave(palavra_chave.strip()).sub(lambda _m: substituto, texto, count=count)
+
+
+class TranscriptIndex:
+    """
+    Índice da transcrição, montado uma vez por campanha a partir dos `segmentos`:
+      - tokens normalizados de cada palavra;
+      - mapa token -> posições, para achar a palavra-chave sem varrer a lista;
+      - cache das ocorrências já resolvidas por palavra-chave.
+    Posições são índices de palavra no SegmentStore.
+    """
+
+    def __init__(self, segmentos: SegmentStore):
+        self.segmentos = segmentos
+        self.tokens: List[str] = [normalizar_token(t) for t in segmentos.textos]
+        self.posicoes: Dict[str, List[int]] = {}
+        for p, tok in enumerate(self.tokens):
+            if tok:
+                self.posicoes.setdefault(tok, []).append(p)
+        self._ocorrencias: Dict[str, Optional[Tuple[int, int]]] = {}
+
+    def localizar(self, palavra_chave: str) -> Optional[Tuple[int, int]]:
+        """
+        Primeira ocorrência da palavra-chave (uma ou mais palavras) como
+        (índice da primeira palavra, índice da última palavra); None se não houver.
+        """
+        alvo = normalizar_token(palavra_chave)
+        if alvo in self._ocorrencias:
+            return self._ocorrencias[alvo]
+
+        achado = None
+        if alvo:
+            # Palavra única (ou que a própria transcrição trouxe como um só item): lookup direto
+            inteiro = self.posicoes.get(alvo)
+            if inteiro:
+                achado = (inteiro[0], inteiro[0])
+            else:
+                alvo_tokens = alvo.split()
+                n = len(alvo_tokens)
+                if n > 1:
+                    for p in self.posicoes.get(alvo_tokens[0], ()):
+                        if self.tokens[p:p + n] == alvo_tokens:
+                            achado = (p, p + n - 1)
+                            break
+        self._ocorrencias[alvo] = achado
+        return achado
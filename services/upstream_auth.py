@@ -0,0 +1,199 @@
+# services/upstream_auth.py
+import asyncio
+import base64
+import json
+import logging
+import os
+import secrets
+import time
+from typing import Optional, Tuple
+
+import httpx
+
+from redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# =====================
+# Config
+# =====================
+TOKEN_REFRESH_MARGIN = float(os.getenv("TOKEN_REFRESH_MARGIN", "300"))  # renova 5 min antes do exp
+TOKEN_FALLBACK_TTL = 50 * 60  # quando o token não é um JWT com "exp"
+TOKEN_LOCK_TTL_MS = 15000     # tempo máximo que um worker segura o lock de login
+
+# Libera o lock só se o valor ainda for o token de quem o adquiriu: se o login passou
+# do TTL e outro worker já pegou o lock, o DEL não pode apagar o lock dele.
+_LUA_LIBERAR_LOCK = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+  return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# =====================
+# Helpers
+# =====================
+
+def _jwt_exp(token: str) -> Optional[float]:
+    """Lê o claim `exp` do JWT (sem validar assinatura — só para agendar a renovação)."""
+    try:
+        partes = token.split(".")
+        if len(partes) != 3:
+            return None
+        payload = partes[1] + "=" * (-len(partes[1]) % 4)
+        exp = json.loads(base64.urlsafe_b64decode(payload)).get("exp")
+        return float(exp) if exp else None
+    except Exception:
+        return None
+
+def bearer_de(headers: dict | None) -> str | None:
+    """Token enviado no header Authorization (para o refresh saber qual foi rejeitado)."""
+    auth = (headers or {}).get("Authorization") or ""
+    return auth.replace("Bearer", "", 1).strip() or None
+
+# =====================
+# Token manager por upstream
+# =====================
+
+class TokenManager:
+    """
+    Cache do token de um upstream (Eleven / Heygen) com refresh single-flight:
+      - um asyncio.Lock garante que só um coroutine por processo faz login;
+      - quem chega com um 401 informa o token rejeitado: se outro coroutine já trocou o
+        token nesse meio tempo, reaproveita o novo em vez de logar de novo;
+      - renova proativamente TOKEN_REFRESH_MARGIN segundos antes do `exp` do JWT;
+      - compartilha o token entre workers via Redis (com lock SET NX para que só um
+        worker faça login). Se o Redis estiver indisponível, segue só com o cache local.
+    """
+
+    def __init__(self, nome: str, rotulo: str, auth_url: str, username: str, password: str,
+                 env_user: str, env_pass: str, timeout: float):
+        self.nome = nome
+        self.rotulo = rotulo
+        self.auth_url = auth_url
+        self.username = username
+        self.password = password
+        self.env_user = env_user
+        self.env_pass = env_pass
+        self.timeout = timeout
+        self._token: Optional[str] = None
+        self._renovar_em: float = 0.0  # epoch seconds
+        self._lock = asyncio.Lock()
+        # registrado no primeiro uso (o cliente Redis é criado sob demanda)
+        self._script_liberar = None
+
+    @property
+    def _redis_key(self) -> str:
+        return f"upstream_token:{self.nome}"
+
+    @property
+    def _redis_lock_key(self) -> str:
+        return f"upstream_token_lock:{self.nome}"
+
+    def _valido(self, agora: float) -> bool:
+        return bool(self._token) and agora < self._renovar_em
+
+    async def obter(self, force: bool = False, rejeitado: Optional[str] = None) -> str:
+        """
+        Retorna um token válido. `force=True` pede um token novo; se `rejeitado` for
+        informado (o token que tomou 401), qualquer token diferente dele já serve.
+        """
+        if not force and self._valido(time.time()):
+            return self._token
+        async with self._lock:
+            agora = time.time()
+            if self._valido(agora) and (not force or (rejeitado and self._token != rejeitado)):
+                return self._token
+
+            token_renovar = await self._ler_compartilhado(rejeitado if force else None, force)
+            if token_renovar is None:
+                token_renovar = await self._login_compartilhado(rejeitado if force else None, force)
+            self._token, self._renovar_em = token_renovar
+            return self._token
+
+    # ---- Redis (cross-process) ----
+
+    async def _ler_compartilhado(self, rejeitado: Optional[str], force: bool) -> Optional[Tuple[str, float]]:
+        # force sem token rejeitado conhecido = login explícito; não confia no Redis
+        if force and not rejeitado:
+            return None
+        try:
+            raw = await get_redis().get(self._redis_key)
+        except Exception:
+            return None
+        if not raw:
+            return None
+        try:
+            data = json.loads(raw)
+            token, renovar_em = data["token"], float(data["renovar_em"])
+        except (ValueError, KeyError, TypeError):
+            return None
+        if token == rejeitado or time.time() >= renovar_em:
+            return None
+        return token, renovar_em
+
+    async def _liberar_lock(self, dono: str) -> None:
+        try:
+            if self._script_liberar is None:
+                self._script_liberar = get_redis().register_script(_LUA_LIBERAR_LOCK)
+            await self._script_liberar(keys=[self._redis_lock_key], args=[dono])
+        except Exception:
+            pass
+
+    async def _login_compartilhado(self, rejeitado: Optional[str], force: bool) -> Tuple[str, float]:
+        dono = secrets.token_hex(16)
+        try:
+            adquiriu = await get_redis().set(self._redis_lock_key, dono, nx=True, px=TOKEN_LOCK_TTL_MS)
+        except Exception:
+            return await self._login()
+
+        if not adquiriu:
+            # Outro worker está logando: espera o token dele aparecer no Redis
+            limite = time.time() + TOKEN_LOCK_TTL_MS / 1000
+            while time.time() < limite:
+                await asyncio.sleep(0.25)
+                token_renovar = await self._ler_compartilhado(rejeitado or self._token, force=False)
+                if token_renovar is not None:
+                    return token_renovar
+            return await self._login()
+
+        try:
+            token, renovar_em = await self._login()
+            try:
+                ttl = max(1, int(renovar_em - time.time()))
+                await get_redis().setex(self._redis_key, ttl, json.dumps({"token": token, "renovar_em": renovar_em}))
+            except Exception:
+                pass
+            return token, renovar_em
+        finally:
+            await self._liberar_lock(dono)
+
+    # ---- Login HTTP ----
+
+    async def _login(self) -> Tuple[str, float]:
+        """Faz o login HTTP e retorna (token, momento em que deve ser renovado)."""
+        if not self.username or not self.password:
+            raise RuntimeError(f"Credenciais {self.rotulo} não configuradas ({self.env_user} / {self.env_pass}).")
+        logger.info("Login %s...", self.rotulo)
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            resp = await client.post(
+                self.auth_url,
+                json={"username": self.username, "password": self.password},
+                headers={"Content-Type": "application/json"}
+            )
+            resp.raise_for_status()
+            data = resp.json() if resp.headers.get("content-type", "").startswith("application/json") else {}
+        token = data.get("token") or data.get("access_token") or data.get("accessToken") or data.get("jwt")
+        if not token:
+            if isinstance(data, str) and data.strip():
+                token = data.strip()
+            else:
+                raise RuntimeError(f"Login {self.rotulo} não retornou token. Resposta: {data!r}")
+        token = token.strip()
+        agora = time.time()
+        exp = _jwt_exp(token)
+        if exp is None:
+            return token, agora + TOKEN_FALLBACK_TTL
+        # Renova antes do exp; tokens de vida curta renovam na metade da vida
+        margem = min(TOKEN_REFRESH_MARGIN, max(0.0, exp - agora) / 2)
+        return token, exp - margem
@@ -0,0 +1,40 @@
+# tests/test_importtime.py
+"""
+Import de `main` (e do shim audio_service) não pode carregar os pacotes pesados de services/:
+eles são sob demanda (services/_lazy.py). Perfil detalhado: python bench_importtime.py.
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Processo novo: sys.modules limpo, mesmo critério do bench_importtime.carregados_indevidamente
+_CODIGO = """
+import importlib, json, sys
+importlib.import_module({modulo!r})
+from bench_importtime import PACOTES_SOB_DEMANDA
+print(json.dumps(sorted(
+    m for m in sys.modules
+    if m != {modulo!r} and any(m.startswith(p + ".") for p in PACOTES_SOB_DEMANDA)
+)))
+"""
+
+
+@pytest.mark.parametrize("modulo", ["main", "services.audio_service"])
+def test_import_nao_carrega_pacotes_sob_demanda(modulo):
+    proc = subprocess.run(
+        [sys.executable, "-c", _CODIGO.format(modulo=modulo)],
+        cwd=RAIZ,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    if proc.returncode != 0 and "ModuleNotFoundError" in proc.stderr:
+        pytest.skip(f"dependência ausente para importar {modulo}: {proc.stderr.strip().splitlines()[-1]}")
+    assert proc.returncode == 0, proc.stderr
+    carregados = json.loads(proc.stdout.strip().splitlines()[-1])
+    assert carregados == [], f"import {modulo} carregou submódulos sob demanda: {carregados}"
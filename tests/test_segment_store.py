@@ -0,0 +1,57 @@
+# tests/test_segment_store.py
+"""SegmentStore: ida e volta pelo JSON do Redis (inclusive previews antigos) e busca por intervalo."""
+from services.segment_store import SegmentStore
+
+
+def _store(*palavras):
+    """Palavras como (texto, início, fim)."""
+    store = SegmentStore.vazio()
+    for texto, inicio, fim in palavras:
+        store.adicionar(texto, inicio, fim)
+    return store
+
+
+def test_json_ida_e_volta():
+    store = _store(("Olá", 0.0, 0.4), ("Ana", 0.5, 0.9), ("tudo", 1.0, 1.3))
+    lido = SegmentStore.de_json(store.para_json())
+    assert list(lido) == list(store)
+    assert lido.duracao_total == 1.3
+
+
+def test_json_de_preview_antigo_lista_de_dicts():
+    antigo = [
+        {"type": "word", "text": "Olá", "start": 0.0, "end": 0.4},
+        {"type": "spacing", "text": " ", "start": 0.4, "end": 0.5},
+        {"type": "word", "text": "Ana", "start": 0.5, "end": 0.9},
+        {"text": "", "start": 0.9, "end": 1.0},
+        {"text": "tudo", "start": None, "end": "1.3"},
+    ]
+    lido = SegmentStore.de_json(antigo)
+    assert list(lido) == [("Olá", 0.0, 0.4), ("Ana", 0.5, 0.9), ("tudo", 0.0, 1.3)]
+
+
+def test_json_vazio():
+    for data in (None, {}, []):
+        assert len(SegmentStore.de_json(data)) == 0
+    assert SegmentStore.de_json(None).duracao_total == 0.0
+
+
+def test_palavras_no_intervalo_bordas():
+    store = _store(("a", 0.0, 1.0), ("b", 1.0, 2.0), ("c", 2.0, 3.0), ("d", 3.0, 4.0))
+    # limites exatos entram
+    assert store.palavras_no_intervalo(1.0, 3.0) == range(1, 3)
+    assert store.palavras_no_intervalo(0.0, 4.0) == range(0, 4)
+    # palavra cortada em qualquer ponta fica de fora
+    assert store.palavras_no_intervalo(0.5, 3.5) == range(1, 3)
+    assert store.palavras_no_intervalo(1.0, 2.999) == range(1, 2)
+    # nada inteiro dentro do intervalo
+    assert store.palavras_no_intervalo(1.2, 1.8) == range(2, 2)
+    assert not store.palavras_no_intervalo(5.0, 6.0)
+    assert not store.palavras_no_intervalo(-2.0, -1.0)
+    assert not SegmentStore.vazio().palavras_no_intervalo(0.0, 10.0)
+
+
+def test_texto_inclusivo():
+    store = _store(("olá", 0.0, 0.4), ("ana", 0.5, 0.9), ("maria", 1.0, 1.3))
+    assert store.texto(1, 2) == "ana maria"
+    assert store.texto(0, 0) == "olá"
@@ -0,0 +1,62 @@
+# tests/test_transcript_index.py
+"""TranscriptIndex e a regex da palavra-chave (limites de palavra, palavras-chave compostas)."""
+from services.segment_store import SegmentStore
+from services.transcript_index import (
+    TranscriptIndex, normalizar_token, padrao_palavra_chave, substituir_palavra_chave,
+)
+
+
+def _indice(*textos):
+    store = SegmentStore.vazio()
+    for i, texto in enumerate(textos):
+        store.adicionar(texto, float(i), float(i) + 0.9)
+    return TranscriptIndex(store)
+
+
+def test_normalizar_token():
+    assert normalizar_token("João,") == "joao"
+    assert normalizar_token("  MARIA-Clara! ") == "maria clara"
+    assert normalizar_token("") == ""
+
+
+def test_localizar_palavra_unica():
+    indice = _indice("Oi", "Ana,", "tudo", "bem", "ana")
+    assert indice.localizar("ANA") == (1, 1)
+    assert indice.localizar("fulano") is None
+
+
+def test_localizar_palavra_composta():
+    indice = _indice("Oi", "Maria", "bem", "Maria", "Clara!", "tudo", "bem")
+    # primeira "maria" não é seguida de "clara": a ocorrência é a segunda
+    assert indice.localizar("maria clara") == (3, 4)
+    assert indice.localizar("Maria  Clara") == (3, 4)
+    assert indice.localizar("clara maria") is None
+
+
+def test_localizar_composta_num_so_item_da_transcricao():
+    indice = _indice("Oi", "Maria-Clara", "tudo")
+    assert indice.localizar("maria clara") == (1, 1)
+
+
+def test_localizar_usa_cache():
+    indice = _indice("Oi", "Ana")
+    assert indice.localizar("ana") == (1, 1)
+    indice.tokens[1] = "outra"
+    assert indice.localizar("Ana") == (1, 1)
+
+
+def test_padrao_respeita_limite_de_palavra():
+    padrao = padrao_palavra_chave("ana")
+    assert padrao.search("Oi Ana, tudo bem?")
+    # com r"\\w" (barra invertida literal + "w") estes dois casavam
+    assert not padrao.search("vamos analisar isso")
+    assert not padrao.search("a banana")
+    assert padrao.search("(ana)")
+
+
+def test_substituir_palavra_chave():
+    texto = "Ana, vamos analisar o caso da ana"
+    assert substituir_palavra_chave(texto, "ana", "João") == "João, vamos analisar o caso da João"
+    assert substituir_palavra_chave(texto, "ana", "João", count=1) == "João, vamos analisar o caso da ana"
+    assert substituir_palavra_chave("Oi maria   clara!", "Maria Clara", r"\1") == r"Oi \1!"
+    assert substituir_palavra_chave(texto, "  ", "João") == texto
@@ -0,0 +1,137 @@
+# upload_utils.py
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from typing import Optional, Tuple
+from uuid import uuid4
+
+from fastapi import HTTPException, UploadFile
+
+# =========================
+# Config de uploads
+# =========================
+UPLOAD_STAGING_DIR = os.getenv(
+    "UPLOAD_STAGING_DIR",
+    os.path.join(tempfile.gettempdir(), "videosmartai_uploads"),
+)
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))  # 1 MB por leitura
+MAX_FOTO_BYTES = int(os.getenv("MAX_FOTO_BYTES", str(20 * 1024 * 1024)))     # 20 MB
+MAX_AUDIO_BYTES = int(os.getenv("MAX_AUDIO_BYTES", str(200 * 1024 * 1024)))  # 200 MB
+MAX_VIDEO_BYTES = int(os.getenv("MAX_VIDEO_BYTES", str(500 * 1024 * 1024)))  # 500 MB
+# Campanhas podem levar horas; pastas mais antigas que isso são lixo de jobs que morreram
+UPLOAD_STAGING_MAX_AGE = int(os.getenv("UPLOAD_STAGING_MAX_AGE", str(24 * 3600)))
+# Enquanto um job usa a pasta, o mtime dela é renovado a cada intervalo deste
+UPLOAD_STAGING_TOUCH_S = float(os.getenv("UPLOAD_STAGING_TOUCH_S", "600"))
+
+# =========================
+# Pasta de staging por job
+# =========================
+def limpar_staging_expirado(max_idade_s: int = UPLOAD_STAGING_MAX_AGE) -> None:
+    """
+    Remove pastas de staging abandonadas (ex.: worker reiniciado no meio da campanha).
+    Pastas de jobs em andamento têm o mtime renovado por `staging_em_uso` e não expiram.
+    """
+    if not os.path.isdir(UPLOAD_STAGING_DIR):
+        return
+    limite = time.time() - max_idade_s
+    for nome in os.listdir(UPLOAD_STAGING_DIR):
+        caminho = os.path.join(UPLOAD_STAGING_DIR, nome)
+        try:
+            if os.path.isdir(caminho) and os.path.getmtime(caminho) < limite:
+                shutil.rmtree(caminho, ignore_errors=True)
+        except OSError:
+            pass
+
+
+def criar_pasta_staging() -> str:
+    """Cria uma pasta exclusiva para os uploads de um job."""
+    limpar_staging_expirado()
+    pasta = os.path.join(UPLOAD_STAGING_DIR, uuid4().hex)
+    os.makedirs(pasta, exist_ok=True)
+    return pasta
+
+
+def remover_pasta_staging(pasta: Optional[str]) -> None:
+    if pasta:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+@asynccontextmanager
+async def staging_em_uso(pasta: Optional[str]):
+    """
+    Mantém a pasta de staging viva enquanto o job roda: renova o mtime dela a cada
+    UPLOAD_STAGING_TOUCH_S, para `limpar_staging_expirado` (chamado a cada novo upload)
+    não apagar os arquivos de uma campanha que passou de UPLOAD_STAGING_MAX_AGE.
+    Se o worker morrer, a renovação para e a pasta expira normalmente.
+    """
+    async def _renovar():
+        while True:
+            try:
+                os.utime(pasta)
+            except OSError:
+                pass  # o próprio job já removeu a pasta
+            await asyncio.sleep(UPLOAD_STAGING_TOUCH_S)
+
+    tarefa = asyncio.create_task(_renovar()) if pasta else None
+    try:
+        yield
+    finally:
+        if tarefa is not None:
+            tarefa.cancel()
+
+# =========================
+# Upload em chunks
+# =========================
+async def salvar_upload_em_disco(
+    upload: UploadFile,
+    pasta: str,
+    nome_padrao: str,
+    limite_bytes: int,
+) -> Tuple[str, str]:
+    """
+    Copia o upload para `pasta` em blocos de UPLOAD_CHUNK_BYTES, sem nunca ter o arquivo
+    inteiro em memória. O limite de tamanho é aplicado durante a cópia (413 assim que
+    estourar) e o sha256 é calculado no caminho.
+    Retorna (caminho_no_disco, sha256_hex).
+    """
+    nome = os.path.basename((upload.filename or "").strip()) or nome_padrao
+    if "." not in nome and "." in nome_padrao:
+        nome = f"{nome}{os.path.splitext(nome_padrao)[1]}"
+    caminho = os.path.join(pasta, nome)
+    if os.path.exists(caminho):
+        # foto e áudio com o mesmo nome no mesmo staging
+        caminho = os.path.join(pasta, f"{uuid4().hex[:8]}_{nome}")
+
+    sha = hashlib.sha256()
+    total = 0
+    try:
+        with open(caminho, "wb") as f:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                total += len(chunk)
+                if total > limite_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Arquivo '{nome}' excede o limite de {limite_bytes // (1024 * 1024)} MB.",
+                    )
+                sha.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        try:
+            os.remove(caminho)
+        except OSError:
+            pass
+        raise
+    finally:
+        await upload.close()
+
+    if total == 0:
+        os.remove(caminho)
+        raise HTTPException(status_code=422, detail=f"Arquivo '{nome}' está vazio.")
+    return caminho, sha.hexdigest()